@@ -0,0 +1,96 @@
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from .services.calendar_events import merge_calendar_events, normalize_events
+from .services.timezones import get_zone
+
+# Calendar sync load check:
+#   python -m backend.check_calendar_sync [--events 10000] [--calendars 5] [--budget-ms 250]
+# Generates a day of Google Calendar events spread over several calendars,
+# with events shared between calendars, recurring instances, all day and
+# cancelled events and conference links, then times merging and
+# normalizing them as a sync does. Exits with status 1 when the median
+# for the whole batch is over budget.
+
+LOCATIONS = [None, "Room 4", "https://zoom.us/j/123456789", "Teams meeting", "Office"]
+DESCRIPTIONS = [
+    None,
+    "Agenda attached",
+    "Join: https://meet.google.com/abc-defg-hij",
+    "Dial in via https://acme.webex.com/meet/ops or call the bridge",
+    "Quarterly planning, bring numbers",
+]
+
+def make_event(rng: random.Random, index: int, day: datetime) -> dict:
+    start = day + timedelta(minutes=15 * rng.randrange(96))
+    event = {
+        "id": f"event{index}",
+        "iCalUID": f"uid{index}@google.com",
+        "status": "cancelled" if rng.random() < 0.05 else "confirmed",
+        "summary": f"Meeting {index}",
+        "location": rng.choice(LOCATIONS),
+        "description": rng.choice(DESCRIPTIONS),
+        "attendees": [{"email": f"person{rng.randrange(500)}@example.com"} for _ in range(rng.randrange(1, 8))],
+    }
+    if rng.random() < 0.1:
+        event["start"] = {"date": day.date().isoformat()}
+        event["end"] = {"date": (day.date() + timedelta(days=1)).isoformat()}
+    else:
+        event["start"] = {"dateTime": start.isoformat().replace("+00:00", "Z")}
+        event["end"] = {"dateTime": (start + timedelta(minutes=30)).isoformat().replace("+00:00", "Z")}
+    if rng.random() < 0.2:
+        event["conferenceData"] = {"entryPoints": [{"entryPointType": "video", "uri": f"https://meet.google.com/x-{index}"}]}
+    return event
+
+def make_calendars(count: int, calendars: int) -> list:
+    rng = random.Random(42)
+    day = datetime(2026, 10, 19, tzinfo=timezone.utc)
+    events = [make_event(rng, i, day) for i in range(count)]
+    # Every event is on one calendar, and a fifth of them on a second one too
+    lists = [[] for _ in range(calendars)]
+    for event in events:
+        lists[rng.randrange(calendars)].append(event)
+        if rng.random() < 0.2:
+            lists[rng.randrange(calendars)].append(dict(event))
+    return lists
+
+def main():
+    parser = argparse.ArgumentParser(description="Check calendar event merging and normalizing against a time budget")
+    parser.add_argument("--events", type=int, default=10000, help="distinct events in the day")
+    parser.add_argument("--calendars", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=250.0, help="median budget for the whole batch")
+    args = parser.parse_args()
+
+    zone = get_zone("Europe/Berlin")
+    lists = make_calendars(args.events, args.calendars)
+    fetched = sum(len(events) for events in lists)
+
+    merge_samples, normalize_samples = [], []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        merged = merge_calendar_events(lists)
+        merged_at = time.perf_counter()
+        meetings = normalize_events(merged, "user", zone)
+        finished = time.perf_counter()
+        merge_samples.append((merged_at - started) * 1000)
+        normalize_samples.append((finished - merged_at) * 1000)
+
+    total = statistics.median([m + n for m, n in zip(merge_samples, normalize_samples)])
+    online = sum(1 for meeting in meetings if meeting["is_online"])
+    print(f"{fetched} events fetched from {args.calendars} calendars, {len(merged)} after merging, "
+          f"{len(meetings)} meetings ({online} online)")
+    print(f"Merge:      {statistics.median(merge_samples):8.2f}ms median")
+    print(f"Normalize:  {statistics.median(normalize_samples):8.2f}ms median")
+    print(f"Total:      {total:8.2f}ms median, {fetched / total * 1000:,.0f} events/s")
+
+    if total > args.budget_ms:
+        print(f"Over budget: {total:.0f}ms above {args.budget_ms:.0f}ms")
+        sys.exit(1)
+    print("Within budget")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 import asyncio
 from database.client import db, settings
 from models.schemas import UserInDB
+from services.timezones import get_zone, local_today, local_day_range
 import os
-from datetime import datetime, timedelta, time
+from datetime import timedelta
 
 # Ensure we use the real DB
 os.environ["MONGODB_URI"] = settings.MONGODB_URI
@@ -22,17 +23,16 @@ async def check():
     user_id = str(user["_id"])
     print(f"User ID: {user_id}")
 
-    # Replicate backend logic
-    today = datetime.now().date()
-    seven_days_ago = today - timedelta(days=7)
-    start_time = datetime.combine(seven_days_ago, time.min)
-    end_time = datetime.combine(today, time.max)
+    # Replicate backend logic: the last 7 local days in the user's timezone
+    zone = get_zone(user.get("timezone"))
+    today = local_today(zone)
+    start_time, end_time = local_day_range(today - timedelta(days=7), zone, today)
 
-    print(f"Querying range: {start_time} to {end_time}")
+    print(f"Querying range: {start_time} to {end_time} ({zone.key})")
 
     cursor = database.meetings.find({
         "user_id": user_id,
-        "start_time": {"$gte": start_time, "$lte": end_time}
+        "start_time": {"$gte": start_time, "$lt": end_time}
     }).sort("start_time", 1)
     
     meetings = await cursor.to_list(length=100)
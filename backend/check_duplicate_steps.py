@@ -0,0 +1,58 @@
+import argparse
+import sys
+from .database.client import settings
+from .services.fingerprints import ActionIndex
+
+# Near-duplicate next step check:
+#   python -m backend.check_duplicate_steps [--threshold 0.8]
+# Runs pairs of action items through the duplicate detection used when
+# actions are regenerated for a meeting. Rewordings of one item must merge;
+# items that differ in who, what or when must not. Exits with status 1 when
+# any pair is decided the wrong way.
+
+# Rewordings of the same action item
+SAME = [
+    ("Follow up on the discussion points", "Follow up on discussion points."),
+    ("Email the stakeholders with the summary", "Email summary to stakeholders"),
+    ("Review the budget", "review budget!"),
+    ("Schedule a follow-up meeting with the client", "Schedule follow-up meeting with client"),
+    ("Update the project timeline", "Update project timelines"),
+    ("Send the slides to the team", "Send team the slides"),
+]
+
+# Different action items that share most of their wording
+DIFFERENT = [
+    ("Schedule follow-up with marketing team", "Schedule follow-up with sales team"),
+    ("Book a room for the offsite", "Book flights for the offsite"),
+    ("Send the Q3 financial report to the board", "Send the Q4 financial report to the board"),
+    ("Call John about the contract", "Call Mary about the contract"),
+    ("Prepare slides for Monday", "Prepare slides for Tuesday"),
+    ("Share the draft with legal", "Share the draft with finance"),
+]
+
+def merges(first: str, second: str, threshold: float) -> bool:
+    index = ActionIndex(threshold)
+    index.add(first, first)
+    return index.find(second) is not None
+
+def main():
+    parser = argparse.ArgumentParser(description="Check which action items are merged as duplicates")
+    parser.add_argument("--threshold", type=float, default=settings.NEXT_STEP_DUPLICATE_THRESHOLD, help="duplicate threshold to check")
+    args = parser.parse_args()
+
+    print(f"Threshold {args.threshold}")
+    wrong = 0
+    for expected, pairs in ((True, SAME), (False, DIFFERENT)):
+        for first, second in pairs:
+            merged = merges(first, second, args.threshold)
+            ok = merged == expected
+            wrong += not ok
+            print(f"{'ok' if ok else 'WRONG':<7}{'merged' if merged else 'kept':<8}{first!r} / {second!r}")
+
+    if wrong:
+        print(f"{wrong} pairs decided the wrong way")
+        sys.exit(1)
+    print("All pairs decided as expected")
+
+if __name__ == "__main__":
+    main()
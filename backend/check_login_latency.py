@@ -0,0 +1,96 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from bson import ObjectId
+from .database.client import db, settings
+from .models.schemas import UserLogin
+from .routers.auth import login
+from .security.auth import get_password_hash, shutdown_hash_executor
+
+# Login latency and throughput check:
+#   python -m backend.check_login_latency [--logins 64] [--budget-ms 250] [--lag-budget-ms 50]
+# Creates throwaway users in whatever engine the app would use, logs them
+# in through the same handler as POST /auth/login at rising concurrency,
+# then deletes them. Also records how late a 10ms heartbeat on the event
+# loop runs, which stays low while scrypt runs on the hashing pool.
+# Exits with status 1 when a single login's p95 is over budget, or when the
+# heartbeat runs later than the lag budget at any concurrency.
+
+PASSWORD = "correct horse battery staple"
+
+async def heartbeat(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append((time.perf_counter() - started - 0.01) * 1000)
+
+async def timed_login(email: str) -> float:
+    started = time.perf_counter()
+    await login(UserLogin(email=email, password=PASSWORD))
+    return (time.perf_counter() - started) * 1000
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def run(args) -> list:
+    await db.connect()
+    database = db.get_db()
+    prefix = f"login-benchmark-{ObjectId()}"
+    # One hash for every user; hashing them all would only slow the setup
+    hashed = get_password_hash(PASSWORD)
+    emails = [f"{prefix}-{i}@example.com" for i in range(args.logins)]
+    print(f"Engine: {db.engine}, {settings.PASSWORD_HASH_WORKERS} hashing workers")
+    try:
+        for email in emails:
+            await database.users.insert_one({"email": email, "hashed_password": hashed})
+
+        over_budget = []
+        print(f"{'concurrency':>12}{'p50 ms':>10}{'p95 ms':>10}{'logins/s':>10}{'loop lag ms':>13}")
+        for concurrency in args.concurrency:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one(email):
+                async with semaphore:
+                    return await timed_login(email)
+
+            lags, stop = [], asyncio.Event()
+            beat = asyncio.create_task(heartbeat(lags, stop))
+            started = time.perf_counter()
+            samples = await asyncio.gather(*(one(email) for email in emails))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await beat
+            p95 = percentile(samples, 0.95)
+            lag = max(lags, default=0.0)
+            if concurrency == 1 and p95 > args.budget_ms:
+                over_budget.append(f"p95 of one login at a time above {args.budget_ms:.0f}ms")
+            if lag > args.lag_budget_ms:
+                over_budget.append(f"event loop lag above {args.lag_budget_ms:.0f}ms at concurrency {concurrency}")
+            print(f"{concurrency:>12}{statistics.median(samples):>10.1f}{p95:>10.1f}"
+                  f"{len(samples) / elapsed:>10.1f}{lag:>13.1f}")
+        return over_budget
+    finally:
+        await database.users.delete_many({"email": {"$in": emails}})
+        shutdown_hash_executor()
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Check login latency and throughput against a time budget")
+    parser.add_argument("--logins", type=int, default=64, help="logins per concurrency level, one user each")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--budget-ms", type=float, default=250.0, help="p95 budget for one login at a time")
+    parser.add_argument("--lag-budget-ms", type=float, default=50.0, help="budget for the event loop's worst lag")
+    args = parser.parse_args()
+
+    over_budget = asyncio.run(run(args))
+    if over_budget:
+        for problem in over_budget:
+            print(f"Over budget: {problem}")
+        sys.exit(1)
+    print("Within budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from .database.mock_query import compile_filter
+
+# Query matcher check for the in-memory and SQLite engines:
+#   python -m backend.check_query_matcher [--documents 20000] [--budget-ms 15]
+# Times scanning documents against filters shaped like the app's queries
+# with compile_filter, next to the per-document interpreter MockCollection
+# used before filters were compiled. Exits with status 1 when a compiled
+# scan's median is over budget.
+
+STATUSES = ["suggested", "confirmed", "executed", "rejected", "pending"]
+
+def legacy_matches(item, filter):
+    # The matcher compile_filter replaced, kept here as the baseline; it
+    # re-reads the filter for every document and knows only these operators
+    for key, value in filter.items():
+        item_val = item.get(key)
+        if isinstance(value, dict):
+            if "$gte" in value:
+                if item_val is None or not (item_val >= value["$gte"]):
+                    return False
+            if "$lte" in value:
+                if item_val is None or not (item_val <= value["$lte"]):
+                    return False
+            if "$in" in value:
+                if item_val not in value["$in"]:
+                    return False
+        elif item_val != value:
+            return False
+    return True
+
+def make_documents(count: int):
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "user_id": f"user{rng.randrange(50)}",
+            "meeting_id": f"meeting{rng.randrange(2000)}",
+            "status": rng.choice(STATUSES),
+            "start_time": start + timedelta(hours=rng.randrange(24 * 365)),
+            "original_text": f"Action item {i}",
+        }
+        for i in range(count)
+    ]
+
+FILTERS = {
+    "user + day range": {
+        "user_id": "user7",
+        "start_time": {"$gte": datetime(2024, 3, 1), "$lte": datetime(2024, 3, 2)},
+    },
+    "user + status $in": {"user_id": "user7", "status": {"$in": ["suggested", "confirmed", "pending"]}},
+    "user + meeting": {"user_id": "user7", "meeting_id": "meeting5"},
+}
+
+def time_scan(match, docs, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        [doc for doc in docs if match(doc)]
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the compiled query matcher against a time budget")
+    parser.add_argument("--documents", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=20, help="scans per filter and matcher")
+    parser.add_argument("--budget-ms", type=float, default=15.0, help="median budget per compiled scan")
+    args = parser.parse_args()
+
+    docs = make_documents(args.documents)
+    print(f"{args.documents} documents, median of {args.runs} scans")
+    print(f"{'filter':<20}{'legacy ms':>11}{'compiled ms':>13}{'speedup':>9}")
+    within_budget = True
+    for name, filter in FILTERS.items():
+        predicate = compile_filter(filter)
+        legacy = [doc for doc in docs if legacy_matches(doc, filter)]
+        compiled = [doc for doc in docs if predicate(doc)]
+        if legacy != compiled:
+            print(f"{name}: matchers disagree ({len(legacy)} vs {len(compiled)} matches)")
+            sys.exit(1)
+        before = statistics.median(time_scan(lambda doc: legacy_matches(doc, filter), docs, args.runs))
+        after = statistics.median(time_scan(predicate, docs, args.runs))
+        within_budget = within_budget and after <= args.budget_ms
+        print(f"{name:<20}{before:>11.2f}{after:>13.2f}{before / after:>8.1f}x")
+
+    if not within_budget:
+        print(f"Over budget: a compiled scan's median is above {args.budget_ms:.0f}ms")
+        sys.exit(1)
+    print("Within budget")
+
+if __name__ == "__main__":
+    main()
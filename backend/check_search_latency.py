@@ -0,0 +1,138 @@
+import argparse
+import asyncio
+import gc
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import InsertOne
+from .database.client import db
+from .services.search import search
+
+# Search latency check at scale:
+#   python -m backend.check_search_latency [--documents 100000] [--budget-ms 300]
+# Seeds meetings and next steps for a throwaway user into whatever engine
+# the app would use (MongoDB, or the fallback set by MOCK_DB_BACKEND), times
+# searches through the same service as GET /search, then deletes them.
+# Samples are taken with the garbage collector paused, since a full
+# collection over the seeded documents costs more than any query and would
+# land in whichever sample it interrupts. Exits with status 1 when a
+# query's p95 is over budget.
+
+WORDS = [f"w{i}" for i in range(20000)]
+NAMES = [f"person{i}@example.com" for i in range(500)]
+
+def words(rng: random.Random, count: int) -> str:
+    # Zipf-like: a few words are everywhere, most are rare, as in real text
+    return " ".join(WORDS[min(int(rng.paretovariate(1.1)) - 1, len(WORDS) - 1)] for _ in range(count))
+
+QUERIES = {
+    "common word": "w0",
+    "rare word": "w5000",
+    "three words": "w3 w40 w700",
+    "phrase": '"w0 w1"',
+    "excluded word": "w2 -w0",
+}
+
+async def seed(database, user_id: str, documents: int, batch: int):
+    rng = random.Random(42)
+    start = datetime(2024, 1, 1)
+    meetings = documents // 2
+    meeting_ids = []
+    for offset in range(0, meetings, batch):
+        requests = []
+        for i in range(offset, min(offset + batch, meetings)):
+            meeting_id = ObjectId()
+            meeting_ids.append(str(meeting_id))
+            requests.append(InsertOne({
+                "_id": meeting_id,
+                "user_id": user_id,
+                "title": words(rng, 4),
+                "summary": words(rng, 60),
+                "participants": rng.sample(NAMES, 3),
+                "start_time": start + timedelta(hours=i),
+                "end_time": start + timedelta(hours=i, minutes=30),
+            }))
+        await database.meetings.bulk_write(requests)
+    for offset in range(0, documents - meetings, batch):
+        requests = []
+        for _ in range(min(batch, documents - meetings - offset)):
+            text = words(rng, 10)
+            requests.append(InsertOne({
+                "meeting_id": rng.choice(meeting_ids),
+                "user_id": user_id,
+                "original_text": text,
+                "edited_text": text,
+                "status": "suggested",
+                "created_at": start,
+            }))
+        await database.next_steps.bulk_write(requests)
+
+async def sample(database, user_id: str, query: str, page: int, runs: int) -> list:
+    gc.collect()
+    gc.disable()
+    try:
+        return [await timed(search(database, user_id, query, page, 20)) for _ in range(runs)]
+    finally:
+        gc.enable()
+
+async def timed(coro) -> float:
+    started = time.perf_counter()
+    await coro
+    return (time.perf_counter() - started) * 1000
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def run(args) -> bool:
+    await db.connect()
+    database = db.get_db()
+    user_id = f"search-benchmark-{ObjectId()}"
+    print(f"Engine: {db.engine}, {args.documents} documents")
+    try:
+        started = time.perf_counter()
+        await seed(database, user_id, args.documents, args.batch)
+        print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+        # The first query builds the index where that is deferred (SQLite)
+        first = await timed(search(database, user_id, "w1", 1, 20))
+        print(f"First query: {first:.1f}ms")
+
+        within_budget = True
+        print(f"{'query':<16}{'page':>6}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, query in QUERIES.items():
+            for page in (1, 10):
+                samples = await sample(database, user_id, query, page, args.runs)
+                p95 = percentile(samples, 0.95)
+                within_budget = within_budget and p95 <= args.budget_ms
+                print(f"{name:<16}{page:>6}{statistics.median(samples):>10.1f}{p95:>10.1f}")
+
+        # A write is searchable on the next query
+        meeting = await database.meetings.find_one({"user_id": user_id})
+        update = await timed(database.meetings.update_one({"_id": meeting["_id"]}, {"$set": {"title": "zzfreshtitle"}}))
+        found = await search(database, user_id, "zzfreshtitle", 1, 20)
+        print(f"Update: {update:.1f}ms, found by the next search: {bool(found.results)}")
+        return within_budget
+    finally:
+        await database.meetings.delete_many({"user_id": user_id})
+        await database.next_steps.delete_many({"user_id": user_id})
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Check search latency against a time budget")
+    parser.add_argument("--documents", type=int, default=100000, help="meetings and next steps, half each")
+    parser.add_argument("--runs", type=int, default=50, help="searches per query and page")
+    parser.add_argument("--batch", type=int, default=1000, help="documents per bulk write while seeding")
+    parser.add_argument("--budget-ms", type=float, default=300.0, help="p95 budget per query")
+    args = parser.parse_args()
+
+    if not asyncio.run(run(args)):
+        print(f"Over budget: p95 above {args.budget_ms:.0f}ms")
+        sys.exit(1)
+    print("Within budget")
+
+if __name__ == "__main__":
+    main()
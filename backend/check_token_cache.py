@@ -0,0 +1,60 @@
+import argparse
+import statistics
+import sys
+import time
+from datetime import timedelta
+from jose import jwt
+from .database.client import settings
+from .security.auth import create_access_token, decode_access_token, token_cache
+
+# Token claims cache check:
+#   python -m backend.check_token_cache [--tokens 1000] [--budget-us 20]
+# Times verifying access tokens with a full signature check and through
+# decode_access_token once they are cached, as every authenticated request
+# does. Exits with status 1 when a cached lookup's median is over budget.
+
+def time_calls(fn, tokens, rounds: int) -> list:
+    samples = []
+    for _ in range(rounds):
+        for token in tokens:
+            started = time.perf_counter()
+            fn(token)
+            samples.append((time.perf_counter() - started) * 1_000_000)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Check cached token verification against a time budget")
+    parser.add_argument("--tokens", type=int, default=1000, help="distinct tokens, as many users")
+    parser.add_argument("--rounds", type=int, default=5, help="times each token is verified")
+    parser.add_argument("--budget-us", type=float, default=20.0, help="median budget per cached lookup")
+    args = parser.parse_args()
+
+    tokens = [create_access_token({"sub": f"user{i}@example.com"}, timedelta(hours=1)) for i in range(args.tokens)]
+    print(f"{args.tokens} tokens, cache size {token_cache.maxsize}")
+
+    full = time_calls(
+        lambda token: jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]),
+        tokens, args.rounds
+    )
+    token_cache.clear()
+    first = time_calls(decode_access_token, tokens, 1)
+    cached = time_calls(decode_access_token, tokens, args.rounds)
+
+    print(f"{'verification':<24}{'median us':>12}{'p95 us':>10}")
+    for name, samples in (("signature check", full), ("first use (miss)", first), ("cached (hit)", cached)):
+        ordered = sorted(samples)
+        print(f"{name:<24}{statistics.median(samples):>12.1f}{ordered[int(len(ordered) * 0.95)]:>10.1f}")
+
+    # Callers get their own copy of the claims
+    claims = decode_access_token(tokens[0])
+    claims["sub"] = "changed"
+    print(f"Cached claims unaffected by callers: {decode_access_token(tokens[0])['sub'] != 'changed'}")
+
+    median = statistics.median(cached)
+    if median > args.budget_us:
+        print(f"Over budget: cached median {median:.1f}us above {args.budget_us:.0f}us")
+        sys.exit(1)
+    print("Within budget")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,36 @@
+import asyncio
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
 from pydantic_settings import BaseSettings
 from typing import Optional, Any
 
 class Settings(BaseSettings):
     MONGODB_URI: str
     APP_ENV: str
+
+    # Fallback engine: "memory" (per-process MockDB) or "sqlite" (shared by all workers on a host,
+    # though realtime updates only carry the writes of the client's own worker)
+    MOCK_DB_BACKEND: str = "memory"
+    MOCK_DB_SQLITE_PATH: str = "daily_action_hub.sqlite3"
+    # Persistence for the "memory" engine (empty path keeps it in memory only)
+    MOCK_DB_PATH: Optional[str] = None
+    MOCK_DB_COMPACT_EVERY: int = 1000
+    MOCK_DB_FSYNC: bool = False
+    MOCK_DB_THREAD_SAFE: bool = True
+    # How long to try MongoDB before falling back, and how long requests
+    # wait for the (background) connection before getting a 503
+    DB_CONNECT_TIMEOUT_MS: int = 2000
+    DB_READY_TIMEOUT: float = 10.0
     PORT: int
+
+    # Production server (python -m backend.serve); WEB_CONCURRENCY defaults to the CPU count
+    WEB_CONCURRENCY: Optional[int] = None
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE: int = 5
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    # Restart a worker after this many requests (0 disables), plus a random jitter
+    SERVER_MAX_REQUESTS: int = 10000
+    SERVER_MAX_REQUESTS_JITTER: int = 1000
     
     # Google OAuth
     GOOGLE_CLIENT_ID: str
@@ -23,17 +47,80 @@ class Settings(BaseSettings):
     JWT_SECRET: str
     JWT_ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    JWT_CACHE_SIZE: int = 1024
+    PASSWORD_HASH_WORKERS: int = 4
+
+    # Sync
+    MAX_CONCURRENT_SYNCS: int = 8
+    CALENDAR_FETCH_CONCURRENCY: int = 4
+
+    # Background jobs
+    JOB_WORKERS: int = 4
+    JOB_MAX_ATTEMPTS: int = 5
+    DRAFT_BATCH_CONCURRENCY: int = 5
+    # Drafts per Gmail batch request (Gmail allows 100 but throttles large batches)
+    GMAIL_BATCH_SIZE: int = 50
+
+    # Realtime updates
+    REALTIME_MAX_CONNECTIONS: int = 1000
+    REALTIME_MAX_CONNECTIONS_PER_USER: int = 5
+    # Turns on change stream pre-images for the watched collections at
+    # startup (MongoDB 6.0+), so deletes reach their owner's clients. This
+    # changes the collections for good and costs storage on every write;
+    # leave it off and run the collMod once as a migration instead if preferred
+    REALTIME_ENABLE_PRE_IMAGES: bool = False
 
     # AI
     OPENAI_API_KEY: Optional[str] = None
+    OPENAI_TIMEOUT: float = 30.0
+    AI_CACHE_SIZE: int = 256
+    # Long summaries are split into overlapping chunks extracted in parallel
+    AI_CHUNK_TOKENS: int = 2000
+    AI_CHUNK_OVERLAP_TOKENS: int = 200
+    AI_CHUNK_CONCURRENCY: int = 4
+    # Estimated similarity (0-1) above which two action items are the same one
+    NEXT_STEP_DUPLICATE_THRESHOLD: float = 0.8
+
+    # Search: results per page, and how deep into the ranking pages may go
+    SEARCH_PAGE_SIZE: int = 20
+    SEARCH_MAX_PAGE_SIZE: int = 100
+    SEARCH_MAX_RESULTS: int = 1000
 
     # External Services
     GOOGLE_TOKEN_URL: str
     GOOGLE_CALENDAR_EVENTS_URL: str
+    GOOGLE_CALENDAR_API_URL: str = "https://www.googleapis.com/calendar/v3"
+    GOOGLE_CALENDAR_LIST_URL: str = "https://www.googleapis.com/calendar/v3/users/me/calendarList"
+    GOOGLE_CHANNELS_STOP_URL: str = "https://www.googleapis.com/calendar/v3/channels/stop"
     GOOGLE_GMAIL_DRAFTS_URL: str
+    GOOGLE_GMAIL_BATCH_URL: str = "https://www.googleapis.com/batch/gmail/v1"
     GOOGLE_AUTH_URL: str
     GOOGLE_USER_INFO_URL: str
 
+    # Calendar push notifications (disabled while GOOGLE_WEBHOOK_URL is unset)
+    GOOGLE_WEBHOOK_URL: Optional[str] = None
+    GOOGLE_WATCH_TTL_SECONDS: int = 604800
+    GOOGLE_WATCH_RENEW_BEFORE_SECONDS: int = 86400
+    GOOGLE_WATCH_CHECK_INTERVAL: float = 3600.0
+
+    # Google API client: retries, rate limits (requests/second) and concurrency
+    GOOGLE_API_MAX_ATTEMPTS: int = 4
+    GOOGLE_API_BACKOFF_BASE: float = 0.5
+    GOOGLE_API_BACKOFF_MAX: float = 30.0
+    GOOGLE_API_PROJECT_RATE: float = 50.0
+    GOOGLE_API_USER_RATE: float = 5.0
+    GOOGLE_API_MAX_CONCURRENCY: int = 32
+    GOOGLE_API_TIMEOUT: float = 10.0
+
+    # Health monitor behind /livez and /readyz
+    HEALTH_CHECK_INTERVAL: float = 10.0
+    HEALTH_CHECK_TIMEOUT: float = 2.0
+
+    # Circuit breakers for Google and OpenAI
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_RECOVERY_SECONDS: float = 30.0
+    CIRCUIT_HALF_OPEN_CALLS: int = 1
+
     class Config:
         env_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".env")
 
@@ -41,21 +128,113 @@ settings = Settings()
 
 class Database:
     client: Optional[Any] = None
+    # "mongodb", or the fallback engine in use: "sqlite" or "memory"
+    engine: Optional[str] = None
+
+    def __init__(self):
+        self._ready: Optional[asyncio.Event] = None
+        self._connect_task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> asyncio.Event:
+        if self._ready is None:
+            self._ready = asyncio.Event()
+        return self._ready
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready is not None and self._ready.is_set()
+
+    def start(self):
+        """
+        Connects in the background so the server can start accepting
+        requests right away; get_database() holds them until it is done.
+        """
+        if self._connect_task is None:
+            self._connect_task = asyncio.create_task(self.connect(), name="database-connect")
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        if self.is_ready:
+            return True
+        # asyncio.wait rather than wait_for, which on Python 3.11 can swallow
+        # a cancel that arrives as the event is set
+        waiter = asyncio.ensure_future(self.ready.wait())
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        finally:
+            waiter.cancel()
+        return self.is_ready
 
     async def connect(self):
         try:
+            # Imported here: the driver is only needed once we connect
+            from motor.motor_asyncio import AsyncIOMotorClient
             # Try connecting with a short timeout
             print(f"DEBUG: Attempting to connect to MongoDB at {settings.MONGODB_URI}")
-            self.client = AsyncIOMotorClient(settings.MONGODB_URI, serverSelectionTimeoutMS=2000)
+            self.client = AsyncIOMotorClient(settings.MONGODB_URI, serverSelectionTimeoutMS=settings.DB_CONNECT_TIMEOUT_MS)
             await self.client.admin.command('ping')
+            self.engine = "mongodb"
             print("Connected to MongoDB")
         except Exception as e:
             print(f"Could not connect to MongoDB: {e}")
-            print("Falling back to in-memory MockDB")
-            from .mock_db import MockClient
-            self.client = MockClient(settings.MONGODB_URI)
+            if settings.MOCK_DB_BACKEND == "sqlite":
+                # Shared by every worker process on this host
+                print(f"Falling back to SQLite store at {settings.MOCK_DB_SQLITE_PATH}")
+                from .sqlite_db import SQLiteClient
+                self.client = SQLiteClient(settings.MONGODB_URI, settings.MOCK_DB_SQLITE_PATH)
+                self.engine = "sqlite"
+            else:
+                print("Falling back to in-memory MockDB")
+                from .mock_db import MockClient
+                self.client = MockClient(
+                    settings.MONGODB_URI,
+                    persist_path=settings.MOCK_DB_PATH,
+                    compact_every=settings.MOCK_DB_COMPACT_EVERY,
+                    fsync=settings.MOCK_DB_FSYNC,
+                    thread_safe=settings.MOCK_DB_THREAD_SAFE,
+                )
+                self.engine = "memory"
+
+        await self.ensure_indexes()
+        self.ready.set()
+
+    async def ensure_indexes(self):
+        database = self.get_db()
+        # (collection, keys, options); each is created on its own so one
+        # failing index doesn't leave the ones after it missing
+        indexes = [
+            ("users", "email", {"unique": True}),
+            # Manually created meetings have no google_event_id, so only index synced ones
+            ("meetings", [("user_id", 1), ("google_event_id", 1)], {
+                "unique": True,
+                "partialFilterExpression": {"google_event_id": {"$type": "string"}},
+            }),
+            ("meetings", [("user_id", 1), ("start_time", 1)], {}),
+            ("next_steps", [("user_id", 1), ("created_at", -1)], {}),
+            ("next_steps", [("user_id", 1), ("meeting_id", 1), ("status", 1)], {}),
+            ("next_steps", [("user_id", 1), ("meeting_id", 1), ("fingerprint", 1)], {}),
+            # Search; the user_id prefix keeps every text query to one user's entries
+            ("meetings", [("user_id", 1), ("title", "text"), ("summary", "text"), ("participants", "text")], {
+                "weights": {"title": 5, "participants": 3, "summary": 1},
+                "name": "meetings_text",
+            }),
+            ("next_steps", [("user_id", 1), ("original_text", "text"), ("edited_text", "text")], {
+                "name": "next_steps_text",
+            }),
+            ("jobs", [("status", 1), ("run_at", 1)], {}),
+            ("jobs", [("status", 1), ("locked_until", 1)], {}),
+            ("calendar_channels", "user_id", {}),
+            ("calendar_channels", [("expiration", 1), ("renew_after", 1)], {}),
+        ]
+        for collection, keys, options in indexes:
+            try:
+                await database[collection].create_index(keys, **options)
+            except Exception as e:
+                print(f"Could not ensure index {options.get('name', keys)} on {collection}: {e}")
 
     def close(self):
+        if self._connect_task and not self._connect_task.done():
+            self._connect_task.cancel()
         if self.client:
             self.client.close()
             print("Disconnected from MongoDB")
@@ -71,4 +250,12 @@ class Database:
 db = Database()
 
 async def get_database():
+    if not await db.wait_ready(settings.DB_READY_TIMEOUT):
+        # Imported here so scripts can use the client without FastAPI
+        from fastapi import HTTPException, status
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database is still starting, please try again shortly",
+            headers={"Retry-After": "1"},
+        )
     return db.get_db()
\ No newline at end of file
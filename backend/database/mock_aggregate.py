@@ -0,0 +1,130 @@
+import copy
+from typing import Any, Dict, Iterable, List
+from .mock_query import compile_filter, get_path
+from .mock_text import TEXT_SCORE
+
+_NOTHING = object()
+
+def _expr(expression: Any):
+    """
+    Compiles an aggregation expression: "$field" paths, {"$meta":
+    "textScore"}, literal values, or documents of expressions (used for
+    compound group keys).
+    """
+    if isinstance(expression, str) and expression.startswith("$"):
+        path = expression[1:]
+        return lambda doc: get_path(doc, path)
+    if expression == {"$meta": "textScore"}:
+        return lambda doc: doc.get(TEXT_SCORE)
+    if isinstance(expression, dict):
+        parts = {key: _expr(value) for key, value in expression.items()}
+        return lambda doc: {key: part(doc) for key, part in parts.items()}
+    return lambda doc: expression
+
+def _freeze(value: Any):
+    if isinstance(value, dict):
+        return tuple((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _accumulator(spec: Dict[str, Any]):
+    (op, expression), = spec.items()
+    get = _expr(expression)
+    if op == "$sum":
+        return 0, lambda acc, doc: acc + (get(doc) or 0), None
+    if op == "$avg":
+        return (0, 0), lambda acc, doc: (acc[0] + (get(doc) or 0), acc[1] + 1), lambda acc: acc[0] / acc[1] if acc[1] else None
+    if op == "$min":
+        return None, lambda acc, doc: get(doc) if acc is None or (get(doc) is not None and get(doc) < acc) else acc, None
+    if op == "$max":
+        return None, lambda acc, doc: get(doc) if acc is None or (get(doc) is not None and get(doc) > acc) else acc, None
+    if op == "$first":
+        return _NOTHING, lambda acc, doc: get(doc) if acc is _NOTHING else acc, lambda acc: None if acc is _NOTHING else acc
+    if op == "$last":
+        return None, lambda acc, doc: get(doc), None
+    if op == "$push":
+        return (), lambda acc, doc: acc + (get(doc),), list
+    if op == "$addToSet":
+        return (), lambda acc, doc: acc if get(doc) in acc else acc + (get(doc),), list
+    raise ValueError(f"Unsupported accumulator: {op}")
+
+def _group(docs: Iterable[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    key_of = _expr(spec["_id"])
+    accumulators = {
+        field: _accumulator(acc_spec)
+        for field, acc_spec in spec.items() if field != "_id"
+    }
+    groups: Dict[Any, Dict[str, Any]] = {}
+    for doc in docs:
+        key = key_of(doc)
+        frozen = _freeze(key)
+        group = groups.get(frozen)
+        if group is None:
+            group = {"_id": key, **{field: acc[0] for field, acc in accumulators.items()}}
+            groups[frozen] = group
+        for field, (_, step, _) in accumulators.items():
+            group[field] = step(group[field], doc)
+    for group in groups.values():
+        for field, (_, _, finish) in accumulators.items():
+            if finish:
+                group[field] = finish(group[field])
+    return list(groups.values())
+
+def _sort(docs: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    for key, direction in reversed(list(spec.items())):
+        if direction == {"$meta": "textScore"}:
+            # Best match first, as on a real server
+            docs.sort(key=lambda d: d.get(TEXT_SCORE) or 0.0, reverse=True)
+            continue
+        docs.sort(key=lambda d: (get_path(d, key) is not None, get_path(d, key)), reverse=direction == -1)
+    return docs
+
+def _project(docs: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    include_id = spec.get("_id", 1)
+    fields = {key: value for key, value in spec.items() if key != "_id"}
+    if fields and all(value in (0, False) for value in fields.values()):
+        return [{k: v for k, v in doc.items() if k not in fields and (include_id or k != "_id")} for doc in docs]
+    computed = {key: (_expr(value) if not isinstance(value, (bool, int)) else None) for key, value in fields.items()}
+    result = []
+    for doc in docs:
+        projected = {"_id": doc.get("_id")} if include_id and "_id" in doc else {}
+        for key, expression in computed.items():
+            projected[key] = expression(doc) if expression else get_path(doc, key)
+        result.append(projected)
+    return result
+
+def run_pipeline(docs: Iterable[Dict[str, Any]], pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Evaluates an aggregation pipeline over documents. Supports $match,
+    $group, $sort, $skip, $limit, $project, $addFields and $count.
+    Documents matched by a $text query carry their score in TEXT_SCORE.
+    """
+    result: Any = docs
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            predicate = compile_filter(spec)
+            result = [doc for doc in result if predicate(doc)]
+        elif name == "$group":
+            result = _group(result, spec)
+        elif name == "$sort":
+            result = _sort(list(result), spec)
+        elif name == "$skip":
+            result = list(result)[spec:]
+        elif name == "$limit":
+            result = list(result)[:spec]
+        elif name == "$project":
+            result = _project(list(result), spec)
+        elif name == "$addFields":
+            fields = {key: _expr(value) for key, value in spec.items()}
+            result = [{**doc, **{key: get(doc) for key, get in fields.items()}} for doc in result]
+        elif name == "$count":
+            count = len(list(result))
+            result = [{spec: count}] if count else []
+        else:
+            raise ValueError(f"Unsupported aggregation stage: {name}")
+    return [
+        copy.deepcopy({key: value for key, value in doc.items() if key != TEXT_SCORE} if TEXT_SCORE in doc else doc)
+        for doc in result
+    ]
@@ -0,0 +1,103 @@
+import asyncio
+import copy
+import threading
+from typing import Any, Dict, List, Optional
+from .mock_query import compile_filter
+
+class MockChangeStream:
+    """
+    Async iterator over change events, shaped like MongoDB change stream
+    documents so consumers work unchanged against either engine.
+    """
+
+    def __init__(self, hub: "MockChangeHub", pipeline: Optional[List[Dict[str, Any]]], max_queue: int = 1000):
+        self._hub = hub
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._predicates = [
+            compile_filter(stage["$match"]) for stage in (pipeline or []) if "$match" in stage
+        ]
+        self._closed = False
+
+    def _offer(self, change: Dict[str, Any]):
+        for predicate in self._predicates:
+            if not predicate(change):
+                return
+        try:
+            self._loop.call_soon_threadsafe(self._put, change)
+        except RuntimeError:
+            # The consumer's loop has shut down
+            self._hub.unregister(self)
+
+    def _put(self, change):
+        if self._queue.full():
+            # Slow consumer: drop the oldest change rather than block writers
+            self._queue.get_nowait()
+        self._queue.put_nowait(change)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._closed:
+            raise StopAsyncIteration
+        change = await self._queue.get()
+        if change is None:
+            raise StopAsyncIteration
+        return change
+
+    async def close(self):
+        if not self._closed:
+            self._closed = True
+            self._hub.unregister(self)
+            self._put(None)
+
+class MockChangeHub:
+    """
+    In-process pub/sub fed by the fallback engines' write paths.
+    """
+
+    def __init__(self, db_name: str = "daily_action_hub"):
+        self.db_name = db_name
+        self._streams: List[MockChangeStream] = []
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return bool(self._streams)
+
+    def watch(self, pipeline=None, **kwargs) -> MockChangeStream:
+        stream = MockChangeStream(self, pipeline)
+        with self._lock:
+            self._streams.append(stream)
+        return stream
+
+    def unregister(self, stream: MockChangeStream):
+        with self._lock:
+            if stream in self._streams:
+                self._streams.remove(stream)
+
+    def publish(self, operation: str, collection: str, document: Dict[str, Any]):
+        if not self._streams:
+            return
+        change = {
+            "operationType": operation,
+            "ns": {"db": self.db_name, "coll": collection},
+            "documentKey": {"_id": document["_id"]},
+        }
+        if operation == "delete":
+            change["fullDocumentBeforeChange"] = copy.deepcopy(document)
+        else:
+            change["fullDocument"] = copy.deepcopy(document)
+        with self._lock:
+            streams = list(self._streams)
+        for stream in streams:
+            stream._offer(change)
+
+change_hub = MockChangeHub()
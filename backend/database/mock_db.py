@@ -2,8 +2,16 @@ import asyncio
 from typing import List, Optional, Any, Dict
 from bson import ObjectId
 from datetime import datetime
+from contextlib import nullcontext
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from .mock_query import compile_filter, apply_update, equality_fields, bson_copy
+from .mock_aggregate import run_pipeline
+from .mock_text import MockTextIndex, TEXT_SCORE, ranked_limit, split_text_filter, text_index_spec
+from .mock_changes import change_hub
 import copy
 import logging
+import threading
 
 logger = logging.getLogger("uvicorn")
 
@@ -14,107 +22,438 @@ class MockAsyncCursor:
 
     def sort(self, key_or_list, direction=None):
         if isinstance(key_or_list, str):
-            self._sort = (key_or_list, direction or 1)
+            self._sort = [(key_or_list, direction or 1)]
         elif isinstance(key_or_list, list) and len(key_or_list) > 0:
-            self._sort = key_or_list[0]
+            self._sort = list(key_or_list)
         return self
 
-    async def to_list(self, length: int):
+    async def to_list(self, length: Optional[int] = None):
         result = list(self.data)
         if self._sort:
-            key, direction = self._sort
-            reverse = direction == -1
-            # Handle sorting with missing keys
-            result.sort(key=lambda x: x.get(key) if x.get(key) is not None else "", reverse=reverse)
+            # Stable sorts applied last key first give a multi-key ordering
+            for key, direction in reversed(self._sort):
+                reverse = direction == -1
+                # Handle sorting with missing keys
+                result.sort(key=lambda x: x.get(key) if x.get(key) is not None else "", reverse=reverse)
         return result[:length]
 
+_NO_ID = object()
+
+def _hashable(value):
+    if isinstance(value, list):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    return value
+
+class MockUniqueIndex:
+    """
+    Unique index over one or more fields, kept as a key -> _id map.
+    Documents that do not match `partial_filter` are not indexed.
+    """
+
+    def __init__(self, fields: List[str], partial_filter: Optional[Dict[str, Any]] = None):
+        self.fields = fields
+        self.partial_filter = partial_filter
+        self._partial = compile_filter(partial_filter) if partial_filter else None
+        self.entries: Dict[Any, Any] = {}
+
+    def key_for(self, doc):
+        if self._partial and not self._partial(doc):
+            return None
+        return tuple(_hashable(doc.get(field)) for field in self.fields)
+
+    def lookup_key(self, equalities: Dict[str, Any]):
+        """
+        Returns the index key for a query whose equality conditions cover
+        every indexed field, or None if the index cannot serve the query.
+        """
+        if not all(field in equalities for field in self.fields):
+            return None
+        key_doc = {field: equalities[field] for field in self.fields}
+        if self._partial and not self._partial(key_doc):
+            return None
+        return tuple(_hashable(key_doc[field]) for field in self.fields)
+
+    def check(self, doc):
+        key = self.key_for(doc)
+        if key is None:
+            return
+        owner = self.entries.get(key, doc.get("_id"))
+        if owner != doc.get("_id"):
+            raise DuplicateKeyError(f"E11000 duplicate key error index: {'_'.join(self.fields)} dup key: {key}")
+
+    def add(self, doc):
+        key = self.key_for(doc)
+        if key is not None:
+            self.entries[key] = doc["_id"]
+
+    def remove(self, doc):
+        key = self.key_for(doc)
+        if key is not None and self.entries.get(key) == doc.get("_id"):
+            del self.entries[key]
+
+def bulk_write_result(matched: int, inserted: int, upserted_ids: Dict[int, Any]):
+    return type('BulkWriteResult', (), {
+        'matched_count': matched,
+        'modified_count': matched,
+        'inserted_count': inserted,
+        'upserted_count': len(upserted_ids),
+        'upserted_ids': upserted_ids,
+    })()
+
 class MockCollection:
-    def __init__(self, name, db_data):
+    def __init__(self, name, db_data, persistence=None, lock=None, indexes=None, id_map=None, text_indexes=None):
         self.name = name
         self.db_data = db_data
+        self.persistence = persistence
+        # Every operation runs without awaiting while it holds the lock, so a
+        # plain threading lock serialises both threads and asyncio tasks.
+        self._lock = lock or nullcontext()
+        self.indexes: Dict[tuple, MockUniqueIndex] = indexes if indexes is not None else {}
+        # _id -> document, rebuilt whenever it falls out of step with the list
+        self._id_map: Dict[Any, Dict[str, Any]] = id_map if id_map is not None else {}
+        # Collection name -> text index, shared so a later create_index is seen
+        self._text_indexes: Dict[str, MockTextIndex] = text_indexes if text_indexes is not None else {}
         if name not in self.db_data:
             self.db_data[name] = []
 
-    async def find_one(self, filter: Dict[str, Any]):
+    def _persist(self, item):
+        if self.persistence:
+            self.persistence.log_put(self.name, item, self.db_data)
+
+    def _persist_delete(self, doc_id):
+        if self.persistence:
+            self.persistence.log_delete(self.name, doc_id, self.db_data)
+
+    async def create_index(self, keys, unique: bool = False, partialFilterExpression: Optional[Dict[str, Any]] = None, **kwargs):
+        fields = [keys] if isinstance(keys, str) else [key for key, _ in keys]
+        name = "_".join(fields)
+        if not isinstance(keys, str) and any(direction == "text" for _, direction in keys):
+            # One text index per collection, as on a real server
+            with self._lock:
+                index = MockTextIndex(*text_index_spec(keys, kwargs.get("weights")))
+                for item in self.db_data[self.name]:
+                    index.add(item)
+                self._text_indexes[self.name] = index
+            return kwargs.get("name", name)
+        if not unique:
+            # Non-unique indexes only matter for performance on a real server
+            return name
+        with self._lock:
+            index = MockUniqueIndex(fields, partialFilterExpression)
+            for item in self.db_data[self.name]:
+                index.check(item)
+                index.add(item)
+            self.indexes[tuple(fields)] = index
+        return name
+
+    def _check_unique(self, doc):
+        for index in self.indexes.values():
+            index.check(doc)
+
+    def _index_add(self, doc):
+        self._id_map[doc["_id"]] = doc
+        for index in self.indexes.values():
+            index.add(doc)
+        self._text_add(doc)
+
+    def _index_remove(self, doc):
+        self._id_map.pop(doc["_id"], None)
+        for index in self.indexes.values():
+            index.remove(doc)
+        text_index = self._text_indexes.get(self.name)
+        if text_index is not None:
+            text_index.remove(doc["_id"])
+
+    def _text_add(self, doc):
+        # Adding again replaces the document's previous terms
+        text_index = self._text_indexes.get(self.name)
+        if text_index is not None:
+            text_index.add(doc)
+
+    def _text_search(self, filter: Dict[str, Any], limit: Optional[int] = None):
+        """
+        Returns (document, score) for the documents matching a filter with
+        a $text condition, best match first, from the collection's text index.
+        """
+        search, rest = split_text_filter(filter)
+        text_index = self._text_indexes.get(self.name)
+        if text_index is None:
+            raise OperationFailure("text index required for $text query", code=27)
+        return text_index.search(search, rest, limit)
+
+    def _ensure_id_map(self):
         data = self.db_data[self.name]
-        for item in data:
-            if self._matches(item, filter):
-                return copy.deepcopy(item)
+        if len(self._id_map) != len(data):
+            self._id_map.clear()
+            self._id_map.update((item["_id"], item) for item in data)
+
+    def _candidates(self, filter: Dict[str, Any]):
+        """
+        Picks the smallest set of documents that can match: an _id lookup,
+        a unique index lookup, or a full scan.
+        """
+        if not filter:
+            return self.db_data[self.name]
+        self._ensure_id_map()
+        doc_id = filter.get("_id", _NO_ID)
+        if doc_id is not _NO_ID:
+            if isinstance(doc_id, dict):
+                if set(doc_id) == {"$in"}:
+                    found = (self._id_map.get(i) for i in dict.fromkeys(doc_id["$in"]))
+                    return [item for item in found if item is not None]
+                if set(doc_id) == {"$eq"}:
+                    doc_id = doc_id["$eq"]
+                else:
+                    return self.db_data[self.name]
+            item = self._id_map.get(doc_id)
+            return [item] if item is not None else []
+        if self.indexes:
+            equalities = equality_fields(filter)
+            for index in self.indexes.values():
+                key = index.lookup_key(equalities)
+                if key is not None:
+                    item = self._id_map.get(index.entries.get(key))
+                    return [item] if item is not None else []
+        return self.db_data[self.name]
+
+    def _find_matching(self, filter: Dict[str, Any]):
+        if "$text" in filter:
+            return [item for item, _ in self._text_search(filter)]
+        predicate = compile_filter(filter)
+        return [item for item in self._candidates(filter) if predicate(item)]
+
+    def _update_in_place(self, item, update):
+        """
+        Applies an update atomically: the result is checked against unique
+        indexes before the stored document is touched.
+        """
+        updated = copy.deepcopy(item)
+        apply_update(updated, update)
+        if self.indexes:
+            for index in self.indexes.values():
+                index.remove(item)
+            try:
+                self._check_unique(updated)
+            except DuplicateKeyError:
+                for index in self.indexes.values():
+                    index.add(item)
+                raise
+        item.clear()
+        item.update(updated)
+        for index in self.indexes.values():
+            index.add(item)
+        self._text_add(item)
+        self._persist(item)
+        change_hub.publish("update", self.name, item)
+
+    def _insert(self, doc):
+        self._ensure_id_map()
+        if doc["_id"] in self._id_map:
+            raise DuplicateKeyError(f"E11000 duplicate key error index: _id_ dup key: {doc['_id']}")
+        self._check_unique(doc)
+        self.db_data[self.name].append(doc)
+        self._index_add(doc)
+        self._persist(doc)
+        change_hub.publish("insert", self.name, doc)
+
+    async def find_one(self, filter: Dict[str, Any]):
+        predicate = compile_filter(filter)
+        with self._lock:
+            for item in self._candidates(filter):
+                if predicate(item):
+                    return copy.deepcopy(item)
         return None
 
-    def find(self, filter: Dict[str, Any]):
-        data = self.db_data[self.name]
-        matches = [copy.deepcopy(item) for item in data if self._matches(item, filter)]
+    def find(self, filter: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            matches = [copy.deepcopy(item) for item in self._find_matching(filter or {})]
         return MockAsyncCursor(matches)
 
+    async def count_documents(self, filter: Dict[str, Any]):
+        with self._lock:
+            return len(self._find_matching(filter))
+
+    def aggregate(self, pipeline: List[Dict[str, Any]]):
+        with self._lock:
+            # A leading $match can use the _id map, unique and text indexes
+            if pipeline and "$match" in pipeline[0] and "$text" in pipeline[0]["$match"]:
+                pipeline, match = pipeline[1:], pipeline[0]["$match"]
+                docs = [{**item, TEXT_SCORE: score} for item, score in self._text_search(match, ranked_limit(pipeline))]
+            elif pipeline and "$match" in pipeline[0]:
+                docs = self._find_matching(pipeline[0]["$match"])
+                pipeline = pipeline[1:]
+            else:
+                docs = self.db_data[self.name]
+            result = run_pipeline(docs, pipeline)
+        return MockAsyncCursor(result)
+
     async def insert_one(self, document: Dict[str, Any]):
         if "_id" not in document:
             document["_id"] = ObjectId()
-        self.db_data[self.name].append(copy.deepcopy(document))
+        stored = bson_copy(document)
+        with self._lock:
+            self._insert(stored)
         return type('InsertOneResult', (), {'inserted_id': document["_id"]})()
 
+    async def find_one_and_update(self, filter: Dict[str, Any], update: Dict[str, Any], sort=None, return_document: bool = False):
+        with self._lock:
+            candidates = self._find_matching(filter)
+            if not candidates:
+                return None
+            if sort:
+                for key, direction in reversed(sort):
+                    candidates.sort(key=lambda x: x.get(key) if x.get(key) is not None else "", reverse=direction == -1)
+            item = candidates[0]
+            before = copy.deepcopy(item)
+            self._update_in_place(item, update)
+            # return_document mirrors pymongo's ReturnDocument (AFTER is True)
+            return copy.deepcopy(item) if return_document else before
+
+    async def update_many(self, filter: Dict[str, Any], update: Dict[str, Any]):
+        with self._lock:
+            matches = self._find_matching(filter)
+            for item in matches:
+                self._update_in_place(item, update)
+        return type('UpdateResult', (), {'matched_count': len(matches), 'modified_count': len(matches)})()
+
     async def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
-        data = self.db_data[self.name]
-        found = False
-        for item in data:
-            if self._matches(item, filter):
-                self._apply_update(item, update)
-                found = True
-                break
-        
-        if not found and upsert:
-            new_doc = filter.copy()
-            if "$setOnInsert" in update:
-                new_doc.update(update["$setOnInsert"])
-            self._apply_update(new_doc, update)
-            if "_id" not in new_doc:
-                new_doc["_id"] = ObjectId()
-            self.db_data[self.name].append(new_doc)
+        predicate = compile_filter(filter)
+        with self._lock:
+            for item in self._candidates(filter):
+                if predicate(item):
+                    self._update_in_place(item, update)
+                    return type('UpdateResult', (), {'matched_count': 1, 'modified_count': 1, 'upserted_id': None})()
+            
+            if upsert:
+                new_doc = {}
+                apply_update(new_doc, {"$set": equality_fields(filter)})
+                apply_update(new_doc, update, is_insert=True)
+                if "_id" not in new_doc:
+                    new_doc["_id"] = ObjectId()
+                self._insert(new_doc)
+                return type('UpdateResult', (), {'matched_count': 0, 'modified_count': 0, 'upserted_id': new_doc["_id"]})()
+        return type('UpdateResult', (), {'matched_count': 0, 'modified_count': 0, 'upserted_id': None})()
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True):
+        """
+        Applies InsertOne and UpdateOne requests in order, holding the
+        collection lock for the whole batch.
+        """
+        matched, inserted, upserted_ids = 0, 0, {}
+        with self._lock:
+            for position, request in enumerate(requests):
+                if isinstance(request, InsertOne):
+                    await self.insert_one(request._doc)
+                    inserted += 1
+                elif isinstance(request, UpdateOne):
+                    result = await self.update_one(request._filter, request._doc, upsert=bool(request._upsert))
+                    matched += result.matched_count
+                    if result.upserted_id is not None:
+                        upserted_ids[position] = result.upserted_id
+                else:
+                    raise NotImplementedError(f"Unsupported bulk write request: {type(request).__name__}")
+        return bulk_write_result(matched, inserted, upserted_ids)
+
+    async def delete_one(self, filter: Dict[str, Any]):
+        predicate = compile_filter(filter)
+        with self._lock:
+            data = self.db_data[self.name]
+            for item in self._candidates(filter):
+                if predicate(item):
+                    del data[next(i for i, x in enumerate(data) if x is item)]
+                    self._index_remove(item)
+                    self._persist_delete(item["_id"])
+                    change_hub.publish("delete", self.name, item)
+                    return type('DeleteResult', (), {'deleted_count': 1})()
+        return type('DeleteResult', (), {'deleted_count': 0})()
+
+    async def delete_many(self, filter: Dict[str, Any]):
+        with self._lock:
+            data = self.db_data[self.name]
+            removed = self._find_matching(filter)
+            if removed:
+                removed_ids = {id(item) for item in removed}
+                data[:] = [item for item in data if id(item) not in removed_ids]
+                for item in removed:
+                    self._index_remove(item)
+                    self._persist_delete(item["_id"])
+                    change_hub.publish("delete", self.name, item)
+        return type('DeleteResult', (), {'deleted_count': len(removed)})()
 
     def _matches(self, item, filter):
-        for key, value in filter.items():
-            item_val = item.get(key)
-            
-            if isinstance(value, dict):
-                # Handle simple operators
-                if "$gte" in value:
-                    if item_val is None or not (item_val >= value["$gte"]):
-                        return False
-                if "$lte" in value:
-                    if item_val is None or not (item_val <= value["$lte"]):
-                        return False
-            elif item_val != value:
-                return False
-        return True
-
-    def _apply_update(self, item, update):
-        if "$set" in update:
-            item.update(update["$set"])
+        return compile_filter(filter)(item)
+
+    def _apply_update(self, item, update, is_insert: bool = False):
+        apply_update(item, update, is_insert)
 
 class MockDB:
     # Static storage to persist across requests in the same process
     _storage = {}
+    # Optional write-ahead log + snapshot store, see mock_persistence.py
+    _persistence = None
+    # Per-collection locks and unique indexes, shared like _storage
+    _locks: Dict[str, threading.RLock] = {}
+    _locks_guard = threading.Lock()
+    _indexes: Dict[str, Dict[tuple, MockUniqueIndex]] = {}
+    _id_maps: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+    _text_indexes: Dict[str, MockTextIndex] = {}
+    # Collection locks can be disabled for single-threaded use
+    thread_safe = True
 
     def __init__(self):
         pass
 
+    def _collection(self, name):
+        lock = None
+        if self.thread_safe:
+            lock = self._locks.get(name)
+            if lock is None:
+                with self._locks_guard:
+                    lock = self._locks.setdefault(name, threading.RLock())
+        indexes = self._indexes.setdefault(name, {})
+        id_map = self._id_maps.setdefault(name, {})
+        return MockCollection(name, self._storage, self._persistence, lock, indexes, id_map, self._text_indexes)
+
     def __getattr__(self, name):
-        return MockCollection(name, self._storage)
+        return self._collection(name)
+
+    def __getitem__(self, name):
+        return self._collection(name)
+
+    async def command(self, cmd):
+        return {"ok": 1.0}
+
+    def watch(self, pipeline=None, **kwargs):
+        return change_hub.watch(pipeline, **kwargs)
 
 class MockAdmin:
     async def command(self, cmd):
         return {"ok": 1.0}
 
 class MockClient:
-    def __init__(self, uri):
+    def __init__(self, uri, persist_path: Optional[str] = None, compact_every: int = 1000, fsync: bool = False, thread_safe: bool = True):
         logger.warning(f"Using MockClient for MongoDB at {uri}")
+        MockDB.thread_safe = thread_safe
+        if persist_path:
+            from .mock_persistence import MockPersistence
+            persistence = MockPersistence(persist_path, compact_every=compact_every, fsync=fsync)
+            MockDB._storage.clear()
+            MockDB._storage.update(persistence.load())
+            MockDB._indexes.clear()
+            MockDB._id_maps.clear()
+            MockDB._text_indexes.clear()
+            MockDB._persistence = persistence
         self.db = MockDB()
 
     def get_default_database(self):
         return self.db
     
     def close(self):
-        pass
+        if MockDB._persistence:
+            MockDB._persistence.close(MockDB._storage)
+            MockDB._persistence = None
 
     @property
     def admin(self):
@@ -0,0 +1,223 @@
+import mmap
+import os
+import struct
+import threading
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import bson
+
+logger = logging.getLogger("uvicorn")
+
+SNAPSHOT_FILE = "snapshot.bson"
+WAL_FILE = "wal.bson"
+# The log being folded into the snapshot while a new one takes writes
+ROTATED_WAL_FILE = "wal.rotated.bson"
+
+class MockPersistence:
+    """
+    Durable storage for the MockDB fallback engine.
+
+    Every write is appended to a write-ahead log as a self-delimiting BSON
+    record ('put' of the full document or 'delete' by _id). Once the log holds
+    `compact_every` records it is set aside and a new one started, and a
+    background thread replays the old log onto the snapshot and writes a
+    fresh one (temp file + atomic rename). Compaction never reads the live
+    store, so writes carry on while it runs. At startup the snapshot is
+    memory-mapped and decoded, then any set-aside log and the current log
+    are replayed on top. A torn record at the end of a log (crash
+    mid-append) is discarded.
+    """
+
+    def __init__(self, path: str, compact_every: int = 1000, fsync: bool = False):
+        self.path = path
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        # Held while a snapshot is written, so only one is at a time
+        self._compact_lock = threading.Lock()
+        self._wal = None
+        self._wal_records = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._compaction: Optional[Future] = None
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.path, SNAPSHOT_FILE)
+
+    @property
+    def wal_path(self) -> str:
+        return os.path.join(self.path, WAL_FILE)
+
+    @property
+    def rotated_wal_path(self) -> str:
+        return os.path.join(self.path, ROTATED_WAL_FILE)
+
+    def _load_snapshot(self):
+        storage: Dict[str, List[Dict[str, Any]]] = {}
+        for record in self._read_records(self.snapshot_path):
+            storage.setdefault(record["c"], []).append(record["d"])
+        # Index by _id so replay is linear in the size of the log
+        positions = {
+            name: {doc["_id"]: i for i, doc in enumerate(docs)}
+            for name, docs in storage.items()
+        }
+        return storage, positions
+
+    def load(self) -> Dict[str, List[Dict[str, Any]]]:
+        storage, positions = self._load_snapshot()
+        # Left behind by a compaction that did not finish
+        rotated = os.path.exists(self.rotated_wal_path)
+        if rotated:
+            for record in self._read_records(self.rotated_wal_path):
+                self._replay(storage, positions, record)
+        valid_wal_bytes = 0
+        for record, end in self._read_records(self.wal_path, with_offsets=True):
+            self._replay(storage, positions, record)
+            self._wal_records += 1
+            valid_wal_bytes = end
+
+        self._open_wal(valid_wal_bytes)
+        if rotated:
+            self._start_compaction()
+        logger.info(f"Loaded MockDB from {self.path} ({self._wal_records} log records replayed)")
+        return storage
+
+    def _replay(self, storage, positions, record):
+        name = record["c"]
+        docs = storage.setdefault(name, [])
+        index = positions.setdefault(name, {})
+        if record["op"] == "put":
+            doc = record["d"]
+            i = index.get(doc["_id"])
+            if i is None:
+                index[doc["_id"]] = len(docs)
+                docs.append(doc)
+            else:
+                docs[i] = doc
+        elif record["op"] == "delete":
+            i = index.pop(record["id"], None)
+            if i is not None:
+                # Swap-remove keeps replay O(1); documents have no stored order
+                last = docs.pop()
+                if i < len(docs):
+                    docs[i] = last
+                    index[last["_id"]] = i
+
+    def _read_records(self, file_path: str, with_offsets: bool = False):
+        if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+            return
+        with open(file_path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                offset = 0
+                size = len(data)
+                while offset + 4 <= size:
+                    (length,) = struct.unpack_from("<i", data, offset)
+                    end = offset + length
+                    if length < 5 or end > size:
+                        logger.warning(f"Discarding torn record at byte {offset} of {file_path}")
+                        break
+                    try:
+                        record = bson.decode(data[offset:end])
+                    except Exception:
+                        logger.warning(f"Discarding corrupt record at byte {offset} of {file_path}")
+                        break
+                    yield (record, end) if with_offsets else record
+                    offset = end
+
+    def _open_wal(self, valid_bytes: int):
+        self._wal = open(self.wal_path, "ab")
+        if self._wal.tell() != valid_bytes:
+            self._wal.truncate(valid_bytes)
+            self._wal.seek(valid_bytes)
+
+    def _append(self, record: Dict[str, Any]):
+        self._wal.write(bson.encode(record))
+        self._wal.flush()
+        if self.fsync:
+            os.fsync(self._wal.fileno())
+        self._wal_records += 1
+
+    def log_put(self, collection: str, document: Dict[str, Any], storage):
+        with self._lock:
+            self._append({"op": "put", "c": collection, "d": document})
+            self._maybe_compact()
+
+    def log_delete(self, collection: str, doc_id: Any, storage):
+        with self._lock:
+            self._append({"op": "delete", "c": collection, "id": doc_id})
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self._wal_records < self.compact_every:
+            return
+        if self._compaction is not None and not self._compaction.done():
+            # The log keeps growing until the running compaction is done
+            return
+        if os.path.exists(self.rotated_wal_path):
+            # An earlier compaction failed; fold that log in before setting
+            # this one aside
+            self._start_compaction()
+            return
+        self._wal.close()
+        os.replace(self.wal_path, self.rotated_wal_path)
+        self._wal = open(self.wal_path, "ab")
+        self._wal_records = 0
+        self._start_compaction()
+
+    def _start_compaction(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mockdb-compact")
+        self._compaction = self._executor.submit(self._fold_rotated_wal)
+
+    def _fold_rotated_wal(self):
+        """
+        Replays the set-aside log onto the snapshot, on the compaction thread.
+        """
+        with self._compact_lock:
+            if not os.path.exists(self.rotated_wal_path):
+                return
+            try:
+                storage, positions = self._load_snapshot()
+                for record in self._read_records(self.rotated_wal_path):
+                    self._replay(storage, positions, record)
+                self._write_snapshot(storage)
+                # The snapshot now covers everything in the set-aside log
+                os.remove(self.rotated_wal_path)
+            except Exception as e:
+                # The log stays set aside and is folded in by the next compaction
+                logger.error(f"MockDB compaction failed: {e}")
+
+    def _write_snapshot(self, storage):
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            for name, docs in storage.items():
+                for doc in docs:
+                    f.write(bson.encode({"c": name, "d": doc}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def compact(self, storage):
+        """
+        Writes the live store to the snapshot and empties the logs. Blocks
+        the caller, so only for when nothing else is writing, such as close.
+        """
+        with self._lock, self._compact_lock:
+            self._write_snapshot(storage)
+            self._wal.truncate(0)
+            self._wal.seek(0)
+            self._wal_records = 0
+            if os.path.exists(self.rotated_wal_path):
+                os.remove(self.rotated_wal_path)
+
+    def close(self, storage):
+        if self._wal is None:
+            return
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.compact(storage)
+        self._wal.close()
+        self._wal = None
@@ -0,0 +1,350 @@
+import copy
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+_MISSING = object()
+
+def bson_copy(value: Any) -> Any:
+    """
+    Deep-copies a value the way BSON stores it: aware datetimes become naive
+    UTC, as MongoDB returns them, so stored and queried instants compare.
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    if isinstance(value, dict):
+        return {key: bson_copy(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [bson_copy(item) for item in value]
+    return copy.deepcopy(value)
+
+def _resolve(doc: Dict[str, Any], parts: List[str]) -> List[Any]:
+    """
+    Returns every value reachable at a dotted path. Arrays met along the way
+    are traversed element-wise, as MongoDB does.
+    """
+    values = [doc]
+    for part in parts:
+        next_values = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    next_values.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit() and int(part) < len(value):
+                    next_values.append(value[int(part)])
+                else:
+                    for element in value:
+                        if isinstance(element, dict) and part in element:
+                            next_values.append(element[part])
+        values = next_values
+        if not values:
+            break
+    return values
+
+def _getter(path: str) -> Callable[[Dict[str, Any]], List[Any]]:
+    if "." not in path:
+        def get(doc):
+            value = doc.get(path, _MISSING)
+            return [] if value is _MISSING else [value]
+        return get
+    parts = path.split(".")
+    return lambda doc: _resolve(doc, parts)
+
+def _any_value(values: List[Any], test: Callable[[Any], bool]) -> bool:
+    # A condition on an array field matches if the array or any element does
+    for value in values:
+        if test(value):
+            return True
+        if isinstance(value, list) and any(test(element) for element in value):
+            return True
+    return False
+
+def _compare(op: Callable[[Any, Any], bool], target: Any) -> Callable[[Any], bool]:
+    def test(value):
+        if value is None:
+            return False
+        try:
+            return op(value, target)
+        except TypeError:
+            # Values of different BSON types never compare
+            return False
+    return test
+
+_TYPE_CHECKS = {
+    "string": lambda v: isinstance(v, str),
+    "bool": lambda v: isinstance(v, bool),
+    "int": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "double": lambda v: isinstance(v, float),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+    "null": lambda v: v is None,
+}
+
+def _eq_values(target: Any) -> Callable[[List[Any]], bool]:
+    if target is None:
+        # {field: null} also matches documents without the field
+        return lambda values: not values or _any_value(values, lambda v: v is None)
+    return lambda values: _any_value(values, lambda v: v == target)
+
+def _in_values(targets: List[Any]) -> Callable[[List[Any]], bool]:
+    try:
+        lookup = set(targets)
+        test = lambda v: _hashable_in(v, lookup, targets)
+    except TypeError:
+        test = lambda v: v in targets
+    match_missing = None in targets
+    return lambda values: (match_missing and not values) or _any_value(values, test)
+
+def _hashable_in(value, lookup, targets):
+    try:
+        return value in lookup
+    except TypeError:
+        return value in targets
+
+def _compile_operators(path: str, spec: Dict[str, Any]) -> Predicate:
+    get = _getter(path)
+    checks: List[Callable[[List[Any]], bool]] = []
+    negations: List[Predicate] = []
+    for op, target in spec.items():
+        if op != "$not":
+            target = bson_copy(target)
+        if op == "$eq":
+            checks.append(_eq_values(target))
+        elif op == "$ne":
+            eq = _eq_values(target)
+            checks.append(lambda values, eq=eq: not eq(values))
+        elif op == "$in":
+            checks.append(_in_values(list(target)))
+        elif op == "$nin":
+            in_ = _in_values(list(target))
+            checks.append(lambda values, in_=in_: not in_(values))
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            operator = {
+                "$gt": lambda a, b: a > b,
+                "$gte": lambda a, b: a >= b,
+                "$lt": lambda a, b: a < b,
+                "$lte": lambda a, b: a <= b,
+            }[op]
+            test = _compare(operator, target)
+            checks.append(lambda values, test=test: _any_value(values, test))
+        elif op == "$exists":
+            expected = bool(target)
+            checks.append(lambda values, expected=expected: bool(values) == expected)
+        elif op == "$type":
+            type_check = _TYPE_CHECKS.get(target)
+            if type_check is None:
+                raise ValueError(f"Unsupported $type: {target}")
+            checks.append(lambda values, type_check=type_check: any(type_check(v) for v in values))
+        elif op == "$size":
+            checks.append(lambda values, size=target: any(isinstance(v, list) and len(v) == size for v in values))
+        elif op == "$not":
+            negations.append(_compile_operators(path, target))
+        else:
+            raise ValueError(f"Unsupported query operator: {op}")
+
+    def predicate(doc):
+        values = get(doc)
+        for check in checks:
+            if not check(values):
+                return False
+        for inner in negations:
+            if inner(doc):
+                return False
+        return True
+
+    scalar_tests = _scalar_tests({op: bson_copy(target) for op, target in spec.items()}) if "." not in path else None
+    if scalar_tests is None:
+        return predicate
+
+    def fast_predicate(doc):
+        # Plain scalar at a top-level field: test it directly and only fall
+        # back to the general path for missing, null or array values
+        value = doc.get(path, _MISSING)
+        if value is _MISSING or value is None or isinstance(value, list):
+            return predicate(doc)
+        try:
+            for test in scalar_tests:
+                if not test(value):
+                    return False
+        except TypeError:
+            return False
+        return True
+    return fast_predicate
+
+def _scalar_tests(spec: Dict[str, Any]) -> Optional[List[Callable[[Any], bool]]]:
+    tests = []
+    for op, target in spec.items():
+        if target is None or isinstance(target, (list, dict)) and op not in ("$in", "$nin"):
+            return None
+        if op == "$eq":
+            tests.append(lambda v, t=target: v == t)
+        elif op == "$ne":
+            tests.append(lambda v, t=target: v != t)
+        elif op == "$gt":
+            tests.append(lambda v, t=target: v > t)
+        elif op == "$gte":
+            tests.append(lambda v, t=target: v >= t)
+        elif op == "$lt":
+            tests.append(lambda v, t=target: v < t)
+        elif op == "$lte":
+            tests.append(lambda v, t=target: v <= t)
+        elif op in ("$in", "$nin"):
+            targets = list(target)
+            try:
+                lookup = set(targets)
+            except TypeError:
+                return None
+            if op == "$in":
+                tests.append(lambda v, lookup=lookup, targets=targets: _hashable_in(v, lookup, targets))
+            else:
+                tests.append(lambda v, lookup=lookup, targets=targets: not _hashable_in(v, lookup, targets))
+        else:
+            return None
+    return tests
+
+def compile_filter(filter: Optional[Dict[str, Any]]) -> Predicate:
+    """
+    Compiles a MongoDB filter into a predicate once, so matching a collection
+    does not re-interpret the filter for every document.
+    """
+    if not filter:
+        return lambda doc: True
+
+    predicates: List[Predicate] = []
+    for key, value in filter.items():
+        if key == "$and":
+            subs = [compile_filter(sub) for sub in value]
+            predicates.append(lambda doc, subs=subs: all(p(doc) for p in subs))
+        elif key == "$or":
+            subs = [compile_filter(sub) for sub in value]
+            predicates.append(lambda doc, subs=subs: any(p(doc) for p in subs))
+        elif key == "$nor":
+            subs = [compile_filter(sub) for sub in value]
+            predicates.append(lambda doc, subs=subs: not any(p(doc) for p in subs))
+        elif isinstance(value, dict) and value and all(k.startswith("$") for k in value):
+            predicates.append(_compile_operators(key, value))
+        elif "." not in key and not isinstance(value, (dict, list)) and value is not None:
+            # Fast path for the common top-level equality
+            predicates.append(_top_level_eq(key, bson_copy(value)))
+        else:
+            get = _getter(key)
+            eq = _eq_values(bson_copy(value))
+            predicates.append(lambda doc, get=get, eq=eq: eq(get(doc)))
+
+    if len(predicates) == 1:
+        return predicates[0]
+    if len(predicates) == 2:
+        first, second = predicates
+        return lambda doc: first(doc) and second(doc)
+
+    def conjunction(doc):
+        for p in predicates:
+            if not p(doc):
+                return False
+        return True
+    return conjunction
+
+def _top_level_eq(key, value) -> Predicate:
+    def predicate(doc):
+        found = doc.get(key, _MISSING)
+        if found == value:
+            return True
+        return isinstance(found, list) and value in found
+    return predicate
+
+def equality_fields(filter: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the plain field == value conditions of a filter. These seed the
+    document created by an upsert and drive index selection.
+    """
+    fields = {}
+    for key, value in filter.items():
+        if key.startswith("$"):
+            continue
+        if isinstance(value, dict) and value and all(k.startswith("$") for k in value):
+            if set(value) == {"$eq"}:
+                fields[key] = value["$eq"]
+            continue
+        fields[key] = value
+    return fields
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any):
+    parts = path.split(".")
+    target = doc
+    for part in parts[:-1]:
+        child = target.get(part)
+        if not isinstance(child, dict):
+            child = {}
+            target[part] = child
+        target = child
+    target[parts[-1]] = value
+
+def get_path(doc: Dict[str, Any], path: str, default: Any = None) -> Any:
+    target = doc
+    for part in path.split("."):
+        if not isinstance(target, dict) or part not in target:
+            return default
+        target = target[part]
+    return target
+
+def _unset_path(doc: Dict[str, Any], path: str):
+    parts = path.split(".")
+    target = doc
+    for part in parts[:-1]:
+        target = target.get(part)
+        if not isinstance(target, dict):
+            return
+    target.pop(parts[-1], None)
+
+def _each(value: Any) -> List[Any]:
+    if isinstance(value, dict) and "$each" in value:
+        return list(value["$each"])
+    return [value]
+
+def apply_update(doc: Dict[str, Any], update: Dict[str, Any], is_insert: bool = False):
+    """
+    Applies MongoDB update operators to `doc` in place.
+    """
+    for op, fields in update.items():
+        if op == "$set":
+            for path, value in fields.items():
+                _set_path(doc, path, bson_copy(value))
+        elif op == "$setOnInsert":
+            if is_insert:
+                for path, value in fields.items():
+                    _set_path(doc, path, bson_copy(value))
+        elif op == "$unset":
+            for path in fields:
+                _unset_path(doc, path)
+        elif op == "$inc":
+            for path, amount in fields.items():
+                _set_path(doc, path, get_path(doc, path, 0) + amount)
+        elif op == "$push":
+            for path, value in fields.items():
+                current = get_path(doc, path)
+                items = list(current) if isinstance(current, list) else []
+                items.extend(bson_copy(_each(value)))
+                _set_path(doc, path, items)
+        elif op == "$addToSet":
+            for path, value in fields.items():
+                current = get_path(doc, path)
+                items = list(current) if isinstance(current, list) else []
+                for element in bson_copy(_each(value)):
+                    if element not in items:
+                        items.append(element)
+                _set_path(doc, path, items)
+        elif op == "$pull":
+            for path, value in fields.items():
+                current = get_path(doc, path)
+                if isinstance(current, list):
+                    if isinstance(value, dict):
+                        test = compile_filter({"v": value})
+                        _set_path(doc, path, [e for e in current if not test({"v": e})])
+                    else:
+                        _set_path(doc, path, [e for e in current if e != value])
+        else:
+            raise ValueError(f"Unsupported update operator: {op}")
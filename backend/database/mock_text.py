@@ -0,0 +1,244 @@
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pymongo.errors import OperationFailure
+from .mock_query import compile_filter, equality_fields, get_path
+
+# Hidden field carrying a document's score through an aggregation pipeline,
+# read by {"$meta": "textScore"} and stripped from the results
+TEXT_SCORE = "__text_score__"
+
+_TOKEN = re.compile(r"\w+")
+_QUERY_PART = re.compile(r'"([^"]*)"|(-?)(\S+)')
+
+# Mongo's English text indexes skip stop words too; a short list covers the
+# words that would otherwise match nearly every document
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have in into is it its of on or "
+    "that the their then there these this to was were will with".split()
+)
+
+def _stem(token: str) -> str:
+    # Just enough stemming for plurals to find their singulars
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(token) for token in _TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+def _strings(value: Any) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+def parse_search(search: str) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Splits a $search string the way Mongo does: bare words match any
+    document containing one of them, "-word" excludes documents containing
+    it and "quoted phrases" must all appear.
+    """
+    terms, excluded, phrases = [], [], []
+    for phrase, negated, word in _QUERY_PART.findall(search):
+        if phrase:
+            phrases.append(phrase.lower())
+            terms.extend(tokenize(phrase))
+        elif negated:
+            excluded.extend(tokenize(word))
+        else:
+            terms.extend(tokenize(word))
+    return list(dict.fromkeys(terms)), excluded, phrases
+
+def split_text_filter(filter: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Returns the $search string of a $text filter and the rest of the filter.
+    """
+    spec = filter["$text"]
+    if not isinstance(spec, dict) or not isinstance(spec.get("$search"), str):
+        raise OperationFailure("$text requires a $search string", code=2)
+    return spec["$search"], {key: value for key, value in filter.items() if key != "$text"}
+
+def text_index_spec(keys: List[Tuple[str, Any]], weights: Optional[Dict[str, int]]) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Splits a text index's keys into the weights of its text fields and its
+    prefix fields, which queries must match by equality.
+    """
+    weights = weights or {}
+    text_weights = {field: weights.get(field, 1) for field, direction in keys if direction == "text"}
+    return text_weights, [field for field, direction in keys if direction != "text"]
+
+def ranked_limit(pipeline: List[Dict[str, Any]]) -> Optional[int]:
+    """
+    The number of matches a pipeline keeps when it starts by sorting $text
+    matches by score and limiting them, so only those need to be fetched.
+    """
+    if len(pipeline) >= 2 and "$sort" in pipeline[0] and "$limit" in pipeline[1]:
+        if list(pipeline[0]["$sort"].values()) == [{"$meta": "textScore"}]:
+            return pipeline[1]["$limit"]
+    return None
+
+class _Partition:
+    """
+    Postings of the documents sharing one set of prefix values. Documents
+    get int slots, which are much cheaper to hash than ObjectIds.
+    """
+
+    def __init__(self):
+        # term -> slot -> weighted term frequency
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.slots: Dict[Any, int] = {}
+        self.docs: List[Optional[Dict[str, Any]]] = []
+        self.lengths: List[float] = []
+        # The terms of each slot, since a document may be changed in place
+        # before it is re-added
+        self.terms: List[Tuple[str, ...]] = []
+        self.free: List[int] = []
+        self.total_length = 0.0
+
+    def add(self, doc: Dict[str, Any], frequencies: Dict[str, float], length: float):
+        if self.free:
+            slot = self.free.pop()
+            self.docs[slot], self.lengths[slot], self.terms[slot] = doc, length, tuple(frequencies)
+        else:
+            slot = len(self.docs)
+            self.docs.append(doc)
+            self.lengths.append(length)
+            self.terms.append(tuple(frequencies))
+        self.slots[doc["_id"]] = slot
+        for token, frequency in frequencies.items():
+            self.postings.setdefault(token, {})[slot] = frequency
+        self.total_length += length
+
+    def remove(self, doc_id: Any):
+        slot = self.slots.pop(doc_id)
+        for token in self.terms[slot]:
+            postings = self.postings[token]
+            del postings[slot]
+            if not postings:
+                del self.postings[token]
+        self.total_length -= self.lengths[slot]
+        self.docs[slot], self.terms[slot] = None, ()
+        self.free.append(slot)
+
+    def score(self, terms: List[str], excluded: List[str], k1: float, b: float) -> Dict[int, float]:
+        count = len(self.slots)
+        if not count:
+            return {}
+        lengths = self.lengths
+        # BM25's length normalisation k1 * (1 - b + b * length / average
+        # length), as base + scale * length
+        base, scale = k1 * (1 - b), k1 * b * count / self.total_length
+        scores: Dict[int, float] = {}
+        get = scores.get
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            boost = idf * (k1 + 1)
+            for slot, frequency in postings.items():
+                scores[slot] = get(slot, 0.0) + boost * frequency / (frequency + base + scale * lengths[slot])
+        for term in excluded:
+            for slot in self.postings.get(term, ()):
+                scores.pop(slot, None)
+        return scores
+
+class MockTextIndex:
+    """
+    Inverted index over a collection's text fields, ranked with BM25. Field
+    weights scale term counts and lengths (BM25F), so a match in a heavier
+    field counts as several. As with Mongo's compound text indexes, prefix
+    fields split the index into one partition per value, and queries must
+    give every prefix field by equality. Documents are added, replaced and
+    removed one at a time as they are written.
+    """
+
+    def __init__(self, weights: Dict[str, int], prefix: Optional[List[str]] = None, k1: float = 1.2, b: float = 0.75):
+        self.weights = weights
+        self.prefix = prefix or []
+        self.k1 = k1
+        self.b = b
+        self.partitions: Dict[tuple, _Partition] = {}
+        # _id -> prefix values, to find a document's partition on removal
+        self._keys: Dict[Any, tuple] = {}
+
+    def _texts(self, doc: Dict[str, Any]) -> Iterable[Tuple[str, int]]:
+        for field, weight in self.weights.items():
+            for text in _strings(get_path(doc, field)):
+                yield text, weight
+
+    def add(self, doc: Dict[str, Any]):
+        doc_id = doc["_id"]
+        if doc_id in self._keys:
+            self.remove(doc_id)
+        frequencies: Dict[str, float] = {}
+        length = 0.0
+        for text, weight in self._texts(doc):
+            for token in tokenize(text):
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+                length += weight
+        if not frequencies:
+            return
+        key = tuple(get_path(doc, field) for field in self.prefix)
+        partition = self.partitions.get(key)
+        if partition is None:
+            partition = self.partitions[key] = _Partition()
+        partition.add(doc, frequencies, length)
+        self._keys[doc_id] = key
+
+    def remove(self, doc_id: Any):
+        key = self._keys.pop(doc_id, None)
+        if key is None:
+            return
+        partition = self.partitions[key]
+        partition.remove(doc_id)
+        if not partition.slots:
+            del self.partitions[key]
+
+    def clear(self):
+        self.partitions.clear()
+        self._keys.clear()
+
+    def _has_phrases(self, doc: Dict[str, Any], phrases: List[str]) -> bool:
+        texts = [text.lower() for text, _ in self._texts(doc)]
+        return all(any(phrase in text for text in texts) for phrase in phrases)
+
+    def search(self, search: str, filter: Dict[str, Any], limit: Optional[int] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Returns (document, score) for the documents matching `search` and
+        the rest of the query's `filter`, best match first. Matches are
+        checked against the filter in that order, so with a `limit` only
+        about that many are looked at.
+        """
+        equalities = equality_fields(filter)
+        if not all(field in equalities for field in self.prefix):
+            raise OperationFailure(
+                "failed to use text index to satisfy $text query "
+                "(if text index is compound, are equality predicates given for all prefix fields?)",
+                code=2
+            )
+        partition = self.partitions.get(tuple(equalities[field] for field in self.prefix))
+        terms, excluded, phrases = parse_search(search)
+        if partition is None or not terms:
+            return []
+        scores = partition.score(terms, excluded, self.k1, self.b)
+
+        # Every document of the partition matches the prefix equalities
+        rest = {key: value for key, value in filter.items() if key not in self.prefix}
+        predicate = compile_filter(rest) if rest else None
+        docs = partition.docs
+        results = []
+        for slot in sorted(scores, key=scores.__getitem__, reverse=True):
+            doc, score = docs[slot], scores[slot]
+            if predicate is not None and not predicate(doc):
+                continue
+            if phrases and not self._has_phrases(doc, phrases):
+                continue
+            results.append((doc, score))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
@@ -0,0 +1,637 @@
+import asyncio
+import copy
+import re
+import sqlite3
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+import bson
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from .mock_db import MockAsyncCursor, MockCollection, MockAdmin, MockUniqueIndex, bulk_write_result
+from .mock_query import compile_filter, apply_update, equality_fields, get_path
+from .mock_aggregate import run_pipeline
+from .mock_text import MockTextIndex, TEXT_SCORE, ranked_limit, split_text_filter, text_index_spec
+from .mock_changes import change_hub
+
+logger = logging.getLogger("uvicorn")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    doc_id BLOB NOT NULL,
+    doc BLOB NOT NULL,
+    PRIMARY KEY (collection, doc_id)
+) WITHOUT ROWID
+"""
+
+# Values of indexed fields, one row per value (per element for arrays), so
+# equality and $in conditions on them are answered by SQLite's own indexes
+FIELD_VALUES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS field_values (
+    collection TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value BLOB NOT NULL,
+    doc_id BLOB NOT NULL,
+    PRIMARY KEY (collection, field, value, doc_id)
+) WITHOUT ROWID
+"""
+
+# Keys of unique indexes; the primary key is what enforces uniqueness
+UNIQUE_KEYS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS unique_keys (
+    collection TEXT NOT NULL,
+    name TEXT NOT NULL,
+    key BLOB NOT NULL,
+    doc_id BLOB NOT NULL,
+    PRIMARY KEY (collection, name, key)
+) WITHOUT ROWID
+"""
+
+# Indexes created so far, shared by every process; PRAGMA user_version is
+# bumped whenever one is added
+INDEXES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexes (
+    collection TEXT NOT NULL,
+    name TEXT NOT NULL,
+    spec BLOB NOT NULL,
+    PRIMARY KEY (collection, name)
+) WITHOUT ROWID
+"""
+
+# Writes to collections with a text index are logged here, so every
+# process can bring its in-memory text index up to date incrementally
+CHANGES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection TEXT NOT NULL,
+    doc_id BLOB NOT NULL
+)
+"""
+
+# Removing a document's index rows looks them up by document
+DOC_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS field_values_doc ON field_values (collection, doc_id)",
+    "CREATE INDEX IF NOT EXISTS unique_keys_doc ON unique_keys (collection, doc_id)",
+]
+
+# Changes kept in the log; a process further behind rebuilds its index
+CHANGE_LOG_SIZE = 10000
+
+# Bound parameters per IN (...) lookup, under SQLite's limit
+MAX_LOOKUP_KEYS = 500
+
+def _doc_key(doc_id: Any) -> bytes:
+    # BSON-encode the id so ObjectIds and strings never collide
+    return bson.encode({"_id": doc_id})
+
+def _value_key(value: Any) -> bytes:
+    # Queries compare numbers by value, so 1 and 1.0 share a key
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = float(value)
+    return bson.encode({"v": value})
+
+def _lookup_values(condition: Any) -> Optional[List[Any]]:
+    """
+    The values a field must take to satisfy `condition` when it is an
+    equality or $in, or None when SQLite cannot narrow it down.
+    """
+    if isinstance(condition, dict):
+        if "$eq" in condition:
+            values = [condition["$eq"]]
+        elif isinstance(condition.get("$in"), list):
+            values = condition["$in"]
+        else:
+            return None
+    else:
+        values = [condition]
+    # null also matches missing fields, and arrays and documents match by
+    # structure, none of which have rows to look up
+    if any(value is None or isinstance(value, (dict, list, re.Pattern)) for value in values):
+        return None
+    return values
+
+class SQLiteStore:
+    """
+    Embedded SQLite file in WAL mode shared by every worker process on a host.
+    Each write runs in a BEGIN IMMEDIATE transaction, so read-modify-write
+    operations are atomic across processes.
+
+    Documents are stored as BSON. The fields of every index also get their
+    values stored in field_values, so queries that give one by equality or
+    $in read only the matching documents, and the keys of unique indexes go
+    in unique_keys, where SQLite checks them.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=busy_timeout_ms / 1000)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+        for statement in [SCHEMA, FIELD_VALUES_SCHEMA, UNIQUE_KEYS_SCHEMA, INDEXES_SCHEMA, CHANGES_SCHEMA, *DOC_INDEXES]:
+            self._conn.execute(statement)
+        # Collection -> indexed fields, and -> index name -> unique index
+        self.fields: Dict[str, List[str]] = {}
+        self.unique: Dict[str, Dict[str, MockUniqueIndex]] = {}
+        self._index_names: Dict[str, set] = {}
+        self._index_version: Optional[int] = None
+        self._load_indexes(self._conn)
+        # Per-process text indexes and the last change each has applied,
+        # None until built
+        self.text_indexes: Dict[str, MockTextIndex] = {}
+        self._text_seqs: Dict[str, Optional[int]] = {}
+        self._text_lock = threading.Lock()
+
+    def _load_indexes(self, conn):
+        self.fields, self.unique, self._index_names = {}, {}, {}
+        for collection, name, spec in conn.execute("SELECT collection, name, spec FROM indexes").fetchall():
+            spec = bson.decode(spec)
+            self._index_names.setdefault(collection, set()).add(name)
+            if "field" in spec:
+                self.fields.setdefault(collection, []).append(spec["field"])
+            else:
+                self.unique.setdefault(collection, {})[name] = MockUniqueIndex(spec["fields"], spec.get("partial"))
+        self._index_version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def ensure_index(self, collection: str, fields: List[str], unique: bool = False, partial: Optional[Dict[str, Any]] = None):
+        """
+        Adds an index over `fields` unless it exists, and indexes the stored
+        documents for it. Raises DuplicateKeyError, adding nothing, when
+        they break a new unique index.
+        """
+        wanted = [(f"field:{field}", {"field": field}) for field in fields]
+        if unique:
+            wanted.append((f"unique:{'_'.join(fields)}", {"fields": fields, "partial": partial}))
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._load_indexes(conn)
+                added = [(name, spec) for name, spec in wanted if name not in self._index_names.get(collection, ())]
+                if added:
+                    for name, spec in added:
+                        conn.execute(
+                            "INSERT INTO indexes (collection, name, spec) VALUES (?, ?, ?)",
+                            (collection, name, bson.encode(spec))
+                        )
+                    conn.execute(f"PRAGMA user_version = {self._index_version + 1}")
+                    self._load_indexes(conn)
+                    rows = conn.execute("SELECT doc FROM documents WHERE collection = ?", (collection,)).fetchall()
+                    for (doc,) in rows:
+                        self._index_doc(conn, collection, bson.decode(doc))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                self._load_indexes(conn)
+                raise
+
+    def _index_doc(self, conn, collection: str, doc: Dict[str, Any]):
+        key = _doc_key(doc["_id"])
+        self._unindex_doc(conn, collection, key)
+        values = set()
+        for field in self.fields.get(collection, ()):
+            value = get_path(doc, field)
+            for item in value if isinstance(value, list) else [value]:
+                if item is not None:
+                    values.add((field, _value_key(item)))
+        conn.executemany(
+            "INSERT INTO field_values (collection, field, value, doc_id) VALUES (?, ?, ?, ?)",
+            [(collection, field, value, key) for field, value in values]
+        )
+        for name, spec in self.unique.get(collection, {}).items():
+            if spec.key_for(doc) is None:
+                continue
+            values = [doc.get(field) for field in spec.fields]
+            try:
+                conn.execute(
+                    "INSERT INTO unique_keys (collection, name, key, doc_id) VALUES (?, ?, ?, ?)",
+                    (collection, name, _value_key(values), key)
+                )
+            except sqlite3.IntegrityError:
+                raise DuplicateKeyError(f"E11000 duplicate key error index: {'_'.join(spec.fields)} dup key: {tuple(values)}")
+
+    @staticmethod
+    def _unindex_doc(conn, collection: str, key: bytes):
+        conn.execute("DELETE FROM field_values WHERE collection = ? AND doc_id = ?", (collection, key))
+        conn.execute("DELETE FROM unique_keys WHERE collection = ? AND doc_id = ?", (collection, key))
+
+    def _lookup(self, collection: str, filter: Dict[str, Any]) -> Optional[Tuple[str, List[bytes]]]:
+        for field in ("_id", *self.fields.get(collection, ())):
+            if field not in filter:
+                continue
+            values = _lookup_values(filter[field])
+            if values is None:
+                continue
+            try:
+                return field, [_doc_key(value) if field == "_id" else _value_key(value) for value in values]
+            except Exception:
+                # Not something BSON can encode, so nothing stored has it
+                continue
+        return None
+
+    def _plan(self, collection: str, filter: Dict[str, Any]) -> Optional[List[Tuple[str, List[bytes]]]]:
+        """
+        Lookups whose union holds every document matching `filter`: one
+        on _id or an indexed field, or one per branch of an $or, or None
+        when the collection has to be scanned.
+        """
+        lookup = self._lookup(collection, filter)
+        if lookup is not None:
+            return [lookup]
+        branches = filter.get("$or")
+        if isinstance(branches, list) and branches:
+            lookups = [self._lookup(collection, branch) if isinstance(branch, dict) else None for branch in branches]
+            if all(lookup is not None for lookup in lookups):
+                return lookups
+        return None
+
+    def _select(self, conn, collection: str, filter: Dict[str, Any]) -> List[bytes]:
+        """
+        The encoded documents that may match `filter`, each once; the
+        caller checks them against the whole filter.
+        """
+        plan = self._plan(collection, filter) if filter else None
+        if plan is None:
+            return [row[0] for row in conn.execute("SELECT doc FROM documents WHERE collection = ?", (collection,))]
+        found: Dict[bytes, bytes] = {}
+        for field, keys in plan:
+            keys = list(dict.fromkeys(keys))
+            for start in range(0, len(keys), MAX_LOOKUP_KEYS):
+                chunk = keys[start:start + MAX_LOOKUP_KEYS]
+                marks = ", ".join("?" * len(chunk))
+                if field == "_id":
+                    rows = conn.execute(
+                        f"SELECT doc_id, doc FROM documents WHERE collection = ? AND doc_id IN ({marks})",
+                        (collection, *chunk)
+                    )
+                else:
+                    rows = conn.execute(
+                        "SELECT d.doc_id, d.doc FROM field_values f JOIN documents d "
+                        "ON d.collection = f.collection AND d.doc_id = f.doc_id "
+                        f"WHERE f.collection = ? AND f.field = ? AND f.value IN ({marks})",
+                        (collection, field, *chunk)
+                    )
+                for doc_id, doc in rows:
+                    found[doc_id] = doc
+        return list(found.values())
+
+    def load(self, collection: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc FROM documents WHERE collection = ?", (collection,)
+            ).fetchall()
+        return [bson.decode(row[0]) for row in rows]
+
+    def find(self, collection: str, filter: Dict[str, Any]) -> List[Dict[str, Any]]:
+        predicate = compile_filter(filter)
+        with self._lock:
+            rows = self._select(self._conn, collection, filter)
+        return [doc for doc in map(bson.decode, rows) if predicate(doc)]
+
+    def transaction(self, fn):
+        """
+        Runs fn(find, put, delete) inside a single write transaction.
+        """
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have added an index since this one looked
+                if conn.execute("PRAGMA user_version").fetchone()[0] != self._index_version:
+                    self._load_indexes(conn)
+
+                def find(collection, filter):
+                    predicate = compile_filter(filter)
+                    return [doc for doc in map(bson.decode, self._select(conn, collection, filter)) if predicate(doc)]
+
+                def put(collection, doc):
+                    conn.execute(
+                        "INSERT OR REPLACE INTO documents (collection, doc_id, doc) VALUES (?, ?, ?)",
+                        (collection, _doc_key(doc["_id"]), bson.encode(doc))
+                    )
+                    self._index_doc(conn, collection, doc)
+                    log_change(collection, doc["_id"])
+
+                def delete(collection, doc_id):
+                    key = _doc_key(doc_id)
+                    conn.execute("DELETE FROM documents WHERE collection = ? AND doc_id = ?", (collection, key))
+                    self._unindex_doc(conn, collection, key)
+                    log_change(collection, doc_id)
+
+                def log_change(collection, doc_id):
+                    if collection not in self.text_indexes:
+                        return
+                    seq = conn.execute(
+                        "INSERT INTO changes (collection, doc_id) VALUES (?, ?)",
+                        (collection, _doc_key(doc_id))
+                    ).lastrowid
+                    conn.execute("DELETE FROM changes WHERE seq <= ?", (seq - CHANGE_LOG_SIZE,))
+
+                result = fn(find, put, delete)
+                conn.execute("COMMIT")
+                return result
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def create_text_index(self, collection: str, index: MockTextIndex):
+        with self._text_lock:
+            self.text_indexes[collection] = index
+            self._text_seqs[collection] = None
+
+    def text_search(self, collection: str, search: str, filter: Dict[str, Any], limit: Optional[int] = None):
+        """
+        Runs a $text query against the collection's text index, brought up
+        to date first. Syncing replaces documents rather than changing them,
+        so the ones returned stay as they were read.
+        """
+        with self._text_lock:
+            return self._sync_text_index(collection).search(search, filter, limit)
+
+    def _sync_text_index(self, collection: str) -> MockTextIndex:
+        """
+        Applies the changes logged since the collection's text index was
+        last synced, including other processes' writes. The index is built
+        from a full scan the first time, or when the changes it missed have
+        already been dropped from the log.
+        """
+        index = self.text_indexes.get(collection)
+        if index is None:
+            raise OperationFailure("text index required for $text query", code=27)
+        last_seq = self._text_seqs[collection]
+        rows, changed = None, []
+        with self._lock:
+            conn = self._conn
+            # One read transaction, so the scan and the log agree
+            conn.execute("BEGIN")
+            try:
+                oldest, newest = conn.execute("SELECT MIN(seq), MAX(seq) FROM changes").fetchone()
+                if last_seq is None or (oldest is not None and oldest > last_seq + 1):
+                    rows = conn.execute("SELECT doc FROM documents WHERE collection = ?", (collection,)).fetchall()
+                elif newest is not None and newest > last_seq:
+                    changed = conn.execute(
+                        "SELECT c.doc_id, d.doc FROM (SELECT DISTINCT doc_id FROM changes WHERE collection = ? AND seq > ?) c "
+                        "LEFT JOIN documents d ON d.collection = ? AND d.doc_id = c.doc_id",
+                        (collection, last_seq, collection)
+                    ).fetchall()
+            finally:
+                conn.execute("COMMIT")
+        # Decoding and indexing happen outside the connection lock, so a
+        # rebuild only holds up other text queries
+        if rows is not None:
+            index.clear()
+            for (doc,) in rows:
+                index.add(bson.decode(doc))
+        for key, doc in changed:
+            if doc is not None:
+                index.add(bson.decode(doc))
+            else:
+                index.remove(bson.decode(key)["_id"])
+        self._text_seqs[collection] = newest or 0
+        return index
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class SQLiteCollection(MockCollection):
+    """
+    MockCollection API on top of SQLiteStore. Query matching and update
+    operators are shared with MockCollection; only storage differs.
+    """
+
+    def __init__(self, name, store: SQLiteStore):
+        self.name = name
+        self.store = store
+
+    async def create_index(self, keys, unique: bool = False, partialFilterExpression: Optional[Dict[str, Any]] = None, **kwargs):
+        fields = [keys] if isinstance(keys, str) else [key for key, _ in keys]
+        if not isinstance(keys, str) and any(direction == "text" for _, direction in keys):
+            weights, prefix = text_index_spec(keys, kwargs.get("weights"))
+            # Built on first use, see SQLiteStore.text_search
+            self.store.create_text_index(self.name, MockTextIndex(weights, prefix))
+            if prefix:
+                await asyncio.to_thread(self.store.ensure_index, self.name, prefix)
+            return kwargs.get("name", "_".join(fields))
+        await asyncio.to_thread(self.store.ensure_index, self.name, fields, unique, partialFilterExpression if unique else None)
+        return "_".join(fields)
+
+    async def _write(self, op):
+        """
+        Runs op(find, put, delete, changes) in a transaction and publishes the
+        (operation, document) pairs it recorded once the commit succeeded.
+        """
+        changes = []
+        result = await asyncio.to_thread(
+            self.store.transaction, lambda find, put, delete: op(find, put, delete, changes)
+        )
+        for operation, doc in changes:
+            change_hub.publish(operation, self.name, doc)
+        return result
+
+    def _text_search_sync(self, filter, limit: Optional[int] = None):
+        search, rest = split_text_filter(filter)
+        return self.store.text_search(self.name, search, rest, limit)
+
+    def _find_sync(self, filter):
+        if "$text" in filter:
+            # The index's documents are shared by every query
+            return [copy.deepcopy(doc) for doc, _ in self._text_search_sync(filter)]
+        return self.store.find(self.name, filter)
+
+    async def find_one(self, filter: Dict[str, Any]):
+        matches = await asyncio.to_thread(self._find_sync, filter)
+        return matches[0] if matches else None
+
+    def find(self, filter: Optional[Dict[str, Any]] = None):
+        return SQLiteAsyncCursor(self, filter or {})
+
+    async def count_documents(self, filter: Dict[str, Any]):
+        return len(await asyncio.to_thread(self._find_sync, filter))
+
+    def aggregate(self, pipeline: List[Dict[str, Any]]):
+        return SQLiteAggregateCursor(self, pipeline)
+
+    async def insert_one(self, document: Dict[str, Any]):
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        stored = copy.deepcopy(document)
+        def op(find, put, delete, changes):
+            put(self.name, stored)
+            changes.append(("insert", stored))
+        await self._write(op)
+        return type('InsertOneResult', (), {'inserted_id': document["_id"]})()
+
+    async def find_one_and_update(self, filter: Dict[str, Any], update: Dict[str, Any], sort=None, return_document: bool = False):
+        def op(find, put, delete, changes):
+            candidates = find(self.name, filter)
+            if not candidates:
+                return None
+            if sort:
+                for key, direction in reversed(sort):
+                    candidates.sort(key=lambda x: x.get(key) if x.get(key) is not None else "", reverse=direction == -1)
+            item = candidates[0]
+            before = copy.deepcopy(item)
+            apply_update(item, update)
+            put(self.name, item)
+            changes.append(("update", item))
+            return item if return_document else before
+        return await self._write(op)
+
+    async def update_many(self, filter: Dict[str, Any], update: Dict[str, Any]):
+        def op(find, put, delete, changes):
+            modified = 0
+            for doc in find(self.name, filter):
+                apply_update(doc, update)
+                put(self.name, doc)
+                changes.append(("update", doc))
+                modified += 1
+            return modified
+        modified = await self._write(op)
+        return type('UpdateResult', (), {'matched_count': modified, 'modified_count': modified})()
+
+    def _upsert(self, filter: Dict[str, Any], update: Dict[str, Any], put, changes) -> Dict[str, Any]:
+        new_doc = {}
+        apply_update(new_doc, {"$set": equality_fields(filter)})
+        apply_update(new_doc, update, is_insert=True)
+        new_doc.setdefault("_id", ObjectId())
+        put(self.name, new_doc)
+        changes.append(("insert", new_doc))
+        return new_doc
+
+    async def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        def op(find, put, delete, changes):
+            matches = find(self.name, filter)
+            if matches:
+                doc = matches[0]
+                apply_update(doc, update)
+                put(self.name, doc)
+                changes.append(("update", doc))
+                return 1, None
+            if upsert:
+                return 0, self._upsert(filter, update, put, changes)["_id"]
+            return 0, None
+        matched, upserted_id = await self._write(op)
+        return type('UpdateResult', (), {'matched_count': matched, 'modified_count': matched, 'upserted_id': upserted_id})()
+
+    async def bulk_write(self, requests: List[Any], ordered: bool = True):
+        """
+        Applies InsertOne and UpdateOne requests in a single transaction.
+        """
+        for request in requests:
+            if not isinstance(request, (InsertOne, UpdateOne)):
+                raise NotImplementedError(f"Unsupported bulk write request: {type(request).__name__}")
+        def op(find, put, delete, changes):
+            matched, inserted, upserted_ids = 0, 0, {}
+            for position, request in enumerate(requests):
+                if isinstance(request, InsertOne):
+                    request._doc.setdefault("_id", ObjectId())
+                    new_doc = copy.deepcopy(request._doc)
+                    put(self.name, new_doc)
+                    changes.append(("insert", new_doc))
+                    inserted += 1
+                    continue
+                matches = find(self.name, request._filter)
+                if matches:
+                    doc = matches[0]
+                    apply_update(doc, request._doc)
+                    put(self.name, doc)
+                    changes.append(("update", doc))
+                    matched += 1
+                elif request._upsert:
+                    upserted_ids[position] = self._upsert(request._filter, request._doc, put, changes)["_id"]
+            return matched, inserted, upserted_ids
+        return bulk_write_result(*await self._write(op))
+
+    async def delete_one(self, filter: Dict[str, Any]):
+        def op(find, put, delete, changes):
+            for doc in find(self.name, filter):
+                delete(self.name, doc["_id"])
+                changes.append(("delete", doc))
+                return 1
+            return 0
+        deleted = await self._write(op)
+        return type('DeleteResult', (), {'deleted_count': deleted})()
+
+    async def delete_many(self, filter: Dict[str, Any]):
+        def op(find, put, delete, changes):
+            deleted = 0
+            for doc in find(self.name, filter):
+                delete(self.name, doc["_id"])
+                changes.append(("delete", doc))
+                deleted += 1
+            return deleted
+        deleted = await self._write(op)
+        return type('DeleteResult', (), {'deleted_count': deleted})()
+
+class SQLiteAsyncCursor(MockAsyncCursor):
+    # Defers the read to to_list so it runs off the event loop
+    def __init__(self, collection: SQLiteCollection, filter: Dict[str, Any]):
+        super().__init__([])
+        self.collection = collection
+        self.filter = filter
+
+    async def to_list(self, length: Optional[int] = None):
+        self.data = await asyncio.to_thread(self.collection._find_sync, self.filter)
+        return await super().to_list(length)
+
+class SQLiteAggregateCursor(MockAsyncCursor):
+    def __init__(self, collection: SQLiteCollection, pipeline: List[Dict[str, Any]]):
+        super().__init__([])
+        self.collection = collection
+        self.pipeline = pipeline
+
+    def _run(self):
+        pipeline = self.pipeline
+        if pipeline and "$match" in pipeline[0] and "$text" in pipeline[0]["$match"]:
+            pipeline, match = pipeline[1:], pipeline[0]["$match"]
+            docs = [{**doc, TEXT_SCORE: score} for doc, score in self.collection._text_search_sync(match, ranked_limit(pipeline))]
+        elif pipeline and "$match" in pipeline[0]:
+            docs = self.collection._find_sync(pipeline[0]["$match"])
+            pipeline = pipeline[1:]
+        else:
+            docs = self.collection.store.load(self.collection.name)
+        return run_pipeline(docs, pipeline)
+
+    async def to_list(self, length: Optional[int] = None):
+        self.data = await asyncio.to_thread(self._run)
+        return await super().to_list(length)
+
+class SQLiteDB:
+    def __init__(self, store: SQLiteStore):
+        self._store = store
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return SQLiteCollection(name, self._store)
+
+    def __getitem__(self, name):
+        return SQLiteCollection(name, self._store)
+
+    async def command(self, cmd):
+        return {"ok": 1.0}
+
+    def watch(self, pipeline=None, **kwargs):
+        # Only sees writes made by this worker process: with several workers
+        # sharing the file, the others' writes never reach these streams
+        return change_hub.watch(pipeline, **kwargs)
+
+class SQLiteClient:
+    def __init__(self, uri, path: str):
+        logger.warning(f"Using SQLiteClient at {path} for MongoDB at {uri}")
+        self.store = SQLiteStore(path)
+        self.db = SQLiteDB(self.store)
+
+    def get_default_database(self):
+        return self.db
+
+    def close(self):
+        self.store.close()
+
+    @property
+    def admin(self):
+        return MockAdmin()
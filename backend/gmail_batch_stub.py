@@ -0,0 +1,69 @@
+import base64
+import json
+import uuid
+from email import message_from_bytes
+from fastapi import FastAPI, Request, Response
+from .services.gmail import parse_multipart, parse_http_message, batch_item_index
+
+# Local stand-in for Gmail's batch endpoint, for trying batched drafts
+# without a Google account:
+#   uvicorn backend.gmail_batch_stub:app --port 8010
+#   GOOGLE_GMAIL_BATCH_URL=http://localhost:8010/batch/gmail/v1
+# Drafts are created unless their subject contains "[fail]" (answered 400)
+# or "[throttle]" (answered 429 the first time it is seen).
+app = FastAPI(title="Gmail batch stub")
+
+drafts = {}
+throttled = set()
+
+def _part(index: int, status: int, reason: str, payload: dict) -> str:
+    body = json.dumps(payload)
+    return "\r\n".join([
+        "Content-Type: application/http",
+        f"Content-ID: <response-item-{index}>",
+        "",
+        f"HTTP/1.1 {status} {reason}",
+        "Content-Type: application/json; charset=UTF-8",
+        f"Content-Length: {len(body)}",
+        "",
+        body,
+    ])
+
+def _error(status: int, reason: str, message: str) -> dict:
+    return {"error": {"code": status, "message": message, "errors": [{"reason": reason, "message": message}]}}
+
+def _handle(index: int, content: str) -> str:
+    _, _, body = parse_http_message(content)
+    try:
+        raw = json.loads(body)["message"]["raw"]
+        subject = message_from_bytes(base64.urlsafe_b64decode(raw))["subject"] or ""
+    except (ValueError, KeyError, TypeError):
+        return _part(index, 400, "Bad Request", _error(400, "invalidArgument", "Invalid draft"))
+
+    if "[fail]" in subject:
+        return _part(index, 400, "Bad Request", _error(400, "invalidArgument", "Invalid To header"))
+    if "[throttle]" in subject and raw not in throttled:
+        throttled.add(raw)
+        return _part(index, 429, "Too Many Requests", _error(429, "rateLimitExceeded", "Rate limit exceeded"))
+
+    draft_id = uuid.uuid4().hex[:16]
+    drafts[draft_id] = subject
+    return _part(index, 200, "OK", {"id": draft_id, "message": {"id": draft_id, "labelIds": ["DRAFT"]}})
+
+@app.post("/batch/gmail/v1")
+async def batch(request: Request):
+    parts = parse_multipart(request.headers.get("content-type", ""), await request.body())
+    if len(parts) > 100:
+        return Response(status_code=400, content=json.dumps(_error(400, "invalidArgument", "Too many requests in batch")))
+
+    boundary = f"batch_{uuid.uuid4().hex}"
+    responses = [
+        _handle(batch_item_index(headers.get("content-id", "")) or 0, content)
+        for headers, content in parts
+    ]
+    body = "".join(f"--{boundary}\r\n{part}\r\n" for part in responses) + f"--{boundary}--\r\n"
+    return Response(content=body, media_type=f"multipart/mixed; boundary={boundary}")
+
+@app.get("/drafts")
+async def list_drafts():
+    return {"count": len(drafts), "subjects": list(drafts.values())}
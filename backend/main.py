@@ -1,16 +1,42 @@
-import uvicorn
-from fastapi import FastAPI, status
+import asyncio
+import math
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 from .database.client import db, settings
-from .routers import auth, users, meetings, next_steps
+from .routers import auth, users, meetings, next_steps, events, calendar, search
+from .security.auth import shutdown_hash_executor
+from .services.jobs import job_queue
+from .services.realtime import broker
+from .services.google_client import google_client
+from .services.circuit_breaker import CircuitOpenError
+from .services.calendar_watch import channel_renewer
+from .services.health import health_monitor
+
+async def start_background_services():
+    # Everything here needs the database, so it waits for the connection
+    await db.wait_ready()
+    await job_queue.start()
+    broker.start()
+    channel_renewer.start()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    await db.connect()
+    # Startup: serve immediately, connect and start workers in the background
+    db.start()
+    health_monitor.start()
+    services = asyncio.create_task(start_background_services(), name="background-services")
     yield
     # Shutdown
+    services.cancel()
+    await asyncio.gather(services, return_exceptions=True)
+    await health_monitor.stop()
+    await channel_renewer.stop()
+    await broker.stop()
+    await job_queue.stop()
+    await google_client.aclose()
+    shutdown_hash_executor()
     db.close()
 
 app = FastAPI(
@@ -31,27 +57,46 @@ app.add_middleware(
     allow_headers=headers,
 )
 
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    # Fail fast while a dependency is down instead of waiting on its timeouts
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": f"{exc}, please try again shortly", "dependency": exc.name},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(users.router, prefix="/api/v1")
 app.include_router(meetings.router, prefix="/api/v1")
 app.include_router(next_steps.router, prefix="/api/v1")
+app.include_router(events.router, prefix="/api/v1")
+app.include_router(calendar.router, prefix="/api/v1")
+app.include_router(search.router, prefix="/api/v1")
+
+@app.get("/livez", status_code=status.HTTP_200_OK)
+async def liveness():
+    # Only says the process is serving; dependencies belong in /readyz
+    return {"status": "ok", "uptime": round(health_monitor.uptime(), 1)}
+
+@app.get("/readyz")
+async def readiness():
+    # Served from the health monitor's last check, never touches the database
+    report = health_monitor.report
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if report["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=report,
+    )
 
 @app.get("/healthz", status_code=status.HTTP_200_OK)
 async def health_check():
-    try:
-        if db.client:
-            # Ping the database to ensure connection is active
-            await db.client.admin.command('ping')
-            return {"status": "ok", "database": "connected"}
-        else:
-            return {"status": "error", "database": "disconnected"}
-    except Exception as e:
-        return {"status": "error", "database": str(e)}
+    return {**health_monitor.report, "google_api": google_client.metrics()}
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to Daily Action Hub API"}
 
 if __name__ == "__main__":
+    import uvicorn
     print(f"Starting server on 0.0.0.0:{settings.PORT}")
     uvicorn.run("backend.main:app", host="0.0.0.0", port=settings.PORT, reload=True)
\ No newline at end of file
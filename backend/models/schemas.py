@@ -1,16 +1,38 @@
-from pydantic import BaseModel, Field, BeforeValidator, ConfigDict
+from pydantic import BaseModel, Field, BeforeValidator, AfterValidator, ConfigDict
 from typing import Optional, Annotated
-from datetime import datetime
+from datetime import datetime, date, timezone
 from enum import Enum
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 # Represents an ObjectId field in the database.
 # It will be represented as a string in the model so that it can be serialized to JSON.
 PyObjectId = Annotated[str, BeforeValidator(str)]
 
+def _as_utc(value: datetime) -> datetime:
+    # Naive values are taken to be UTC, which is how MongoDB returns them
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+# Instants are kept as aware UTC datetimes
+UTCDatetime = Annotated[datetime, AfterValidator(_as_utc)]
+
+def _check_timezone(value: Optional[str]) -> Optional[str]:
+    if value is not None:
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone: {value}")
+    return value
+
+# IANA timezone name, e.g. "Europe/Berlin"
+TimezoneName = Annotated[Optional[str], AfterValidator(_check_timezone)]
+
 class UserBase(BaseModel):
     email: str
     full_name: Optional[str] = None
     picture: Optional[str] = None
+    timezone: TimezoneName = None
 
 class UserCreate(UserBase):
     password: str
@@ -24,6 +46,11 @@ class User(UserBase):
     id: Optional[PyObjectId] = Field(validation_alias="_id", default=None)
     refresh_token: Optional[str] = None
 
+class UserUpdate(BaseModel):
+    full_name: Optional[str] = None
+    picture: Optional[str] = None
+    timezone: TimezoneName = None
+
 class UserInDB(User):
     google_id: Optional[str] = None
     hashed_password: Optional[str] = None
@@ -32,8 +59,8 @@ class UserInDB(User):
 
 class MeetingBase(BaseModel):
     title: str
-    start_time: datetime
-    end_time: datetime
+    start_time: UTCDatetime
+    end_time: UTCDatetime
     is_online: bool = False
     online_meeting_link: Optional[str] = None
     location: Optional[str] = None
@@ -59,8 +86,8 @@ class MeetingUpdate(BaseModel):
     summary: Optional[str] = None
     is_recorded: Optional[bool] = None
     title: Optional[str] = None
-    start_time: Optional[datetime] = None
-    end_time: Optional[datetime] = None
+    start_time: Optional[UTCDatetime] = None
+    end_time: Optional[UTCDatetime] = None
     is_online: Optional[bool] = None
     online_meeting_link: Optional[str] = None
     location: Optional[str] = None
@@ -110,4 +137,54 @@ class NextStep(NextStepBase):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class NextStepInDB(NextStep):
-    pass
\ No newline at end of file
+    pass
+
+class NextStepBatchExecute(BaseModel):
+    # Every step is looked up and claimed one write at a time, so keep
+    # batches to what one request can reasonably do
+    step_ids: list[str] = Field(max_length=100)
+
+class NextStepExecuteResult(BaseModel):
+    step_id: str
+    status: str
+    detail: Optional[str] = None
+
+class NextStepStatusCounts(BaseModel):
+    suggested: int = 0
+    confirmed: int = 0
+    executed: int = 0
+    rejected: int = 0
+    pending: int = 0
+    total: int = 0
+
+class MeetingProgress(BaseModel):
+    meeting_id: str
+    counts: NextStepStatusCounts
+
+class NextStepStats(BaseModel):
+    totals: NextStepStatusCounts
+    meetings: list[MeetingProgress] = []
+
+class DailyDigest(BaseModel):
+    day: date
+    meetings: list[Meeting] = []
+    next_steps: list[NextStep] = []
+    counts: NextStepStatusCounts
+    updated_at: datetime
+
+class SearchResultType(str, Enum):
+    meeting = "meeting"
+    next_step = "next_step"
+
+class SearchResult(BaseModel):
+    type: SearchResultType
+    score: float
+    meeting: Optional[Meeting] = None
+    next_step: Optional[NextStep] = None
+
+class SearchResults(BaseModel):
+    query: str
+    page: int
+    page_size: int
+    has_more: bool
+    results: list[SearchResult] = []
@@ -1,9 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import RedirectResponse
-import httpx
 from ..database.client import settings, get_database
 from ..models.schemas import UserInDB, UserCreate, UserLogin
-from ..security.auth import create_access_token, get_password_hash, verify_password
+from ..security.auth import create_access_token, get_password_hash_async, verify_password_async, password_needs_rehash
 from datetime import datetime
 
 router = APIRouter(
@@ -22,11 +21,12 @@ async def register(user: UserCreate):
             detail="Email already registered"
         )
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     new_user = UserInDB(
         email=user.email,
         full_name=user.full_name,
         picture=user.picture,
+        timezone=user.timezone,
         hashed_password=hashed_password,
         created_at=datetime.utcnow(),
         updated_at=datetime.utcnow()
@@ -45,13 +45,21 @@ async def login(user_credentials: UserLogin):
     db = await get_database()
     user = await db.users.find_one({"email": user_credentials.email})
     
-    if not user or not user.get("hashed_password") or not verify_password(user_credentials.password, user["hashed_password"]):
+    if not user or not user.get("hashed_password") or not await verify_password_async(user_credentials.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Transparently upgrade plaintext or outdated hashes now that we know the password
+    if password_needs_rehash(user["hashed_password"]):
+        new_hash = await get_password_hash_async(user_credentials.password)
+        await db.users.update_one(
+            {"_id": user["_id"]},
+            {"$set": {"hashed_password": new_hash, "updated_at": datetime.utcnow()}}
+        )
+    
     access_token = create_access_token(data={"sub": user["email"]})
     return {"access_token": access_token, "token_type": "bearer"}
 @router.get("/google/url")
@@ -78,6 +86,7 @@ async def auth_google(code: str = None, error: str = None):
         "grant_type": "authorization_code",
     }
     
+    import httpx
     async with httpx.AsyncClient() as client:
         response = await client.post(token_url, data=data)
         if response.status_code != 200:
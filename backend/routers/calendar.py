@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from ..database.client import get_database, settings
+from ..models.schemas import UserInDB
+from ..security.auth import get_current_user
+from ..services.calendar_watch import register_channels, stop_channels, handle_notification
+
+router = APIRouter(
+    prefix="/calendar",
+    tags=["calendar"],
+)
+
+@router.post("/watch")
+async def watch_calendars(
+    current_user: UserInDB = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """
+    Subscribe to push notifications for all of the user's calendars, so
+    changes are synced as they happen instead of by polling.
+    """
+    if not settings.GOOGLE_WEBHOOK_URL:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Calendar push notifications are not configured (GOOGLE_WEBHOOK_URL)"
+        )
+    if not current_user.refresh_token:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User not connected to Google Calendar (missing refresh token)"
+        )
+    channels = await register_channels(db, current_user)
+    return {"channels": [
+        {"calendar_id": channel["calendar_id"], "expiration": channel["expiration"]}
+        for channel in channels
+    ]}
+
+@router.delete("/watch")
+async def unwatch_calendars(
+    current_user: UserInDB = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    return {"stopped": await stop_channels(db, current_user)}
+
+@router.post("/notifications")
+async def calendar_notification(request: Request, db = Depends(get_database)):
+    """
+    Webhook for Google Calendar push notifications. Authenticated by the
+    per-channel token Google echoes back, not by a user session.
+    """
+    if not await handle_notification(db, request.headers):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown notification channel"
+        )
+    return {"status": "ok"}
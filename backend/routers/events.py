@@ -0,0 +1,55 @@
+import asyncio
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, status
+from ..security.auth import get_current_user
+from ..services.realtime import broker, TooManyConnections
+
+router = APIRouter(
+    prefix="/events",
+    tags=["events"],
+)
+
+PING_INTERVAL_SECONDS = 30
+
+@router.websocket("/ws")
+async def events_websocket(websocket: WebSocket, token: str):
+    """
+    Push meeting and next step changes for the authenticated user.
+    Browsers cannot set headers on WebSocket requests, so the JWT is passed as ?token=.
+    Each message is {"collection", "operation", "id"}; clients refetch what changed.
+    """
+    try:
+        current_user = await get_current_user(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    try:
+        async with broker.subscribe(str(current_user.id)) as queue:
+            await websocket.accept()
+            
+            async def send_events():
+                while True:
+                    try:
+                        event = await asyncio.wait_for(queue.get(), timeout=PING_INTERVAL_SECONDS)
+                    except asyncio.TimeoutError:
+                        event = {"type": "ping"}
+                    await websocket.send_json(event)
+                    
+            sender = asyncio.create_task(send_events())
+            try:
+                # Clients only ever send to close; a failed send also ends here with a disconnect
+                while True:
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        break
+            finally:
+                sender.cancel()
+                # Retrieve how the sender ended, so a failed send is not
+                # reported as a never-retrieved task exception
+                await asyncio.wait({sender})
+                if not sender.cancelled():
+                    sender.exception()
+    except TooManyConnections:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+    except WebSocketDisconnect:
+        pass
@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from typing import List, Optional
-from datetime import datetime, time, date, timedelta
+from datetime import datetime, date, timedelta
 from bson import ObjectId
-from ..database.client import get_database
-from ..models.schemas import UserInDB, Meeting, MeetingInDB, NextStep, NextStepInDB, NextStepStatus, MeetingUpdate, MeetingCreate
+from ..database.client import get_database, settings
+from ..models.schemas import UserInDB, Meeting, MeetingInDB, NextStep, MeetingUpdate, MeetingCreate, DailyDigest
 from ..security.auth import get_current_user
-from ..services.google_calendar import refresh_google_token, fetch_calendar_events, is_online_meeting
+from ..services.calendar_sync import run_sync
 from ..services.ai import generate_next_steps
+from ..services.fingerprints import add_suggested_steps
+from ..services.digests import get_digest, refresh_meeting_digests
+from ..services.timezones import get_zone, local_today, local_day_range
 
 router = APIRouter(
     prefix="/meetings",
@@ -31,6 +34,7 @@ async def create_meeting(
     )
     
     created_meeting = await db.meetings.find_one({"_id": result.inserted_id})
+    await refresh_meeting_digests(db, str(current_user.id), [created_meeting], get_zone(current_user.timezone))
     return created_meeting
 
 @router.post("/sync")
@@ -44,113 +48,52 @@ async def sync_meetings(
             detail="User not connected to Google Calendar (missing refresh token)"
         )
     
-    # 1. Refresh Google Token
-    access_token = await refresh_google_token(current_user.refresh_token)
-    if not access_token:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Failed to refresh Google token"
-        )
-    
-    # 2. Fetch Events for Today
-    today = datetime.now().date()
-    events = await fetch_calendar_events(access_token, today)
-    
-    # 3. Process and Upsert
-    synced_count = 0
-    for event in events:
-        # Skip cancelled events
-        if event.get("status") == "cancelled":
-            continue
-            
-        # Parse start/end times
-        start = event.get("start")
-        end = event.get("end")
-        
-        if not start or not end:
-            continue
-            
-        start_dt_str = start.get("dateTime") or start.get("date")
-        end_dt_str = end.get("dateTime") or end.get("date")
-        
-        try:
-            # Handle standard ISO format and 'Z'
-            if "T" in start_dt_str:
-                # Timed event
-                if start_dt_str.endswith("Z"):
-                     start_dt_str = start_dt_str.replace("Z", "+00:00")
-                start_time = datetime.fromisoformat(start_dt_str)
-            else:
-                 # All day event (YYYY-MM-DD)
-                 start_time = datetime.combine(date.fromisoformat(start_dt_str), time.min)
-                 
-            if "T" in end_dt_str:
-                if end_dt_str.endswith("Z"):
-                     end_dt_str = end_dt_str.replace("Z", "+00:00")
-                end_time = datetime.fromisoformat(end_dt_str)
-            else:
-                end_time = datetime.combine(date.fromisoformat(end_dt_str), time.max)
-                
-        except ValueError:
-            continue
-
-        meeting_data = MeetingInDB(
-            user_id=str(current_user.id),
-            google_event_id=event["id"],
-            title=event.get("summary", "(No Title)"),
-            start_time=start_time,
-            end_time=end_time,
-            is_online=is_online_meeting(event),
-            summary=event.get("description"),
-            participants=[p.get("email") for p in event.get("attendees", []) if p.get("email")],
-            updated_at=datetime.utcnow()
-        )
-        
-        # Upsert
-        # We use $setOnInsert for created_at to preserve original creation time
-        await db.meetings.update_one(
-            {"user_id": str(current_user.id), "google_event_id": event["id"]},
-            {
-                "$set": meeting_data.model_dump(by_alias=True, exclude={"id", "created_at"}),
-                "$setOnInsert": {"created_at": datetime.utcnow()}
-            },
-            upsert=True
-        )
-        synced_count += 1
-        
-    return {"synced": synced_count}
+    return await run_sync(current_user, db)
 
 @router.get("/", response_model=List[Meeting])
 async def get_meetings(
     date_query: Optional[date] = Query(None, alias="date"),
+    start_date: Optional[date] = Query(None, alias="start"),
+    end_date: Optional[date] = Query(None, alias="end"),
     current_user: UserInDB = Depends(get_current_user),
     db = Depends(get_database)
 ):
-    print(f"DEBUG: get_meetings called. date_query={date_query}, type={type(date_query)}")
+    """
+    List meetings for a local day (`date`), an inclusive range of local days
+    (`start`/`end`), or by default the 30 days either side of today. Days are
+    taken in the user's timezone.
+    """
+    print(f"DEBUG: get_meetings called. date_query={date_query}, start={start_date}, end={end_date}")
     print(f"DEBUG: current_user.id={current_user.id}")
     
+    zone = get_zone(current_user.timezone)
     if date_query:
         print("DEBUG: Filtering by specific date")
-        start_time = datetime.combine(date_query, time.min)
-        end_time = datetime.combine(date_query, time.max)
+        start_time, end_time = local_day_range(date_query, zone)
+    elif start_date or end_date:
+        print("DEBUG: Filtering by date range")
+        first_day = start_date or end_date
+        last_day = end_date or start_date
+        if last_day < first_day:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="end must not be before start"
+            )
+        start_time, end_time = local_day_range(first_day, zone, last_day)
     else:
         print("DEBUG: Using default date range (last 30 days + next 30 days)")
-        # Default: Last 30 days + Next 30 days to ensure future meetings are visible
-        # This handles timezone differences where user's 'today' might be server's 'tomorrow'
-        today = datetime.now().date()
-        past_date = today - timedelta(days=30)
-        future_date = today + timedelta(days=30)
-        start_time = datetime.combine(past_date, time.min)
-        end_time = datetime.combine(future_date, time.max)
+        # Default: Last 30 days + Next 30 days of the user's local calendar
+        today = local_today(zone)
+        start_time, end_time = local_day_range(today - timedelta(days=30), zone, today + timedelta(days=30))
     
-    print(f"DEBUG: Querying range {start_time} to {end_time}")
+    print(f"DEBUG: Querying range {start_time} to {end_time} ({zone.key})")
     
     # Handle user_id which might be an ObjectId or string depending on registration method
     user_id_query = str(current_user.id)
     
     query = {
         "user_id": user_id_query,
-        "start_time": {"$gte": start_time, "$lte": end_time}
+        "start_time": {"$gte": start_time, "$lt": end_time}
     }
     print(f"DEBUG: Query object: {query}")
 
@@ -163,6 +106,19 @@ async def get_meetings(
         
     return meetings
 
+@router.get("/digest", response_model=DailyDigest)
+async def get_daily_digest(
+    date_query: Optional[date] = Query(None, alias="date"),
+    current_user: UserInDB = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """
+    Get the precomputed digest (meetings, outstanding next steps and counts) for a day.
+    """
+    zone = get_zone(current_user.timezone)
+    day = date_query or local_today(zone)
+    return await get_digest(db, str(current_user.id), day, zone)
+
 @router.patch("/{meeting_id}", response_model=Meeting)
 async def update_meeting(
     meeting_id: str,
@@ -196,6 +152,8 @@ async def update_meeting(
     )
     
     updated_meeting = await db.meetings.find_one({"_id": ObjectId(meeting_id)})
+    # The meeting may have moved to another day
+    await refresh_meeting_digests(db, str(current_user.id), [meeting, updated_meeting], get_zone(current_user.timezone))
     return updated_meeting
 
 @router.post("/{meeting_id}/generate-actions", response_model=List[NextStep])
@@ -206,6 +164,7 @@ async def generate_meeting_actions(
 ):
     """
     Generate actionable next steps from a meeting summary using AI.
+    Actions that match one of the meeting's existing steps return that step.
     """
     if not ObjectId.is_valid(meeting_id):
         raise HTTPException(
@@ -231,25 +190,10 @@ async def generate_meeting_actions(
         
     suggested_actions = await generate_next_steps(summary)
     
-    created_steps = []
-    for action in suggested_actions:
-        next_step_data = NextStepInDB(
-            meeting_id=meeting_id,
-            original_text=action,
-            edited_text=action,
-            status=NextStepStatus.suggested,
-            user_id=str(current_user.id),
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
-        )
-        
-        # Insert into DB
-        result = await db.next_steps.insert_one(
-            next_step_data.model_dump(by_alias=True, exclude={"id"})
-        )
-        
-        # Fetch created document
-        created_step = await db.next_steps.find_one({"_id": result.inserted_id})
-        created_steps.append(created_step)
+    # Regenerating merges into the meeting's existing steps instead of piling up duplicates
+    created_steps = await add_suggested_steps(
+        db, str(current_user.id), meeting_id, suggested_actions, settings.NEXT_STEP_DUPLICATE_THRESHOLD
+    )
         
+    await refresh_meeting_digests(db, str(current_user.id), [meeting], get_zone(current_user.timezone))
     return created_steps
\ No newline at end of file
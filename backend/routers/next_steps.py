@@ -1,13 +1,19 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
 from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
 
 from ..database.client import get_database
-from ..models.schemas import UserInDB, NextStep, NextStepCreate, NextStepUpdate, NextStepInDB, NextStepStatus
+from ..models.schemas import UserInDB, NextStep, NextStepCreate, NextStepUpdate, NextStepInDB, NextStepStatus, NextStepBatchExecute, NextStepExecuteResult, NextStepStats, NextStepStatusCounts, MeetingProgress
 from ..security.auth import get_current_user
+from ..services.drafts import enqueue_draft, build_next_step_email
+from ..services.digests import refresh_digest_for_meeting, refresh_digests_for_meetings
 from ..services.google_calendar import refresh_google_token
-from ..services.gmail import create_draft
+from ..services.gmail import create_drafts
+from ..services.fingerprints import fingerprint_fields
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/next-steps",
@@ -30,14 +36,16 @@ async def create_next_step(
         updated_at=datetime.utcnow()
     )
     
-    new_next_step = await db.next_steps.insert_one(
-        next_step_data.model_dump(by_alias=True, exclude={"id"})
-    )
+    new_next_step = await db.next_steps.insert_one({
+        **next_step_data.model_dump(by_alias=True, exclude={"id"}),
+        **fingerprint_fields(next_step_data.original_text)
+    })
     
     created_next_step = await db.next_steps.find_one(
         {"_id": new_next_step.inserted_id}
     )
     
+    await refresh_digest_for_meeting(db, str(current_user.id), next_step_data.meeting_id)
     return created_next_step
 
 @router.get("/", response_model=List[NextStep])
@@ -59,6 +67,164 @@ async def get_next_steps(
     
     return next_steps
 
+@router.get("/stats", response_model=NextStepStats)
+async def get_next_step_stats(
+    meeting_id: Optional[str] = Query(None),
+    current_user: UserInDB = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """
+    Get next step counts by status, overall and per meeting, computed on the server.
+    """
+    match = {"user_id": str(current_user.id)}
+    if meeting_id:
+        match["meeting_id"] = meeting_id
+        
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"meeting_id": "$meeting_id", "status": "$status"},
+            "count": {"$sum": 1}
+        }}
+    ]
+    groups = await db.next_steps.aggregate(pipeline).to_list(length=None)
+    
+    totals = NextStepStatusCounts()
+    per_meeting = {}
+    for group in groups:
+        group_meeting_id = str(group["_id"]["meeting_id"])
+        group_status = group["_id"]["status"]
+        # The in-memory engine keeps the enum member; Mongo returns its value
+        group_status = getattr(group_status, "value", group_status)
+        counts = per_meeting.setdefault(group_meeting_id, NextStepStatusCounts())
+        for target in (totals, counts):
+            if group_status in NextStepStatusCounts.model_fields:
+                setattr(target, group_status, getattr(target, group_status) + group["count"])
+            target.total += group["count"]
+            
+    return NextStepStats(
+        totals=totals,
+        meetings=[
+            MeetingProgress(meeting_id=key, counts=counts)
+            for key, counts in sorted(per_meeting.items())
+        ]
+    )
+
+async def _release_steps(db, steps: List[dict]):
+    # Undoes the claim on steps that were not drafted
+    for step in steps:
+        await db.next_steps.update_one(
+            {"_id": step["_id"], "status": NextStepStatus.pending},
+            {"$set": {"status": step.get("status") or NextStepStatus.confirmed, "updated_at": datetime.utcnow()}}
+        )
+
+@router.post("/execute-batch", response_model=List[NextStepExecuteResult])
+async def execute_next_steps_batch(
+    batch: NextStepBatchExecute,
+    current_user: UserInDB = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """
+    Execute several next steps at once by creating a Gmail draft for each,
+    sent to Gmail in batch requests rather than one request per draft.
+    Returns a result per requested step; one failing draft does not fail the batch.
+    """
+    if not current_user.refresh_token:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User not connected to Google (missing refresh token)"
+        )
+        
+    user_id = str(current_user.id)
+    results = {}
+    valid_ids = []
+    for step_id in dict.fromkeys(batch.step_ids):
+        if ObjectId.is_valid(step_id):
+            valid_ids.append(step_id)
+        else:
+            results[step_id] = NextStepExecuteResult(step_id=step_id, status="error", detail="Invalid step ID format")
+
+    # 1. Fetch all steps and their meetings in two queries
+    steps = await db.next_steps.find({
+        "_id": {"$in": [ObjectId(step_id) for step_id in valid_ids]},
+        "user_id": user_id
+    }).to_list(length=len(valid_ids))
+    steps_by_id = {str(step["_id"]): step for step in steps}
+    
+    meeting_ids = {step["meeting_id"] for step in steps if ObjectId.is_valid(step["meeting_id"])}
+    meetings = await db.meetings.find({
+        "_id": {"$in": [ObjectId(meeting_id) for meeting_id in meeting_ids]},
+        "user_id": user_id
+    }).to_list(length=len(meeting_ids))
+    meetings_by_id = {str(meeting["_id"]): meeting for meeting in meetings}
+    
+    candidates = []
+    for step_id in valid_ids:
+        step = steps_by_id.get(step_id)
+        if not step:
+            results[step_id] = NextStepExecuteResult(step_id=step_id, status="error", detail="Next step not found")
+        elif step.get("status") in (NextStepStatus.executed, NextStepStatus.pending):
+            # Already drafted, or a draft for it is on its way
+            results[step_id] = NextStepExecuteResult(step_id=step_id, status=NextStepStatus(step["status"]).value)
+        elif step["meeting_id"] not in meetings_by_id:
+            results[step_id] = NextStepExecuteResult(step_id=step_id, status="error", detail="Linked meeting not found")
+        else:
+            candidates.append(step)
+
+    # 2. Claim each step by moving it to pending, as execute_next_step does,
+    # so a concurrent request cannot draft the same step a second time
+    to_execute = []
+    for step in candidates:
+        claimed = await db.next_steps.update_one(
+            {"_id": step["_id"], "status": {"$nin": [NextStepStatus.pending, NextStepStatus.executed]}},
+            {"$set": {"status": NextStepStatus.pending, "updated_at": datetime.utcnow()}}
+        )
+        if claimed.modified_count == 1:
+            to_execute.append(step)
+        else:
+            step_id = str(step["_id"])
+            results[step_id] = NextStepExecuteResult(step_id=step_id, status=NextStepStatus.pending.value)
+
+    if to_execute:
+        drafted = []
+        try:
+            # 3. Refresh the Google token once for the whole batch
+            access_token = await refresh_google_token(current_user.refresh_token)
+            if not access_token:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Failed to refresh Google token"
+                )
+            
+            # 4. Create all drafts through Gmail's batch endpoint
+            messages = [
+                build_next_step_email(meetings_by_id[step["meeting_id"]], step, current_user.full_name)
+                for step in to_execute
+            ]
+            outcomes = await create_drafts(access_token, messages, user_id)
+            for step, (draft, error) in zip(to_execute, outcomes):
+                step_id = str(step["_id"])
+                if draft:
+                    results[step_id] = NextStepExecuteResult(step_id=step_id, status=NextStepStatus.executed.value)
+                    drafted.append(step["_id"])
+                else:
+                    logger.debug(f"Draft creation failed for step {step_id}: {error}")
+                    results[step_id] = NextStepExecuteResult(step_id=step_id, status="error", detail=error)
+        finally:
+            # 5. Mark every drafted step as executed in a single write, and put
+            # the others back so they can be retried, also when drafting raised
+            # or the request was cancelled part way
+            await _release_steps(db, [step for step in to_execute if step["_id"] not in drafted])
+            if drafted:
+                await db.next_steps.update_many(
+                    {"_id": {"$in": drafted}},
+                    {"$set": {"status": NextStepStatus.executed, "updated_at": datetime.utcnow()}}
+                )
+        if drafted:
+            await refresh_digests_for_meetings(db, user_id, [step["meeting_id"] for step in to_execute])
+            
+    return [results[step_id] for step_id in dict.fromkeys(batch.step_ids)]
+
 @router.patch("/{step_id}", response_model=NextStep)
 async def update_next_step(
     step_id: str,
@@ -94,6 +260,8 @@ async def update_next_step(
         return existing_step
         
     update_dict["updated_at"] = datetime.utcnow()
+    if "original_text" in update_dict:
+        update_dict.update(fingerprint_fields(update_dict["original_text"]))
     
     await db.next_steps.update_one(
         {"_id": ObjectId(step_id)},
@@ -101,6 +269,7 @@ async def update_next_step(
     )
     
     updated_step = await db.next_steps.find_one({"_id": ObjectId(step_id)})
+    await refresh_digest_for_meeting(db, str(current_user.id), updated_step["meeting_id"])
     return updated_step
 
 @router.delete("/{step_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -118,6 +287,11 @@ async def delete_next_step(
             detail="Invalid step ID format"
         )
         
+    existing_step = await db.next_steps.find_one({
+        "_id": ObjectId(step_id),
+        "user_id": str(current_user.id)
+    })
+    
     result = await db.next_steps.delete_one({
         "_id": ObjectId(step_id),
         "user_id": str(current_user.id)
@@ -129,16 +303,18 @@ async def delete_next_step(
             detail="Next step not found"
         )
     
+    await refresh_digest_for_meeting(db, str(current_user.id), existing_step["meeting_id"])
     return None
 
-@router.post("/{step_id}/execute", response_model=NextStep)
+@router.post("/{step_id}/execute", response_model=NextStep, status_code=status.HTTP_202_ACCEPTED)
 async def execute_next_step(
     step_id: str,
     current_user: UserInDB = Depends(get_current_user),
     db = Depends(get_database)
 ):
     """
-    Execute a next step by creating a Gmail draft.
+    Execute a next step by queueing the creation of a Gmail draft.
+    The step is returned as 'pending' and becomes 'executed' once a worker has created the draft.
     """
     if not ObjectId.is_valid(step_id):
         raise HTTPException(
@@ -146,7 +322,6 @@ async def execute_next_step(
             detail="Invalid step ID format"
         )
 
-    # 1. Fetch NextStep
     next_step = await db.next_steps.find_one({
         "_id": ObjectId(step_id),
         "user_id": str(current_user.id)
@@ -158,61 +333,27 @@ async def execute_next_step(
             detail="Next step not found"
         )
         
-    # 2. Fetch linked Meeting
-    meeting = await db.meetings.find_one({
-        "_id": ObjectId(next_step["meeting_id"]),
-        "user_id": str(current_user.id)
-    })
-    
-    if not meeting:
-         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Linked meeting not found"
-        )
-
-    # 3. Get fresh Google Access Token
     if not current_user.refresh_token:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User not connected to Google (missing refresh token)"
         )
         
-    access_token = await refresh_google_token(current_user.refresh_token)
-    if not access_token:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Failed to refresh Google token"
-        )
-
-    # 4. Create Draft
-    # Construct email details
-    recipients = meeting.get("participants", [])
-    
-    subject = f"Action Item: {next_step.get('edited_text') or next_step.get('original_text')}"
-    body = f"""
-Hello,
-
-Following up on our meeting "{meeting.get('title')}", here is an action item:
-
-{next_step.get('edited_text') or next_step.get('original_text')}
-
-Regards,
-{current_user.full_name or 'Daily Action Hub User'}
-    """
-    
-    draft = await create_draft(access_token, recipients, subject, body.strip())
-    
-    if not draft:
-         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to create Gmail draft"
-        )
-
-    # 5. Update Status
-    await db.next_steps.update_one(
-        {"_id": ObjectId(step_id)},
-        {"$set": {"status": NextStepStatus.executed, "updated_at": datetime.utcnow()}}
+    # Claim the step in a single conditional write, so concurrent requests
+    # cannot both queue a draft; only the one that moved it to pending does
+    result = await db.next_steps.update_one(
+        {
+            "_id": ObjectId(step_id),
+            "user_id": str(current_user.id),
+            "status": {"$nin": [NextStepStatus.pending, NextStepStatus.executed]}
+        },
+        {"$set": {"status": NextStepStatus.pending, "updated_at": datetime.utcnow()}}
     )
+    if result.modified_count != 1:
+        # Already queued or done; don't create a second draft
+        return await db.next_steps.find_one({"_id": ObjectId(step_id)})
+    await enqueue_draft(step_id, str(current_user.id), next_step.get("status"))
     
     updated_step = await db.next_steps.find_one({"_id": ObjectId(step_id)})
-    return updated_step
\ No newline at end of file
+    await refresh_digest_for_meeting(db, str(current_user.id), updated_step["meeting_id"])
+    return updated_step
@@ -0,0 +1,37 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Optional
+from ..database.client import get_database, settings
+from ..models.schemas import UserInDB, SearchResults, SearchResultType
+from ..security.auth import get_current_user
+from ..services.search import search
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/search",
+    tags=["search"],
+)
+
+@router.get("/", response_model=SearchResults)
+async def search_entries(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: Optional[SearchResultType] = Query(None),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(settings.SEARCH_PAGE_SIZE, ge=1, le=settings.SEARCH_MAX_PAGE_SIZE),
+    current_user: UserInDB = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """
+    Full-text search over the user's meeting titles, summaries and
+    participants and next step texts, best match first. Words match any
+    entry containing one of them; "-word" excludes and "quoted phrases"
+    must appear. Filter to one kind of entry with `type`.
+    """
+    logger.debug(f"Search q={q!r}, type={type}, page={page}, page_size={page_size}")
+    if page * page_size > settings.SEARCH_MAX_RESULTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Only the first {settings.SEARCH_MAX_RESULTS} results can be paged through; refine the query"
+        )
+    return await search(db, str(current_user.id), q, page, page_size, [type] if type else None)
@@ -1,5 +1,8 @@
 from fastapi import APIRouter, Depends
-from ..models.schemas import User
+from datetime import datetime
+from bson import ObjectId
+from ..database.client import get_database
+from ..models.schemas import User, UserInDB, UserUpdate
 from ..security.auth import get_current_user
 
 router = APIRouter(
@@ -9,4 +12,22 @@ router = APIRouter(
 
 @router.get("/me", response_model=User)
 async def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
\ No newline at end of file
+    return current_user
+
+@router.patch("/me", response_model=User)
+async def update_users_me(
+    user_update: UserUpdate,
+    current_user: UserInDB = Depends(get_current_user),
+    db = Depends(get_database)
+):
+    """
+    Update the current user's profile, including the timezone used for day boundaries.
+    """
+    update_data = user_update.model_dump(exclude_unset=True)
+    update_data["updated_at"] = datetime.utcnow()
+
+    await db.users.update_one(
+        {"_id": ObjectId(current_user.id)},
+        {"$set": update_data}
+    )
+    return await db.users.find_one({"_id": ObjectId(current_user.id)})
@@ -1,3 +1,12 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import Depends, HTTPException, status
@@ -12,13 +21,98 @@ from ..models.schemas import TokenData, UserInDB
 # but it's required for the Swagger UI to know it's a Bearer token flow.
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# scrypt parameters for newly created hashes. Raising these makes existing
+# hashes report `password_needs_rehash` so they are upgraded on next login.
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_SALT_BYTES = 16
+SCRYPT_KEY_BYTES = 32
+HASH_PREFIX = "scrypt"
+
+_hash_executor: Optional[ThreadPoolExecutor] = None
+
+def _get_hash_executor() -> ThreadPoolExecutor:
+    # Bounded pool so a burst of logins cannot starve the default executor
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash",
+        )
+    return _hash_executor
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int, dklen: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode("utf-8"),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=128 * n * r * p + 1024 * 1024,
+        dklen=dklen,
+    )
+
+def _parse_hash(hashed_password: str):
+    parts = hashed_password.split("$")
+    if len(parts) != 6 or parts[0] != HASH_PREFIX:
+        return None
+    try:
+        n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+        salt = base64.b64decode(parts[4])
+        key = base64.b64decode(parts[5])
+    except ValueError:
+        return None
+    return n, r, p, salt, key
+
 def verify_password(plain_password, hashed_password):
-    # SIMPLIFIED: Direct string comparison (No encryption)
-    return plain_password == hashed_password
+    """
+    Checks a password against a stored scrypt hash.
+    Legacy plaintext values are still accepted so they can be upgraded on login.
+    """
+    if not hashed_password:
+        return False
+    parsed = _parse_hash(hashed_password)
+    if parsed is None:
+        return hmac.compare_digest(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+    n, r, p, salt, key = parsed
+    candidate = _scrypt(plain_password, salt, n, r, p, len(key))
+    return hmac.compare_digest(candidate, key)
 
 def get_password_hash(password):
-    # SIMPLIFIED: Return plain password (No encryption)
-    return password
+    salt = os.urandom(SCRYPT_SALT_BYTES)
+    key = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P, SCRYPT_KEY_BYTES)
+    return f"{HASH_PREFIX}${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(key)}"
+
+def password_needs_rehash(hashed_password) -> bool:
+    parsed = _parse_hash(hashed_password or "")
+    if parsed is None:
+        return True
+    n, r, p, _, key = parsed
+    return (n, r, p, len(key)) != (SCRYPT_N, SCRYPT_R, SCRYPT_P, SCRYPT_KEY_BYTES)
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    """
+    Runs `verify_password` on the hashing pool so the event loop stays free.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_executor(), verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password) -> str:
+    """
+    Runs `get_password_hash` on the hashing pool so the event loop stays free.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_executor(), get_password_hash, password)
+
+def shutdown_hash_executor():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False)
+        _hash_executor = None
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -30,6 +124,71 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
+class TokenClaimsCache:
+    """
+    Bounded LRU cache mapping a token digest to its verified claims.
+    Entries are dropped once the token's `exp` has passed, so a cached token
+    never outlives the signature check it replaced. Claims are copied in and
+    out, so a caller changing its dict cannot change what later ones get.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        if self.maxsize <= 0:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(payload)
+
+    def set(self, token: str, payload: dict):
+        if self.maxsize <= 0:
+            return
+        exp = payload.get("exp")
+        if exp is None:
+            # Tokens without an expiry are never cached
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (float(exp), dict(payload))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+token_cache = TokenClaimsCache(settings.JWT_CACHE_SIZE)
+
+def decode_access_token(token: str) -> dict:
+    """
+    Verifies a JWT and returns its claims, skipping the signature check for
+    tokens already verified and still unexpired.
+    Raises JWTError if the token is invalid.
+    """
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    token_cache.set(token, payload)
+    return payload
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     print(f"DEBUG: get_current_user called")
     print(f"DEBUG: Received token: {token[:20]}...")
@@ -40,7 +199,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+        payload = decode_access_token(token)
         print(f"DEBUG: Decoded payload: {payload}")
         email: str = payload.get("sub")
         if email is None:
@@ -0,0 +1,81 @@
+import argparse
+import importlib.util
+import os
+import uvicorn
+from .database.client import settings
+
+# Production entry point, run from the repository root:
+#   python -m backend.serve [--workers N] [--port PORT]
+# `python -m backend.main` stays the single-process dev server with reload.
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def _fallback_engine(workers: int) -> str:
+    """
+    The in-memory fallback database lives inside each worker, so with more
+    than one worker every process would see different data (and a shared
+    MOCK_DB_PATH log would be written by several processes). Workers use
+    the SQLite fallback instead, which all processes on the host share.
+
+    SQLite shares the data but not its change feed: each worker's realtime
+    clients (/events/ws) only hear about writes made by that worker.
+    """
+    engine = settings.MOCK_DB_BACKEND
+    if workers > 1 and engine == "memory":
+        print(
+            f"WARNING: MOCK_DB_BACKEND=memory is per process; {workers} workers will use "
+            f"the SQLite fallback at {settings.MOCK_DB_SQLITE_PATH} if MongoDB is unreachable"
+        )
+        engine = "sqlite"
+    if workers > 1 and engine == "sqlite":
+        print(
+            "WARNING: on the SQLite fallback, realtime updates only carry writes made by the "
+            "client's own worker; changes made on the other workers (draft jobs, calendar syncs, "
+            "requests they served) are missed. Use MongoDB or a single worker for complete updates"
+        )
+    return engine
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Daily Action Hub API in production")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY or os.cpu_count() or 1)
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+
+    # Workers are separate processes that read their settings from the
+    # environment, so the fallback choice is passed on that way
+    os.environ["MOCK_DB_BACKEND"] = _fallback_engine(workers)
+
+    loop = "uvloop" if _available("uvloop") else "asyncio"
+    http = "httptools" if _available("httptools") else "h11"
+    if loop == "asyncio" or http == "h11":
+        print("WARNING: uvloop/httptools not installed, install uvicorn[standard] for full speed")
+
+    # Recycle workers to bound memory growth; the jitter keeps them from all
+    # restarting at once. Only the multi-worker supervisor replaces a worker
+    # that exits, so a single process is never recycled.
+    max_requests = settings.SERVER_MAX_REQUESTS or None
+    if workers == 1:
+        max_requests = None
+
+    print(f"Starting {workers} worker(s) on {args.host}:{args.port} (loop={loop}, http={http})")
+    uvicorn.run(
+        "backend.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE,
+        # On SIGTERM, stop accepting connections and give in-flight requests
+        # this long before the lifespan shutdown runs
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        limit_max_requests=max_requests,
+        limit_max_requests_jitter=settings.SERVER_MAX_REQUESTS_JITTER if max_requests else 0,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,87 @@
-import openai
+import asyncio
+import hashlib
 import json
 import logging
-from typing import List
+from collections import OrderedDict
+from itertools import chain
+from typing import TYPE_CHECKING, List, Optional
 from ..database.client import settings
+from .circuit_breaker import get_breaker, CircuitOpenError
+from .chunking import split_into_chunks
+from .fingerprints import dedupe
+
+if TYPE_CHECKING:
+    import openai
 
 logger = logging.getLogger(__name__)
 
-async def generate_next_steps(summary: str) -> List[str]:
+ai_breaker = get_breaker("openai")
+
+_client: Optional["openai.AsyncOpenAI"] = None
+# Last successful result per summary, served while OpenAI is unavailable
+_results: "OrderedDict[str, List[str]]" = OrderedDict()
+
+def _get_client() -> "openai.AsyncOpenAI":
+    global _client
+    if _client is None:
+        # The SDK takes longer to import than the rest of the app, so it is
+        # only loaded on the first real AI call
+        import openai
+        _client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY, timeout=settings.OPENAI_TIMEOUT)
+    return _client
+
+def _is_outage(error: Exception) -> bool:
+    # Errors that mean OpenAI itself is unavailable, as opposed to a bad request
+    import openai
+    return isinstance(error, (openai.APIConnectionError, openai.InternalServerError))
+
+def _cache_key(summary: str) -> str:
+    return hashlib.sha256(summary.encode()).hexdigest()
+
+def _remember(key: str, steps: List[str]):
+    _results[key] = steps
+    _results.move_to_end(key)
+    while len(_results) > settings.AI_CACHE_SIZE:
+        _results.popitem(last=False)
+
+def _parse_steps(content: str) -> List[str]:
+    content = content.strip()
+
+    # Clean potential markdown code blocks
+    if content.startswith("```json"):
+        content = content[7:]
+    elif content.startswith("```"):
+         content = content[3:]
+         
+    if content.endswith("```"):
+        content = content[:-3]
+    
+    steps = json.loads(content.strip())
+    
+    if isinstance(steps, list):
+        return [str(step) for step in steps]
+    logger.warning(f"AI response was not a list: {content}")
+    return []
+
+def merge_steps(step_lists: List[List[str]]) -> List[str]:
     """
-    Extracts actionable next steps from a meeting summary using AI.
-    If OPENAI_API_KEY is not set, returns a mock list.
+    Merges the steps extracted from each chunk into one list, in chunk
+    order, keeping the first copy of items that overlapping chunks report
+    with slightly different wording.
     """
-    if not settings.OPENAI_API_KEY or settings.OPENAI_API_KEY == "your_openai_api_key":
-        logger.info("OPENAI_API_KEY not set or default. Returning mock AI suggestions.")
-        return [
-            "Follow up on the discussion points",
-            "Schedule the next sync meeting",
-            "Email the stakeholders with the summary"
-        ]
+    return [step.strip() for step in dedupe(chain.from_iterable(step_lists), settings.NEXT_STEP_DUPLICATE_THRESHOLD)]
 
+async def _extract_steps(text: str) -> List[str]:
+    """
+    One extraction call, guarded by the OpenAI circuit breaker.
+    """
+    ai_breaker.before_call()
+    success = None
     try:
-        client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        client = _get_client()
         
         system_prompt = "You are an assistant that extracts actionable next steps from meeting summaries. Return a JSON array of strings."
-        user_prompt = f"Extract action items from this summary:\n\n{summary}"
+        user_prompt = f"Extract action items from this summary:\n\n{text}"
 
         response = await client.chat.completions.create(
             model="gpt-3.5-turbo",
@@ -33,27 +91,75 @@ async def generate_next_steps(summary: str) -> List[str]:
             ],
             temperature=0.3,
         )
+        success = True
+        return _parse_steps(response.choices[0].message.content)
+    except Exception as e:
+        if _is_outage(e):
+            success = False
+        raise
+    finally:
+        ai_breaker.record(success)
 
-        content = response.choices[0].message.content.strip()
-        
-        # Clean potential markdown code blocks
-        if content.startswith("```json"):
-            content = content[7:]
-        elif content.startswith("```"):
-             content = content[3:]
-             
-        if content.endswith("```"):
-            content = content[:-3]
-        
-        steps = json.loads(content.strip())
-        
-        if isinstance(steps, list):
-            return [str(step) for step in steps]
-        else:
-            logger.warning(f"AI response was not a list: {content}")
-            return []
+async def generate_next_steps(summary: str) -> List[str]:
+    """
+    Extracts actionable next steps from a meeting summary using AI.
+    If OPENAI_API_KEY is not set, returns a mock list.
 
-    except Exception as e:
-        logger.error(f"Error generating next steps with AI: {e}")
+    Long summaries are split into overlapping chunks of AI_CHUNK_TOKENS that
+    are extracted concurrently (AI_CHUNK_CONCURRENCY at a time) and merged,
+    so latency grows with the number of chunk waves rather than with the
+    length of a single prompt. Chunks that fail are skipped.
+
+    While OpenAI is unavailable, returns the last result for the same summary
+    or raises CircuitOpenError when there is none.
+    """
+    if not settings.OPENAI_API_KEY or settings.OPENAI_API_KEY == "your_openai_api_key":
+        logger.info("OPENAI_API_KEY not set or default. Returning mock AI suggestions.")
+        return [
+            "Follow up on the discussion points",
+            "Schedule the next sync meeting",
+            "Email the stakeholders with the summary"
+        ]
+
+    key = _cache_key(summary)
+    try:
+        ai_breaker.before_call()
+    except CircuitOpenError:
+        if key in _results:
+            logger.warning("OpenAI circuit open, serving cached next steps")
+            return list(_results[key])
+        raise
+    else:
+        # Only a check: each chunk's call goes through the breaker itself
+        ai_breaker.record(None)
+
+    chunks = split_into_chunks(
+        summary,
+        settings.AI_CHUNK_TOKENS,
+        min(settings.AI_CHUNK_OVERLAP_TOKENS, settings.AI_CHUNK_TOKENS // 2),
+    ) or [summary]
+    semaphore = asyncio.Semaphore(settings.AI_CHUNK_CONCURRENCY)
+
+    async def extract(chunk: str) -> Optional[List[str]]:
+        async with semaphore:
+            try:
+                return await _extract_steps(chunk)
+            except Exception as e:
+                logger.error(f"Error generating next steps with AI: {e}")
+                return None
+
+    if len(chunks) > 1:
+        logger.info(f"Extracting next steps from {len(chunks)} chunks")
+    results = await asyncio.gather(*(extract(chunk) for chunk in chunks))
+    extracted = [steps for steps in results if steps is not None]
+
+    if len(extracted) < len(chunks) and key in _results:
+        # A complete earlier result beats a partial one
+        return list(_results[key])
+    if not extracted:
         # Return empty list or basic fallback on error to not crash the flow
-        return []
\ No newline at end of file
+        return []
+    steps = merge_steps(extracted)
+    if len(extracted) == len(chunks):
+        _remember(key, steps)
+    return steps
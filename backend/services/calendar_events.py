@@ -0,0 +1,125 @@
+import re
+from datetime import datetime, date, time, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+# Keywords that mark a location or description as an online meeting,
+# matched against lowercased text
+_CONFERENCE_KEYWORDS = re.compile(r"zoom|meet\.google|teams|webex")
+
+# Join links of the conferencing providers we recognise. Only run on text
+# that already matched a keyword, so most events never pay for it.
+_CONFERENCE_LINK = re.compile(
+    r"https?://(?:[\w-]+\.)*(?:zoom\.us|meet\.google\.com|teams\.microsoft\.com|teams\.live\.com|webex\.com)/[^\s<>\"')\]]*",
+    re.IGNORECASE,
+)
+
+def _conference_link(event: Dict[str, Any]) -> Optional[str]:
+    conference = event.get("conferenceData") or {}
+    for entry_point in conference.get("entryPoints") or ():
+        if entry_point.get("entryPointType") == "video" and entry_point.get("uri"):
+            return entry_point["uri"]
+    return event.get("hangoutLink")
+
+def detect_online_meeting(event: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+    """
+    Returns whether an event is an online meeting and its join link, if one
+    can be found, in a single pass over conference data, location and
+    description.
+    """
+    link = _conference_link(event)
+    if link:
+        return True, link
+    online = bool(event.get("conferenceData"))
+    for text in (event.get("location"), event.get("description")):
+        if not text or not _CONFERENCE_KEYWORDS.search(text.lower()):
+            continue
+        online = True
+        match = _CONFERENCE_LINK.search(text)
+        if match:
+            return True, match.group(0)
+    return online, None
+
+def _instance_key(event: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+    # Instances of a recurring event share the iCalUID, so include the start
+    start = event.get("originalStartTime") or event.get("start") or {}
+    return event.get("iCalUID") or event.get("id"), start.get("dateTime") or start.get("date")
+
+def merge_calendar_events(event_lists: Iterable[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Merges the events fetched from several calendars, keeping one copy of
+    events that appear on more than one (matched by iCalUID). Earlier lists
+    win, except that a live copy replaces a cancelled one.
+    """
+    merged: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+    for events in event_lists:
+        for event in events:
+            key = _instance_key(event)
+            existing = merged.get(key)
+            if existing is None or (existing.get("status") == "cancelled" and event.get("status") != "cancelled"):
+                merged[key] = event
+    return list(merged.values())
+
+def _parse_time(value: Dict[str, Any], zone: ZoneInfo) -> Optional[datetime]:
+    date_time = value.get("dateTime")
+    if date_time:
+        # Timed event: RFC 3339 with an offset or "Z"
+        parsed = datetime.fromisoformat(date_time)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=zone)
+        return parsed.astimezone(timezone.utc)
+    day = value.get("date")
+    if day:
+        # All day event (YYYY-MM-DD), anchored to the user's local midnight
+        return datetime.combine(date.fromisoformat(day), time.min, tzinfo=zone).astimezone(timezone.utc)
+    return None
+
+def normalize_event(event: Dict[str, Any], user_id: str, zone: ZoneInfo, now: datetime) -> Optional[Dict[str, Any]]:
+    """
+    Turns a Google Calendar event into the fields of a meeting document, or
+    None for cancelled or unparseable events. The result is built directly
+    rather than through MeetingInDB: every value comes from our own parsing,
+    so model validation would only repeat the work.
+    """
+    if event.get("status") == "cancelled":
+        return None
+    start = event.get("start")
+    end = event.get("end")
+    if not start or not end:
+        return None
+    try:
+        start_time = _parse_time(start, zone)
+        # The end date of an all day event is exclusive, so it is also a midnight
+        end_time = _parse_time(end, zone)
+    except ValueError:
+        return None
+    if start_time is None or end_time is None:
+        return None
+
+    is_online, link = detect_online_meeting(event)
+    return {
+        "title": event.get("summary") or "(No Title)",
+        "start_time": start_time,
+        "end_time": end_time,
+        "is_online": is_online,
+        "online_meeting_link": link,
+        "location": event.get("location"),
+        "is_recorded": False,
+        "summary": event.get("description"),
+        "participants": [p["email"] for p in event.get("attendees") or () if p.get("email")],
+        "user_id": user_id,
+        "google_event_id": event["id"],
+        "updated_at": now,
+    }
+
+def normalize_events(events: Iterable[Dict[str, Any]], user_id: str, zone: ZoneInfo, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Normalizes a batch of events, dropping the ones that are not meetings.
+    """
+    now = now or datetime.utcnow()
+    meetings = []
+    for event in events:
+        meeting = normalize_event(event, user_id, zone, now)
+        if meeting is not None:
+            meetings.append(meeting)
+    return meetings
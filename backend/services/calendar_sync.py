@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import HTTPException, status
+from pymongo import UpdateOne
+from zoneinfo import ZoneInfo
+from ..database.client import settings
+from ..models.schemas import UserInDB
+from .google_calendar import refresh_google_token, fetch_all_calendar_events, fetch_updated_events
+from .google_client import GoogleAPIError
+from .circuit_breaker import CircuitOpenError
+from .calendar_events import normalize_events
+from .concurrency import SingleFlight
+from .digests import refresh_digests, meeting_day
+from .timezones import get_zone, local_today
+
+logger = logging.getLogger(__name__)
+
+# Concurrent syncs for the same user share one run; the semaphore caps how
+# many distinct users sync at once in this worker.
+sync_flights = SingleFlight()
+sync_semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_SYNCS)
+
+async def get_access_token(user: UserInDB) -> str:
+    access_token = await refresh_google_token(user.refresh_token)
+    if not access_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Failed to refresh Google token"
+        )
+    return access_token
+
+async def upsert_events(db, user_id: str, zone: ZoneInfo, events: List[Dict[str, Any]]) -> int:
+    """
+    Normalizes Google events, upserts them as meetings in one batch and
+    refreshes the digests of the days they fall on.
+    """
+    meetings = normalize_events(events, user_id, zone)
+    if meetings:
+        now = datetime.utcnow()
+        await db.meetings.bulk_write([
+            # We use $setOnInsert for created_at to preserve original creation time
+            UpdateOne(
+                {"user_id": user_id, "google_event_id": meeting_data["google_event_id"]},
+                {"$set": meeting_data, "$setOnInsert": {"created_at": now}},
+                upsert=True
+            )
+            for meeting_data in meetings
+        ], ordered=False)
+    await refresh_digests(db, user_id, {meeting_day(meeting_data, zone) for meeting_data in meetings}, zone)
+    return len(meetings)
+
+async def run_sync(current_user: UserInDB, db):
+    """
+    Syncs today's events of all the user's calendars, sharing a run already
+    in flight for the same user.
+    """
+    return await sync_flights.do(
+        str(current_user.id),
+        lambda: _run_sync(current_user, db)
+    )
+
+async def _run_sync(current_user: UserInDB, db):
+    async with sync_semaphore:
+        try:
+            return await _sync_user_calendar(current_user, db)
+        except CircuitOpenError as e:
+            # Google is down: keep serving the meetings from the last sync
+            return {
+                "synced": 0,
+                "degraded": True,
+                "detail": "Google Calendar is temporarily unavailable, showing the last synced meetings",
+                "retry_after": round(e.retry_after),
+            }
+
+async def _sync_user_calendar(current_user: UserInDB, db):
+    # 1. Refresh Google Token
+    access_token = await get_access_token(current_user)
+
+    # 2. Fetch Events for Today in the user's timezone, from all their calendars
+    zone = get_zone(current_user.timezone)
+    today = local_today(zone)
+    try:
+        events = await fetch_all_calendar_events(access_token, today, zone, str(current_user.id))
+    except GoogleAPIError as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Failed to fetch Google Calendar events: {e}"
+        )
+
+    # 3. Normalize and Upsert in one batch
+    synced_count = await upsert_events(db, str(current_user.id), zone, events)
+    return {"synced": synced_count}
+
+async def sync_changed_events(current_user: UserInDB, db, calendar_id: str, since: Optional[datetime]) -> Tuple[int, bool]:
+    """
+    Incremental sync of one calendar: upserts only the events changed since
+    `since`. Falls back to a full sync when there is no starting point or
+    Google has expired it. Returns (synced count, whether it was incremental).
+    """
+    if since is None:
+        return (await run_sync(current_user, db)).get("synced", 0), False
+
+    access_token = await get_access_token(current_user)
+    zone = get_zone(current_user.timezone)
+    try:
+        events = await fetch_updated_events(access_token, calendar_id, since, zone, str(current_user.id))
+    except GoogleAPIError as e:
+        if e.status_code != 410:
+            raise
+        logger.info(f"Changes for calendar {calendar_id} expired, running a full sync")
+        return (await run_sync(current_user, db)).get("synced", 0), False
+    user_id = str(current_user.id)
+    synced = await upsert_events(db, user_id, zone, events)
+    await remove_cancelled_events(db, user_id, zone, events)
+    return synced, True
+
+async def remove_cancelled_events(db, user_id: str, zone: ZoneInfo, events: List[Dict[str, Any]]) -> int:
+    """
+    Deletes the meetings of events that were cancelled or deleted in Google,
+    which only incremental fetches (showDeleted) report.
+    """
+    cancelled = [event["id"] for event in events if event.get("status") == "cancelled" and event.get("id")]
+    if not cancelled:
+        return 0
+    query = {"user_id": user_id, "google_event_id": {"$in": cancelled}}
+    meetings = await db.meetings.find(query).to_list(length=None)
+    if not meetings:
+        return 0
+    await db.meetings.delete_many(query)
+    await refresh_digests(db, user_id, {meeting_day(meeting, zone) for meeting in meetings}, zone)
+    return len(meetings)
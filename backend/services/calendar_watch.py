@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional
+from bson import ObjectId
+from ..database.client import settings, get_database
+from ..models.schemas import UserInDB
+from .google_calendar import list_calendars, watch_calendar, stop_channel
+from .calendar_sync import get_access_token, sync_changed_events
+from .jobs import job_queue, PermanentJobError
+
+logger = logging.getLogger(__name__)
+
+CALENDAR_SYNC_JOB = "calendar_sync"
+
+# Changes are fetched from a little before the last sync so events updated
+# while it ran, or stamped by a clock slightly behind ours, are not missed
+SYNC_OVERLAP = timedelta(minutes=1)
+# How long one worker may spend renewing a channel before others retry it
+RENEW_LEASE = timedelta(minutes=10)
+
+async def _open_channel(db, access_token: str, user_id: str, calendar_id: str, synced_at: Optional[datetime]) -> Dict[str, Any]:
+    channel_id = uuid.uuid4().hex
+    channel_token = secrets.token_urlsafe(32)
+    resource = await watch_calendar(
+        access_token, calendar_id, channel_id, channel_token, settings.GOOGLE_WATCH_TTL_SECONDS, user_id
+    )
+    now = datetime.utcnow()
+    if resource.get("expiration"):
+        expiration = datetime.utcfromtimestamp(int(resource["expiration"]) / 1000)
+    else:
+        expiration = now + timedelta(seconds=settings.GOOGLE_WATCH_TTL_SECONDS)
+    channel = {
+        "_id": channel_id,
+        "user_id": user_id,
+        "calendar_id": calendar_id,
+        "resource_id": resource["resourceId"],
+        "token": channel_token,
+        "expiration": expiration,
+        "renew_after": now,
+        "synced_at": synced_at or now,
+        "created_at": now,
+    }
+    await db.calendar_channels.insert_one(channel)
+    return channel
+
+async def _close_channel(db, access_token: Optional[str], channel: Dict[str, Any]):
+    if access_token:
+        await stop_channel(access_token, channel["_id"], channel["resource_id"], channel["user_id"])
+    await db.calendar_channels.delete_one({"_id": channel["_id"]})
+
+async def register_channels(db, user: UserInDB) -> List[Dict[str, Any]]:
+    """
+    Opens a push channel for each of the user's calendars, replacing the
+    channels they already had.
+    """
+    user_id = str(user.id)
+    access_token = await get_access_token(user)
+    existing = await db.calendar_channels.find({"user_id": user_id}).to_list(length=None)
+    synced_at = {channel["calendar_id"]: channel.get("synced_at") for channel in existing}
+
+    channels = []
+    for calendar_id in await list_calendars(access_token, user_id):
+        channels.append(await _open_channel(db, access_token, user_id, calendar_id, synced_at.get(calendar_id)))
+    for channel in existing:
+        await _close_channel(db, access_token, channel)
+    return channels
+
+async def stop_channels(db, user: UserInDB) -> int:
+    user_id = str(user.id)
+    channels = await db.calendar_channels.find({"user_id": user_id}).to_list(length=None)
+    access_token = await get_access_token(user) if channels else None
+    for channel in channels:
+        await _close_channel(db, access_token, channel)
+    return len(channels)
+
+async def handle_notification(db, headers: Mapping[str, str]) -> bool:
+    """
+    Validates a push notification and queues an incremental sync of the
+    calendar it is about. Returns False for unknown or forged channels.
+    """
+    channel_id = headers.get("X-Goog-Channel-ID")
+    if not channel_id:
+        return False
+    channel = await db.calendar_channels.find_one({"_id": channel_id})
+    if (
+        not channel
+        or not secrets.compare_digest(headers.get("X-Goog-Channel-Token", ""), channel["token"])
+        or headers.get("X-Goog-Resource-ID") != channel["resource_id"]
+    ):
+        return False
+
+    # "sync" only confirms that a new channel works. Google sends bursts of
+    # notifications for one change, so a sync still waiting to run takes
+    # the newest one rather than another job being queued
+    if headers.get("X-Goog-Resource-State") != "sync":
+        await job_queue.enqueue(CALENDAR_SYNC_JOB, {
+            "channel_id": channel_id,
+            "received_at": datetime.utcnow(),
+        }, dedupe_on="channel_id")
+    return True
+
+async def _calendar_sync_job(db, payload: Dict[str, Any]):
+    channel = await db.calendar_channels.find_one({"_id": payload["channel_id"]})
+    if not channel:
+        # Replaced or stopped since the notification arrived
+        return
+    synced_at = channel.get("synced_at")
+    if synced_at and synced_at > payload["received_at"]:
+        # A sync that started after this notification already picked it up
+        return
+
+    user = await _find_user(db, channel["user_id"])
+    if not user or not user.get("refresh_token"):
+        raise PermanentJobError("User not connected to Google (missing refresh token)")
+
+    started = datetime.utcnow()
+    since = synced_at - SYNC_OVERLAP if synced_at else None
+    synced, incremental = await sync_changed_events(UserInDB(**user), db, channel["calendar_id"], since)
+    await db.calendar_channels.update_one({"_id": channel["_id"]}, {"$set": {"synced_at": started}})
+    logger.info(f"Synced {synced} events for channel {channel['_id']} ({'incremental' if incremental else 'full'})")
+
+async def _find_user(db, user_id: str):
+    return await db.users.find_one({"_id": ObjectId(user_id)}) if ObjectId.is_valid(user_id) else None
+
+job_queue.register(CALENDAR_SYNC_JOB, _calendar_sync_job)
+
+class ChannelRenewer:
+    """
+    Re-registers push channels before Google expires them. Channels are
+    claimed one at a time with a short lease, so several workers can run
+    the loop without renewing the same channel twice.
+    """
+
+    def __init__(self, interval: float, renew_before: timedelta):
+        self.interval = interval
+        self.renew_before = renew_before
+        self._task: Optional[asyncio.Task] = None
+
+    async def _claim(self, db, started: datetime) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        # Channels opened during this pass are left alone, even if Google
+        # gave them a lifetime shorter than renew_before
+        return await db.calendar_channels.find_one_and_update(
+            {
+                "expiration": {"$lte": now + self.renew_before},
+                "renew_after": {"$lte": now},
+                "created_at": {"$lt": started},
+            },
+            {"$set": {"renew_after": now + RENEW_LEASE}},
+            # ReturnDocument.AFTER, without importing pymongo at startup
+            return_document=True,
+        )
+
+    async def renew_due(self) -> int:
+        db = await get_database()
+        started = datetime.utcnow()
+        renewed = 0
+        while True:
+            channel = await self._claim(db, started)
+            if channel is None:
+                return renewed
+            try:
+                user = await _find_user(db, channel["user_id"])
+                if not user or not user.get("refresh_token"):
+                    await _close_channel(db, None, channel)
+                    continue
+                access_token = await get_access_token(UserInDB(**user))
+                # A newer channel for the calendar means an earlier attempt
+                # opened the replacement but failed to close this one, and
+                # only the closing is left to do
+                replacement = await db.calendar_channels.find_one({
+                    "user_id": channel["user_id"],
+                    "calendar_id": channel["calendar_id"],
+                    "created_at": {"$gt": channel["created_at"]},
+                })
+                if replacement is None:
+                    await _open_channel(db, access_token, channel["user_id"], channel["calendar_id"], channel.get("synced_at"))
+                await _close_channel(db, access_token, channel)
+                renewed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The lease runs out and the channel is retried on a later pass
+                logger.error(f"Failed to renew channel {channel['_id']}: {e}")
+
+    async def _run(self):
+        while True:
+            try:
+                renewed = await self.renew_due()
+                if renewed:
+                    logger.info(f"Renewed {renewed} calendar channels")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Channel renewal pass failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None and settings.GOOGLE_WEBHOOK_URL:
+            self._task = asyncio.create_task(self._run(), name="channel-renewer")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+channel_renewer = ChannelRenewer(
+    interval=settings.GOOGLE_WATCH_CHECK_INTERVAL,
+    renew_before=timedelta(seconds=settings.GOOGLE_WATCH_RENEW_BEFORE_SECONDS),
+)
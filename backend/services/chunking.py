@@ -0,0 +1,78 @@
+import logging
+import re
+from functools import lru_cache
+from typing import Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends, or line breaks, are where chunks are preferably cut
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"\S+\s*")
+
+@lru_cache(maxsize=1)
+def _encoding() -> Optional[Any]:
+    # tiktoken is optional: exact counts when installed, an estimate otherwise
+    try:
+        import tiktoken
+    except ImportError:
+        logger.info("tiktoken not installed, estimating token counts")
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # English averages about 4 characters per token
+    return (len(text) + 3) // 4
+
+def _units(text: str, max_tokens: int) -> List[str]:
+    """
+    Splits text into sentences, and sentences longer than max_tokens into
+    runs of words, so every unit fits in a chunk.
+    """
+    units = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if count_tokens(sentence) <= max_tokens:
+            units.append(sentence)
+            continue
+        piece = ""
+        for word in _WORD.findall(sentence):
+            if piece and count_tokens(piece + word) > max_tokens:
+                units.append(piece.strip())
+                piece = ""
+            piece += word
+        if piece.strip():
+            units.append(piece.strip())
+    return units
+
+def split_into_chunks(text: str, max_tokens: int, overlap_tokens: int) -> List[str]:
+    """
+    Splits text into chunks of at most max_tokens, cut at sentence
+    boundaries where possible. Each chunk repeats the last sentences of the
+    previous one, up to overlap_tokens, so an action item that straddles a
+    cut is still seen whole by one chunk.
+    """
+    units = _units(text, max_tokens)
+    sizes = [count_tokens(unit) + 1 for unit in units]
+    chunks: List[str] = []
+    start = 0
+    while start < len(units):
+        end, total = start, 0
+        while end < len(units) and (end == start or total + sizes[end] <= max_tokens):
+            total += sizes[end]
+            end += 1
+        chunks.append(" ".join(units[start:end]))
+        if end == len(units):
+            break
+        # Step back over the trailing sentences that fit in the overlap,
+        # always moving forward by at least one
+        next_start, overlap = end, 0
+        while next_start - 1 > start and overlap + sizes[next_start - 1] <= overlap_tokens:
+            next_start -= 1
+            overlap += sizes[next_start]
+        start = next_start
+    return chunks
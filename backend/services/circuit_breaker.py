@@ -0,0 +1,105 @@
+import logging
+import time
+from typing import Any, Dict, Optional
+from ..database.client import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a dependency whose circuit is open.
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is temporarily unavailable")
+        self.name = name
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency for a while so requests fail fast
+    instead of holding connections open until they time out.
+
+    Closed: calls pass and consecutive failures are counted; reaching
+    `failure_threshold` opens the circuit. Open: calls raise CircuitOpenError
+    until `recovery_timeout` has passed. Half open: up to `half_open_calls`
+    trial calls pass; a success closes the circuit, a failure reopens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float, half_open_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_calls = half_open_calls
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._trials = 0
+        return self._state
+
+    def retry_after(self) -> float:
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+
+    def before_call(self):
+        state = self.state
+        if state == OPEN or (state == HALF_OPEN and self._trials >= self.half_open_calls):
+            raise CircuitOpenError(self.name, self.retry_after())
+        if state == HALF_OPEN:
+            self._trials += 1
+
+    def record(self, success: Optional[bool]):
+        """
+        Records the outcome of a call let through by before_call. None means
+        the call ended without an outcome (e.g. it was cancelled).
+        """
+        if self._state == HALF_OPEN:
+            self._trials = max(0, self._trials - 1)
+        if success is None:
+            return
+        if success:
+            if self._state != CLOSED:
+                logger.info(f"Circuit {self.name} closed")
+            self._state = CLOSED
+            self._failures = 0
+            return
+        self._failures += 1
+        if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != OPEN:
+                logger.warning(f"Circuit {self.name} opened after {self._failures} failures")
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        return {
+            "state": state,
+            "failures": self._failures,
+            "retry_after": round(self.retry_after(), 1) if state == OPEN else None,
+        }
+
+breakers: Dict[str, CircuitBreaker] = {}
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = breakers.get(name)
+    if breaker is None:
+        breaker = CircuitBreaker(
+            name,
+            failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+            recovery_timeout=settings.CIRCUIT_RECOVERY_SECONDS,
+            half_open_calls=settings.CIRCUIT_HALF_OPEN_CALLS,
+        )
+        breakers[name] = breaker
+    return breaker
+
+def circuit_states() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.snapshot() for name, breaker in breakers.items()}
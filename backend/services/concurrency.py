@@ -0,0 +1,29 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight operation.
+    Callers arriving while the operation is running await the same result
+    (or exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    def is_running(self, key: Hashable) -> bool:
+        return key in self._in_flight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            logger.info(f"Joining in-flight operation for {key}")
+        # Shield so one caller disconnecting does not cancel the shared work
+        return await asyncio.shield(task)
@@ -0,0 +1,124 @@
+import logging
+from datetime import datetime, date
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo
+from bson import ObjectId
+from ..models.schemas import NextStepStatus
+from .timezones import get_zone, local_date, local_day_range
+from .fingerprints import FINGERPRINT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Steps that still need the user's attention
+OUTSTANDING_STATUSES = [NextStepStatus.suggested, NextStepStatus.confirmed, NextStepStatus.pending]
+
+def digest_id(user_id: str, day: date) -> str:
+    return f"{user_id}:{day.isoformat()}"
+
+def meeting_day(meeting: dict, zone: ZoneInfo) -> Optional[date]:
+    """
+    Returns the day a meeting falls on in the user's local time.
+    """
+    start_time = meeting.get("start_time")
+    return local_date(start_time, zone) if isinstance(start_time, datetime) else None
+
+async def user_zone(db, user_id: str) -> ZoneInfo:
+    user = await db.users.find_one({"_id": ObjectId(user_id)}) if ObjectId.is_valid(user_id) else None
+    return get_zone(user.get("timezone") if user else None)
+
+async def build_digest(db, user_id: str, day: date, zone: ZoneInfo) -> dict:
+    """
+    Computes the digest document for one user and local day from the source collections.
+    """
+    start_time, end_time = local_day_range(day, zone)
+    meetings = await db.meetings.find({
+        "user_id": user_id,
+        "start_time": {"$gte": start_time, "$lt": end_time}
+    }).sort("start_time", 1).to_list(length=None)
+
+    meeting_ids = [str(meeting["_id"]) for meeting in meetings]
+    steps = []
+    if meeting_ids:
+        steps = await db.next_steps.find({
+            "user_id": user_id,
+            "meeting_id": {"$in": meeting_ids}
+        }).sort("created_at", -1).to_list(length=None)
+
+    counts = {status.value: 0 for status in NextStepStatus}
+    for step in steps:
+        step_status = getattr(step.get("status"), "value", step.get("status"))
+        if step_status in counts:
+            counts[step_status] += 1
+    counts["total"] = len(steps)
+
+    return {
+        "_id": digest_id(user_id, day),
+        "user_id": user_id,
+        "day": day.isoformat(),
+        # The day's boundaries depend on the zone it was built for
+        "timezone": zone.key,
+        "meetings": meetings,
+        "next_steps": [
+            {key: value for key, value in step.items() if key not in FINGERPRINT_FIELDS}
+            for step in steps if step.get("status") in OUTSTANDING_STATUSES
+        ],
+        "counts": counts,
+        "updated_at": datetime.utcnow(),
+    }
+
+async def refresh_digests(db, user_id: str, days: Iterable[Optional[date]], zone: Optional[ZoneInfo] = None):
+    """
+    Rebuilds the stored digests for the given days. Called from every write
+    path that touches meetings or next steps, so reads never recompute.
+    """
+    days = {day for day in days if day is not None}
+    if not days:
+        return
+    zone = zone or await user_zone(db, user_id)
+    for day in days:
+        digest = await build_digest(db, user_id, day, zone)
+        try:
+            await db.daily_digests.update_one(
+                {"_id": digest["_id"]},
+                {"$set": {key: value for key, value in digest.items() if key != "_id"}},
+                upsert=True
+            )
+        except Exception as e:
+            # The digest is derived data; never fail the user's write over it
+            logger.error(f"Failed to refresh digest {digest['_id']}: {e}")
+
+async def refresh_meeting_digests(db, user_id: str, meetings: Iterable[Optional[dict]], zone: Optional[ZoneInfo] = None):
+    """
+    Rebuilds the digests of the local days the given meetings fall on.
+    """
+    meetings = [meeting for meeting in meetings if meeting]
+    if not meetings:
+        return
+    zone = zone or await user_zone(db, user_id)
+    await refresh_digests(db, user_id, [meeting_day(meeting, zone) for meeting in meetings], zone)
+
+async def refresh_digest_for_meeting(db, user_id: str, meeting_id: str):
+    if not ObjectId.is_valid(meeting_id):
+        return
+    meeting = await db.meetings.find_one({"_id": ObjectId(meeting_id), "user_id": user_id})
+    await refresh_meeting_digests(db, user_id, [meeting])
+
+async def refresh_digests_for_meetings(db, user_id: str, meeting_ids: Iterable[str]):
+    ids = [ObjectId(meeting_id) for meeting_id in set(meeting_ids) if ObjectId.is_valid(meeting_id)]
+    if not ids:
+        return
+    meetings = await db.meetings.find({"_id": {"$in": ids}, "user_id": user_id}).to_list(length=len(ids))
+    await refresh_meeting_digests(db, user_id, meetings)
+
+async def get_digest(db, user_id: str, day: date, zone: Optional[ZoneInfo] = None) -> dict:
+    """
+    Returns the stored digest with a single primary-key fetch, materializing
+    it on first access for days that have not been written since, and
+    rebuilding it when it was built for another timezone than the user's.
+    """
+    zone = zone or await user_zone(db, user_id)
+    digest = await db.daily_digests.find_one({"_id": digest_id(user_id, day)})
+    if digest is None or digest.get("timezone") != zone.key:
+        await refresh_digests(db, user_id, [day], zone)
+        digest = await db.daily_digests.find_one({"_id": digest_id(user_id, day)})
+    return digest
@@ -0,0 +1,88 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from bson import ObjectId
+from ..models.schemas import NextStepStatus
+from .google_calendar import refresh_google_token
+from .gmail import create_draft, DraftError
+from .jobs import job_queue, PermanentJobError
+from .digests import refresh_meeting_digests, refresh_digest_for_meeting
+from .timezones import get_zone
+
+logger = logging.getLogger(__name__)
+
+CREATE_DRAFT_JOB = "create_draft"
+
+def build_next_step_email(meeting: Dict[str, Any], next_step: Dict[str, Any], sender_name: Optional[str]) -> Tuple[List[str], str, str]:
+    """
+    Builds the recipients, subject and body of the follow-up email for a next step.
+    """
+    recipients = meeting.get("participants", [])
+    action_text = next_step.get('edited_text') or next_step.get('original_text')
+    
+    subject = f"Action Item: {action_text}"
+    body = f"""
+Hello,
+
+Following up on our meeting "{meeting.get('title')}", here is an action item:
+
+{action_text}
+
+Regards,
+{sender_name or 'Daily Action Hub User'}
+    """
+    return recipients, subject, body.strip()
+
+async def enqueue_draft(step_id: str, user_id: str, previous_status: str):
+    return await job_queue.enqueue(CREATE_DRAFT_JOB, {
+        "step_id": step_id,
+        "user_id": user_id,
+        "previous_status": previous_status,
+    })
+
+async def _create_draft_job(db, payload: Dict[str, Any]):
+    step_id = payload["step_id"]
+    user_id = payload["user_id"]
+    
+    next_step = await db.next_steps.find_one({"_id": ObjectId(step_id), "user_id": user_id})
+    if not next_step:
+        raise PermanentJobError("Next step not found")
+        
+    meeting = await db.meetings.find_one({"_id": ObjectId(next_step["meeting_id"]), "user_id": user_id})
+    if not meeting:
+        raise PermanentJobError("Linked meeting not found")
+        
+    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    if not user or not user.get("refresh_token"):
+        raise PermanentJobError("User not connected to Google (missing refresh token)")
+        
+    access_token = await refresh_google_token(user["refresh_token"])
+    if not access_token:
+        raise RuntimeError("Failed to refresh Google token")
+        
+    recipients, subject, body = build_next_step_email(meeting, next_step, user.get("full_name"))
+    try:
+        await create_draft(access_token, recipients, subject, body, user_id)
+    except DraftError as e:
+        if e.retryable:
+            raise
+        # Retrying could put a second draft in the user's mailbox
+        raise PermanentJobError(str(e))
+        
+    await db.next_steps.update_one(
+        {"_id": ObjectId(step_id)},
+        {"$set": {"status": NextStepStatus.executed, "updated_at": datetime.utcnow()}}
+    )
+    await refresh_meeting_digests(db, user_id, [meeting], get_zone(user.get("timezone")))
+
+async def _create_draft_failed(db, payload: Dict[str, Any]):
+    # Put the step back where it was so the user can retry
+    await db.next_steps.update_one(
+        {"_id": ObjectId(payload["step_id"]), "status": NextStepStatus.pending},
+        {"$set": {"status": payload.get("previous_status") or NextStepStatus.confirmed, "updated_at": datetime.utcnow()}}
+    )
+    step = await db.next_steps.find_one({"_id": ObjectId(payload["step_id"])})
+    if step:
+        await refresh_digest_for_meeting(db, payload["user_id"], step["meeting_id"])
+
+job_queue.register(CREATE_DRAFT_JOB, _create_draft_job, on_failure=_create_draft_failed)
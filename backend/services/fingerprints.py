@@ -0,0 +1,188 @@
+import hashlib
+import random
+import re
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from ..models.schemas import NextStepInDB, NextStepStatus
+
+# Next step fields that hold the fingerprint, kept out of API payloads
+FINGERPRINT_FIELDS = ("fingerprint", "minhash", "minhash_version")
+
+# Bumped whenever what the signature is computed over changes, so stored
+# signatures of the old kind are recomputed instead of compared
+MINHASH_VERSION = 2
+
+SHINGLE_SIZE = 4
+NUM_PERMUTATIONS = 32
+# Mersenne prime for the (a * x + b) mod p permutations
+_PRIME = (1 << 61) - 1
+# Fixed seed: signatures are stored, so the permutations must never change
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
+def normalize_action(text: str) -> str:
+    """
+    Lowercases and strips punctuation and extra whitespace, so trivially
+    different wordings of an action item compare equal.
+    """
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+def fingerprint(text: str) -> str:
+    """
+    Exact-match key of an action item's normalized text.
+    """
+    return hashlib.sha1(normalize_action(text).encode()).hexdigest()
+
+# Words that can come and go without changing what an action item asks for
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or our please the "
+    "their this to up we with".split()
+)
+
+def _stem(word: str) -> str:
+    # Just enough stemming for plurals to match their singulars
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def _content_words(text: str) -> FrozenSet[str]:
+    # What an action item is about; near duplicates differ in the other words
+    return frozenset(_stem(word) for word in normalize_action(text).split() if word not in STOP_WORDS)
+
+def _content_text(text: str) -> str:
+    # Sorted, so the same words in another order give the same shingles
+    words = _content_words(text)
+    return " ".join(sorted(words)) if words else normalize_action(text)
+
+def _shingles(normalized: str) -> Set[str]:
+    # Character shingles survive small rewordings better than word shingles
+    # on texts as short as action items
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized}
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+def minhash(text: str) -> List[int]:
+    """
+    MinHash signature of the character shingles of the text's content
+    words. The share of equal positions in two signatures estimates the
+    Jaccard similarity of their shingle sets.
+    """
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+        for shingle in _shingles(_content_text(text))
+    ]
+    return [min((a * value + b) % _PRIME for value in hashes) for a, b in _PERMUTATIONS]
+
+def estimate_similarity(signature: List[int], other: List[int]) -> float:
+    if len(signature) != len(other) or not signature:
+        return 0.0
+    return sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+
+def fingerprint_fields(text: str) -> Dict[str, object]:
+    return {"fingerprint": fingerprint(text), "minhash": minhash(text), "minhash_version": MINHASH_VERSION}
+
+def _jaccard(words: FrozenSet[str], other: FrozenSet[str]) -> float:
+    union = words | other
+    return len(words & other) / len(union) if union else 1.0
+
+class ActionIndex:
+    """
+    Per-meeting index of action items for duplicate detection: an exact
+    lookup on the normalized text's fingerprint, then a MinHash comparison
+    of content words (stop words dropped, plurals stemmed) for near
+    duplicates. The content word sets themselves must be just as similar,
+    so one differing word in a short item, as in "Book a room for the
+    offsite" and "Book flights for the offsite", keeps them apart even when
+    the signatures happen to agree.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._exact: Dict[str, object] = {}
+        self._entries: List[Tuple[List[int], FrozenSet[str], object]] = []
+
+    def add(self, text: str, value: object, signature: Optional[List[int]] = None, key: Optional[str] = None):
+        key = key or fingerprint(text)
+        self._exact.setdefault(key, value)
+        self._entries.append((signature or minhash(text), _content_words(text), value))
+
+    def find(self, text: str) -> Optional[object]:
+        """
+        Returns the value of the indexed item `text` duplicates, if any.
+        """
+        match = self._exact.get(fingerprint(text))
+        if match is not None:
+            return match
+        signature = minhash(text)
+        words = _content_words(text)
+        best, best_similarity = None, self.threshold
+        for other_signature, other_words, value in self._entries:
+            if _jaccard(words, other_words) < self.threshold:
+                continue
+            similarity = estimate_similarity(signature, other_signature)
+            if similarity >= best_similarity:
+                best, best_similarity = value, similarity
+        return best
+
+def dedupe(texts: Iterable[str], threshold: float) -> List[str]:
+    """
+    Drops texts that duplicate an earlier one, keeping the first copy.
+    """
+    index = ActionIndex(threshold)
+    unique = []
+    for text in texts:
+        if not normalize_action(text) or index.find(text) is not None:
+            continue
+        index.add(text, text)
+        unique.append(text)
+    return unique
+
+async def add_suggested_steps(db, user_id: str, meeting_id: str, actions: Iterable[str], threshold: float) -> List[dict]:
+    """
+    Stores newly generated actions for a meeting as suggested steps, merging
+    each into the meeting's existing step for the same item (whatever its
+    status, so rejected items are not suggested again) instead of adding a
+    duplicate. Returns the step of every action, once each, in order.
+    """
+    existing = await db.next_steps.find({"user_id": user_id, "meeting_id": meeting_id}).sort("created_at", 1).to_list(length=None)
+    index = ActionIndex(threshold)
+    for step in existing:
+        if step.get("minhash_version") != MINHASH_VERSION:
+            # Steps from before fingerprints, or from before the current kind
+            # of signature, get theirs on first use
+            fields = fingerprint_fields(step["original_text"])
+            await db.next_steps.update_one({"_id": step["_id"]}, {"$set": fields})
+            step.update(fields)
+        index.add(step["original_text"], step, step["minhash"], step["fingerprint"])
+        if step.get("edited_text") and step["edited_text"] != step["original_text"]:
+            index.add(step["edited_text"], step)
+
+    steps = []
+    returned = set()
+    for action in actions:
+        if not normalize_action(action):
+            continue
+        step = index.find(action)
+        if step is None:
+            now = datetime.utcnow()
+            step = NextStepInDB(
+                meeting_id=meeting_id,
+                original_text=action,
+                edited_text=action,
+                status=NextStepStatus.suggested,
+                user_id=user_id,
+                created_at=now,
+                updated_at=now
+            ).model_dump(by_alias=True, exclude={"id"})
+            step.update(fingerprint_fields(action))
+            result = await db.next_steps.insert_one(step)
+            step["_id"] = result.inserted_id
+            index.add(action, step, step["minhash"], step["fingerprint"])
+        if step["_id"] not in returned:
+            returned.add(step["_id"])
+            steps.append(step)
+    return steps
@@ -1,44 +1,237 @@
-import httpx
+import asyncio
+import json
 import logging
-from typing import List
+import random
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
 import base64
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from ..database.client import settings
+from .google_client import google_client, GoogleAPIError, RATE_LIMIT_REASONS
+from .circuit_breaker import CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
-async def create_draft(access_token: str, recipients: List[str], subject: str, body: str):
+# (recipients, subject, body) of one draft
+DraftMessage = Tuple[List[str], str, str]
+# (created draft, None) or (None, error detail) for one draft of a batch
+DraftResult = Tuple[Optional[Dict[str, Any]], Optional[str]]
+
+class DraftError(Exception):
     """
-    Creates a draft email in the user's Gmail account.
+    Raised when a draft could not be created. `retryable` is False when
+    sending it again cannot succeed or could create it a second time.
     """
-    url = settings.GOOGLE_GMAIL_DRAFTS_URL
-    
-    # Construct MIME message
+
+    def __init__(self, detail: str, retryable: bool):
+        super().__init__(detail)
+        self.retryable = retryable
+
+def build_raw_message(recipients: List[str], subject: str, body: str) -> str:
+    """
+    Builds the MIME message of a draft, base64url encoded as Gmail expects.
+    """
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+
     message = MIMEMultipart()
     message["to"] = ", ".join(recipients)
     message["subject"] = subject
     message.attach(MIMEText(body, "plain"))
-    
-    # Encode as base64url
-    raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode("utf-8")
-    
+    return base64.urlsafe_b64encode(message.as_bytes()).decode("utf-8")
+
+async def create_draft(access_token: str, recipients: List[str], subject: str, body: str, user_id: Optional[str] = None):
+    """
+    Creates a draft email in the user's Gmail account. Raises DraftError
+    when it fails, and CircuitOpenError while Gmail is unavailable.
+    """
+    url = settings.GOOGLE_GMAIL_DRAFTS_URL
+
     data = {
         "message": {
-            "raw": raw_message
+            "raw": build_raw_message(recipients, subject, body)
         }
     }
-    
+
     headers = {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json"
     }
-    
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=data, headers=headers)
-        
-        if response.status_code != 200:
-            logger.error(f"Failed to create draft: {response.text}")
-            return None
-            
-        return response.json()
\ No newline at end of file
+
+    try:
+        # Creating a draft is not idempotent: only retried when Gmail did not process it
+        response = await google_client.request(
+            "POST", url, endpoint="gmail.drafts.create", user_key=user_id, idempotent=False, json=data, headers=headers
+        )
+    except GoogleAPIError as e:
+        logger.error(f"Failed to create draft: {e}")
+        raise DraftError(f"Failed to create Gmail draft ({e})", retryable=not e.maybe_processed)
+
+    if response.status_code != 200:
+        logger.error(f"Failed to create draft: {response.text}")
+        detail, throttled = _error_detail(response.status_code, response.text)
+        # Only a throttled draft is known not to exist; other errors were
+        # refused outright (4xx) or may have been created anyway (5xx)
+        raise DraftError(detail, retryable=throttled)
+
+    return response.json()
+
+def _boundary(content_type: str) -> str:
+    for param in content_type.split(";")[1:]:
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "boundary":
+            return value.strip('"')
+    raise ValueError(f"No boundary in {content_type!r}")
+
+def _split_head(text: str) -> Tuple[str, Dict[str, str], str]:
+    # First line, headers (lowercased names) and whatever follows the blank line
+    separator = "\r\n\r\n" if "\r\n\r\n" in text else "\n\n"
+    head, _, rest = text.partition(separator)
+    lines = head.splitlines()
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return lines[0] if lines else "", headers, rest
+
+def parse_multipart(content_type: str, body: bytes) -> List[Tuple[Dict[str, str], str]]:
+    """
+    Splits a multipart/mixed body into (part headers, part content) pairs.
+    """
+    delimiter = "--" + _boundary(content_type)
+    parts = []
+    for chunk in body.decode("utf-8").split(delimiter)[1:]:
+        if chunk.startswith("--"):
+            # Closing delimiter
+            break
+        chunk = chunk.lstrip("\r\n")
+        # Parts have no first line of their own, so parse them as if they did
+        _, headers, content = _split_head("\r\n" + chunk)
+        parts.append((headers, content.rstrip("\r\n")))
+    return parts
+
+def parse_http_message(text: str) -> Tuple[Optional[int], Dict[str, str], str]:
+    """
+    Parses the embedded HTTP message of a batch part into (status, headers,
+    body). The status is None for requests.
+    """
+    first_line, headers, body = _split_head(text)
+    fields = first_line.split()
+    status = int(fields[1]) if len(fields) > 1 and fields[0].startswith("HTTP/") else None
+    return status, headers, body
+
+def batch_item_index(content_id: str) -> Optional[int]:
+    # Gmail answers part <item-N> with <response-item-N>
+    _, _, index = content_id.strip("<>").rpartition("-")
+    return int(index) if index.isdigit() else None
+
+def build_batch_body(boundary: str, path: str, payloads: List[Dict[str, Any]]) -> bytes:
+    """
+    Builds a multipart/mixed batch of POST requests to `path`, one per
+    payload, with Content-IDs item-0, item-1, ...
+    """
+    lines = []
+    for index, payload in enumerate(payloads):
+        lines += [
+            f"--{boundary}",
+            "Content-Type: application/http",
+            f"Content-ID: <item-{index}>",
+            "",
+            f"POST {path}",
+            "Content-Type: application/json",
+            "",
+            json.dumps(payload),
+        ]
+    lines.append(f"--{boundary}--")
+    return ("\r\n".join(lines) + "\r\n").encode("utf-8")
+
+def _error_detail(status: Optional[int], body: str) -> Tuple[str, bool]:
+    # Gmail's error message, and whether the call was throttled
+    try:
+        error = json.loads(body).get("error", {})
+    except ValueError:
+        error = {}
+    reasons = {item.get("reason") for item in error.get("errors", [])}
+    throttled = status == 429 or (status == 403 and bool(reasons & RATE_LIMIT_REASONS))
+    return f"Failed to create Gmail draft (HTTP {status}: {error.get('message') or body.strip()[:200]})", throttled
+
+async def _send_batch(access_token: str, raws: List[str], user_id: Optional[str]) -> List[Tuple[Optional[Dict[str, Any]], Optional[str], bool]]:
+    """
+    Sends one batch request and returns (draft, error, throttled) per item.
+    """
+    boundary = f"batch_{uuid.uuid4().hex}"
+    path = urlparse(settings.GOOGLE_GMAIL_DRAFTS_URL).path
+    body = build_batch_body(boundary, path, [{"message": {"raw": raw}} for raw in raws])
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": f"multipart/mixed; boundary={boundary}",
+    }
+    # Only retried as a whole when Gmail did not process it
+    response = await google_client.request(
+        "POST", settings.GOOGLE_GMAIL_BATCH_URL, endpoint="gmail.batch", user_key=user_id,
+        idempotent=False, content=body, headers=headers
+    )
+    if response.status_code != 200:
+        detail, throttled = _error_detail(response.status_code, response.text)
+        return [(None, detail, throttled)] * len(raws)
+
+    results: List[Tuple[Optional[Dict[str, Any]], Optional[str], bool]] = [
+        (None, "Failed to create Gmail draft (no response in the batch)", False)
+    ] * len(raws)
+    for part_headers, content in parse_multipart(response.headers.get("content-type", ""), response.content):
+        index = batch_item_index(part_headers.get("content-id", ""))
+        if index is None or index >= len(raws):
+            continue
+        status, _, part_body = parse_http_message(content)
+        if status == 200:
+            results[index] = (json.loads(part_body), None, False)
+        else:
+            detail, throttled = _error_detail(status, part_body)
+            results[index] = (None, detail, throttled)
+    return results
+
+async def create_drafts(access_token: str, messages: List[DraftMessage], user_id: Optional[str] = None) -> List[DraftResult]:
+    """
+    Creates many drafts through Gmail's batch endpoint, GMAIL_BATCH_SIZE per
+    round trip. Returns (draft, None) or (None, error) for each message, in
+    order. Items Gmail throttled are sent again in a later batch; other
+    failures, an open Gmail circuit included, are reported per message.
+    """
+    raws = [build_raw_message(*message) for message in messages]
+    results: List[DraftResult] = [(None, "Failed to create Gmail draft")] * len(raws)
+    pending = list(range(len(raws)))
+    semaphore = asyncio.Semaphore(settings.DRAFT_BATCH_CONCURRENCY)
+
+    async def send(indexes: List[int]) -> List[int]:
+        async with semaphore:
+            try:
+                outcomes = await _send_batch(access_token, [raws[i] for i in indexes], user_id)
+            except CircuitOpenError:
+                # Per item, so the chunks that already went through keep their drafts
+                outcomes = [(None, "Gmail is temporarily unavailable, please try again shortly", False)] * len(indexes)
+            except GoogleAPIError as e:
+                logger.error(f"Failed to send draft batch: {e}")
+                outcomes = [(None, f"Failed to create Gmail draft ({e})", False)] * len(indexes)
+            except ValueError as e:
+                # A 200 that is not a readable multipart response (bad JSON included)
+                logger.error(f"Unreadable draft batch response: {e}")
+                outcomes = [(None, f"Failed to create Gmail draft ({e})", False)] * len(indexes)
+        throttled = []
+        for index, (draft, error, was_throttled) in zip(indexes, outcomes):
+            results[index] = (draft, error)
+            if was_throttled:
+                throttled.append(index)
+        return throttled
+
+    for attempt in range(settings.GOOGLE_API_MAX_ATTEMPTS):
+        if attempt:
+            delay = random.uniform(0, min(settings.GOOGLE_API_BACKOFF_MAX, settings.GOOGLE_API_BACKOFF_BASE * (2 ** attempt)))
+            logger.warning(f"Gmail throttled {len(pending)} drafts, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        size = settings.GMAIL_BATCH_SIZE
+        chunks = [pending[start:start + size] for start in range(0, len(pending), size)]
+        retry = await asyncio.gather(*(send(chunk) for chunk in chunks))
+        pending = [index for chunk in retry for index in chunk]
+        if not pending:
+            break
+    return results
@@ -1,7 +1,14 @@
-import httpx
-from datetime import datetime, time, timedelta
+import asyncio
+import hashlib
+from datetime import datetime, date as date_type
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+from zoneinfo import ZoneInfo
 import logging
 from ..database.client import settings
+from .timezones import get_zone, local_today, local_day_range, to_utc
+from .calendar_events import detect_online_meeting, merge_calendar_events
+from .google_client import google_client, GoogleAPIError
 
 logger = logging.getLogger(__name__)
 
@@ -17,63 +24,226 @@ async def refresh_google_token(refresh_token: str) -> str:
         "grant_type": "refresh_token",
     }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.post(token_url, data=data)
-        if response.status_code != 200:
-            logger.error(f"Failed to refresh token: {response.text}")
-            return None
-            
-        return response.json().get("access_token")
+    # Rate limit refreshes per refresh token, without keeping the token itself around
+    user_key = hashlib.sha256(refresh_token.encode()).hexdigest()
+    try:
+        response = await google_client.request("POST", token_url, endpoint="oauth.token", user_key=user_key, data=data)
+    except GoogleAPIError as e:
+        logger.error(f"Failed to refresh token: {e}")
+        return None
+    if response.status_code != 200:
+        logger.error(f"Failed to refresh token: {response.text}")
+        return None
+        
+    return response.json().get("access_token")
 
 def is_online_meeting(event: dict) -> bool:
     """
     Determines if a meeting is online based on Google Event data.
     """
-    if event.get("conferenceData"):
-        return True
-    
-    location = event.get("location", "").lower()
-    if "zoom" in location or "meet.google" in location or "teams" in location:
-        return True
-        
-    description = event.get("description", "").lower()
-    if "zoom" in description or "meet.google" in description or "teams" in description:
-        return True
-        
-    return False
+    return detect_online_meeting(event)[0]
+
+def _auth_headers(access_token: str) -> Dict[str, str]:
+    return {
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "application/json",
+    }
 
-async def fetch_calendar_events(access_token: str, date: datetime = None):
+def _events_url(calendar_id: str) -> str:
+    if calendar_id == "primary":
+        return settings.GOOGLE_CALENDAR_EVENTS_URL
+    return f"{settings.GOOGLE_CALENDAR_API_URL}/calendars/{quote(calendar_id, safe='')}/events"
+
+async def list_calendars(access_token: str, user_id: Optional[str] = None) -> List[str]:
+    """
+    Returns the ids of the calendars whose events the user can read, with the
+    primary calendar first. Falls back to just the primary calendar.
+    """
+    try:
+        response = await google_client.request(
+            "GET",
+            settings.GOOGLE_CALENDAR_LIST_URL,
+            endpoint="calendar.calendarList",
+            user_key=user_id,
+            params={"minAccessRole": "reader"},
+            headers=_auth_headers(access_token)
+        )
+    except GoogleAPIError as e:
+        logger.error(f"Failed to list calendars: {e}")
+        return ["primary"]
+    if response.status_code != 200:
+        logger.error(f"Failed to list calendars: {response.text}")
+        return ["primary"]
+
+    calendar_ids = ["primary"]
+    for calendar in response.json().get("items", []):
+        if calendar.get("primary") or calendar.get("deleted") or calendar.get("hidden"):
+            continue
+        calendar_ids.append(calendar["id"])
+    return calendar_ids
+
+async def fetch_calendar_events(
+    access_token: str,
+    date: Optional[date_type] = None,
+    zone: Optional[ZoneInfo] = None,
+    calendar_id: str = "primary",
+    user_id: Optional[str] = None
+):
     """
-    Fetches events from the primary calendar for the given date (default: today).
+    Fetches events from one calendar (default: primary) for the given local
+    day in the user's timezone (default: today). Raises GoogleAPIError when
+    the calendar cannot be read, so a failure never looks like an empty day.
     """
+    zone = zone or get_zone(None)
     if not date:
-        date = datetime.now()
+        date = local_today(zone)
     
-    # Define start and end of the day in UTC
-    # Note: Google Calendar API expects ISO format with time zone
-    # For simplicity, we'll ask for the full day in UTC. 
-    # A robust solution would handle user timezones more precisely.
-    start_of_day = datetime.combine(date, time.min).isoformat() + "Z"
-    end_of_day = datetime.combine(date, time.max).isoformat() + "Z"
+    # Exact UTC instants of the user's local midnight-to-midnight window
+    start_of_day, end_of_day = local_day_range(date, zone)
     
-    url = settings.GOOGLE_CALENDAR_EVENTS_URL
     params = {
-        "timeMin": start_of_day,
-        "timeMax": end_of_day,
+        "timeMin": start_of_day.isoformat(),
+        "timeMax": end_of_day.isoformat(),
+        "timeZone": zone.key,
         "singleEvents": True,
         "orderBy": "startTime",
     }
-    headers = {
-        "Authorization": f"Bearer {access_token}",
-        "Accept": "application/json",
-    }
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, params=params, headers=headers)
+    response = await google_client.request(
+        "GET",
+        _events_url(calendar_id),
+        endpoint="calendar.events.list",
+        user_key=user_id,
+        params=params,
+        headers=_auth_headers(access_token)
+    )
+    
+    if response.status_code != 200:
+        logger.error(f"Failed to fetch events for calendar {calendar_id}: {response.text}")
+        raise GoogleAPIError("calendar.events.list", response.status_code, response.text)
         
+    items = response.json().get("items", [])
+    return items
+
+async def fetch_all_calendar_events(
+    access_token: str,
+    date: Optional[date_type] = None,
+    zone: Optional[ZoneInfo] = None,
+    user_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fetches the day's events from every calendar the user can read. Calendars
+    are fetched concurrently, at most CALENDAR_FETCH_CONCURRENCY at a time, so
+    a sync takes about as long as the slowest calendar. Events that appear on
+    several calendars are returned once. A calendar other than the primary
+    one that cannot be read is logged and skipped; the primary calendar
+    failing raises, as fetch_calendar_events does.
+    """
+    semaphore = asyncio.Semaphore(settings.CALENDAR_FETCH_CONCURRENCY)
+    calendar_ids = await list_calendars(access_token, user_id)
+
+    async def fetch(calendar_id: str):
+        async with semaphore:
+            return await fetch_calendar_events(access_token, date, zone, calendar_id, user_id)
+
+    outcomes = await asyncio.gather(
+        *(fetch(calendar_id) for calendar_id in calendar_ids),
+        return_exceptions=True
+    )
+    results = []
+    for calendar_id, outcome in zip(calendar_ids, outcomes):
+        if isinstance(outcome, BaseException):
+            if calendar_id == "primary" or not isinstance(outcome, Exception):
+                raise outcome
+            logger.warning(f"Skipping calendar {calendar_id}, its events could not be fetched: {outcome}")
+            continue
+        results.append(outcome)
+    return merge_calendar_events(results)
+
+async def fetch_updated_events(
+    access_token: str,
+    calendar_id: str,
+    updated_min: datetime,
+    zone: Optional[ZoneInfo] = None,
+    user_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fetches every event of a calendar changed since `updated_min`, across all
+    pages. Raises GoogleAPIError, with status 410 when Google no longer has
+    changes that far back and a full sync is needed.
+    """
+    params = {
+        "updatedMin": to_utc(updated_min).isoformat(),
+        "singleEvents": True,
+        "showDeleted": True,
+        "maxResults": 250,
+    }
+    if zone:
+        params["timeZone"] = zone.key
+    items: List[Dict[str, Any]] = []
+    while True:
+        response = await google_client.request(
+            "GET",
+            _events_url(calendar_id),
+            endpoint="calendar.events.list",
+            user_key=user_id,
+            params=params,
+            headers=_auth_headers(access_token)
+        )
         if response.status_code != 200:
-            logger.error(f"Failed to fetch events: {response.text}")
-            return []
-            
-        items = response.json().get("items", [])
-        return items
\ No newline at end of file
+            logger.error(f"Failed to fetch changed events for calendar {calendar_id}: {response.text}")
+            raise GoogleAPIError("calendar.events.list", response.status_code, response.text)
+        page = response.json()
+        items.extend(page.get("items", []))
+        if not page.get("nextPageToken"):
+            return items
+        params["pageToken"] = page["nextPageToken"]
+
+async def watch_calendar(
+    access_token: str,
+    calendar_id: str,
+    channel_id: str,
+    channel_token: str,
+    ttl_seconds: int,
+    user_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Opens a push notification channel for a calendar's events. Returns
+    Google's channel resource, including resourceId and expiration (ms).
+    """
+    response = await google_client.request(
+        "POST",
+        f"{_events_url(calendar_id)}/watch",
+        endpoint="calendar.events.watch",
+        user_key=user_id,
+        json={
+            "id": channel_id,
+            "type": "web_hook",
+            "address": settings.GOOGLE_WEBHOOK_URL,
+            "token": channel_token,
+            "params": {"ttl": str(ttl_seconds)},
+        },
+        headers=_auth_headers(access_token)
+    )
+    if response.status_code != 200:
+        logger.error(f"Failed to watch calendar {calendar_id}: {response.text}")
+        raise GoogleAPIError("calendar.events.watch", response.status_code, response.text)
+    return response.json()
+
+async def stop_channel(access_token: str, channel_id: str, resource_id: str, user_id: Optional[str] = None) -> bool:
+    """
+    Stops a push notification channel. A channel Google no longer knows
+    about counts as stopped.
+    """
+    response = await google_client.request(
+        "POST",
+        settings.GOOGLE_CHANNELS_STOP_URL,
+        endpoint="calendar.channels.stop",
+        user_key=user_id,
+        json={"id": channel_id, "resourceId": resource_id},
+        headers=_auth_headers(access_token)
+    )
+    if response.status_code not in (200, 204, 404):
+        logger.error(f"Failed to stop channel {channel_id}: {response.text}")
+        return False
+    return True
@@ -0,0 +1,301 @@
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from ..database.client import settings
+from .circuit_breaker import get_breaker
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Google reports quota exhaustion as 403 with one of these reasons
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+class GoogleAPIError(Exception):
+    """
+    Raised when a Google API call still fails after its retries.
+    """
+
+    def __init__(self, endpoint: str, status_code: Optional[int], detail: str, maybe_processed: bool = False):
+        super().__init__(f"{endpoint} failed ({status_code or 'no response'}): {detail}")
+        self.endpoint = endpoint
+        self.status_code = status_code
+        # True when the request may have reached Google, e.g. a read timeout
+        self.maybe_processed = maybe_processed
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average, with bursts up to `capacity`.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit: grows by about one slot per limit's worth of
+    successful calls and halves whenever Google throttles us.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, throttled: bool):
+        async with self.condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+class EndpointMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.throttled = 0
+        self.retries = 0
+        self.total_latency = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "successes": self.successes,
+            "failures": self.failures,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "avg_latency_ms": round(self.total_latency / self.requests * 1000, 1) if self.requests else None,
+        }
+
+def _is_throttled(response: "httpx.Response") -> bool:
+    if response.status_code == 429:
+        return True
+    if response.status_code != 403:
+        return False
+    try:
+        errors = response.json().get("error", {}).get("errors", [])
+    except ValueError:
+        return False
+    return any(error.get("reason") in RATE_LIMIT_REASONS for error in errors)
+
+def _retry_after(response: "httpx.Response") -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class GoogleClient:
+    """
+    Shared HTTP layer for Google APIs.
+
+    Every call passes a per-project and a per-user token bucket and an AIMD
+    concurrency limit, and is retried on throttling, 5xx and connection
+    errors with jittered exponential backoff that honors Retry-After.
+    Non-idempotent calls are only retried when Google did not process them.
+    Each endpoint has its own circuit breaker, tripped by 5xx responses and
+    calls that got no response.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int,
+        backoff_base: float,
+        backoff_max: float,
+        project_rate: float,
+        user_rate: float,
+        max_concurrency: int,
+        timeout: float,
+        max_users: int = 10000,
+    ):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.user_rate = user_rate
+        self.timeout = timeout
+        self.max_users = max_users
+        self.project_bucket = TokenBucket(project_rate)
+        self.limiter = AdaptiveLimiter(initial=max(1, max_concurrency // 4), minimum=1, maximum=max_concurrency)
+        self._user_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._metrics: Dict[str, EndpointMetrics] = {}
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None or self._client.is_closed:
+            # Imported on first use to keep it off the startup path
+            import httpx
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _user_bucket(self, user_key: str) -> TokenBucket:
+        bucket = self._user_buckets.get(user_key)
+        if bucket is None:
+            bucket = TokenBucket(self.user_rate)
+            self._user_buckets[user_key] = bucket
+            if len(self._user_buckets) > self.max_users:
+                self._user_buckets.popitem(last=False)
+        else:
+            self._user_buckets.move_to_end(user_key)
+        return bucket
+
+    def _backoff(self, attempt: int, response: Optional["httpx.Response"]) -> float:
+        retry_after = _retry_after(response) if response is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # Full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+            "endpoints": {name: metrics.snapshot() for name, metrics in self._metrics.items()},
+        }
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        endpoint: str,
+        user_key: Optional[str] = None,
+        idempotent: bool = True,
+        **kwargs
+    ) -> "httpx.Response":
+        """
+        Sends a request and returns the final response, successful or not, so
+        callers can inspect the status. Raises GoogleAPIError when no
+        response could be obtained at all, and CircuitOpenError without
+        calling Google while the endpoint's circuit is open.
+        """
+        breaker = get_breaker(f"google.{endpoint}")
+        breaker.before_call()
+        success = None
+        try:
+            response = await self._send(method, url, endpoint, user_key, idempotent, **kwargs)
+            success = response.status_code < 500
+            return response
+        except GoogleAPIError:
+            success = False
+            raise
+        finally:
+            breaker.record(success)
+
+    async def _send(self, method: str, url: str, endpoint: str, user_key: Optional[str], idempotent: bool, **kwargs) -> "httpx.Response":
+        import httpx
+        metrics = self._metrics.setdefault(endpoint, EndpointMetrics())
+        response: Optional[httpx.Response] = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                metrics.retries += 1
+            await self.project_bucket.acquire()
+            if user_key:
+                await self._user_bucket(user_key).acquire()
+
+            await self.limiter.acquire()
+            started = time.monotonic()
+            throttled = False
+            error: Optional[httpx.HTTPError] = None
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                throttled = _is_throttled(response)
+            except httpx.HTTPError as e:
+                response, error = None, e
+            finally:
+                metrics.requests += 1
+                metrics.total_latency += time.monotonic() - started
+                await self.limiter.release(throttled)
+
+            if error is not None:
+                # Only connection failures are known not to have reached Google
+                retryable = idempotent or isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+                detail = f"{type(error).__name__}: {error}"
+            elif throttled:
+                metrics.throttled += 1
+                retryable = True
+                detail = f"throttled ({response.status_code})"
+            elif response.status_code in RETRYABLE_STATUSES:
+                retryable = idempotent
+                detail = f"HTTP {response.status_code}"
+            else:
+                if response.is_success:
+                    metrics.successes += 1
+                else:
+                    metrics.failures += 1
+                return response
+
+            if not retryable or attempt == self.max_attempts - 1:
+                metrics.failures += 1
+                if response is not None:
+                    return response
+                reached = not isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+                raise GoogleAPIError(endpoint, None, detail, maybe_processed=reached)
+
+            delay = self._backoff(attempt, response)
+            logger.warning(f"Google {endpoint} attempt {attempt + 1} failed ({detail}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        return response
+
+# Created up front so /healthz lists them before the first call
+for endpoint in ("oauth.token", "calendar.calendarList", "calendar.events.list", "calendar.events.watch", "calendar.channels.stop", "gmail.drafts.create", "gmail.batch"):
+    get_breaker(f"google.{endpoint}")
+
+google_client = GoogleClient(
+    max_attempts=settings.GOOGLE_API_MAX_ATTEMPTS,
+    backoff_base=settings.GOOGLE_API_BACKOFF_BASE,
+    backoff_max=settings.GOOGLE_API_BACKOFF_MAX,
+    project_rate=settings.GOOGLE_API_PROJECT_RATE,
+    user_rate=settings.GOOGLE_API_USER_RATE,
+    max_concurrency=settings.GOOGLE_API_MAX_CONCURRENCY,
+    timeout=settings.GOOGLE_API_TIMEOUT,
+)
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+from ..database.client import db, settings
+from .circuit_breaker import circuit_states, OPEN
+from .google_client import google_client
+
+logger = logging.getLogger(__name__)
+
+class HealthMonitor:
+    """
+    Checks the dependencies on an interval and keeps the last report, so
+    probes are answered from memory instead of each pinging the database.
+
+    Ready means the database (MongoDB or its fallback) answers. Open
+    circuits leave the service ready but degraded, since requests that
+    need those dependencies get fast degraded responses instead.
+    """
+
+    def __init__(self, interval: float, timeout: float, stop_timeout: float = 5.0):
+        self.interval = interval
+        self.timeout = timeout
+        self.stop_timeout = stop_timeout
+        self.started_at = time.monotonic()
+        self._report: Dict[str, Any] = {
+            "status": "starting",
+            "ready": False,
+            "checked_at": None,
+            "dependencies": {"database": {"status": "connecting"}},
+        }
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def report(self) -> Dict[str, Any]:
+        return self._report
+
+    @property
+    def ready(self) -> bool:
+        return self._report["ready"]
+
+    def uptime(self) -> float:
+        return time.monotonic() - self.started_at
+
+    async def _check_database(self) -> Dict[str, Any]:
+        if not db.is_ready:
+            return {"status": "connecting"}
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(db.client.admin.command("ping"), self.timeout)
+            status = "ok"
+            error = None
+        except asyncio.TimeoutError:
+            status, error = "down", f"ping timed out after {self.timeout}s"
+        except Exception as e:
+            status, error = "down", str(e)
+        result = {
+            "status": status,
+            "engine": db.engine,
+            "fallback": db.engine != "mongodb",
+            "latency_ms": round((time.monotonic() - started) * 1000, 1),
+        }
+        if error:
+            result["error"] = error
+        return result
+
+    def _check_downstream(self, circuits: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        # Google and OpenAI are not probed (that would spend quota); their
+        # circuits and the latency of real calls stand in for a check
+        dependencies: Dict[str, Dict[str, Any]] = {}
+        for name, circuit in circuits.items():
+            dependency = dependencies.setdefault(name.split(".")[0], {"status": "ok", "open_circuits": []})
+            if circuit["state"] == OPEN:
+                dependency["status"] = "degraded"
+                dependency["open_circuits"].append(name)
+
+        if "google" in dependencies:
+            endpoints = google_client.metrics()["endpoints"].values()
+            requests = sum(endpoint["requests"] for endpoint in endpoints)
+            total = sum(endpoint["avg_latency_ms"] * endpoint["requests"] for endpoint in endpoints if endpoint["requests"])
+            dependencies["google"]["latency_ms"] = round(total / requests, 1) if requests else None
+        return dependencies
+
+    async def check(self) -> Dict[str, Any]:
+        database = await self._check_database()
+        circuits = circuit_states()
+        open_circuits = sorted(name for name, circuit in circuits.items() if circuit["state"] == OPEN)
+
+        ready = database["status"] == "ok"
+        if not db.is_ready:
+            status = "starting"
+        elif not ready:
+            status = "down"
+        elif open_circuits or database["fallback"]:
+            status = "degraded"
+        else:
+            status = "ok"
+
+        self._report = {
+            "status": status,
+            "ready": ready,
+            "checked_at": datetime.utcnow().isoformat() + "Z",
+            "dependencies": {"database": database, **self._check_downstream(circuits)},
+            "open_circuits": open_circuits,
+            "circuits": circuits,
+        }
+        return self._report
+
+    async def _run(self):
+        while True:
+            try:
+                previous = self._report["status"]
+                report = await self.check()
+                if report["status"] != previous:
+                    logger.info(f"Health changed from {previous} to {report['status']}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Health check failed: {e}")
+            if db.is_ready:
+                await asyncio.sleep(self.interval)
+            else:
+                # Report the database as soon as its connection is done
+                await db.wait_ready(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="health-monitor")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            # Bounded, so a check stuck on a dependency cannot hold up shutdown
+            done, _ = await asyncio.wait({self._task}, timeout=self.stop_timeout)
+            if not done:
+                logger.warning(f"Health monitor did not stop within {self.stop_timeout}s")
+            elif not self._task.cancelled() and self._task.exception():
+                logger.error(f"Health monitor failed: {self._task.exception()}")
+            self._task = None
+
+health_monitor = HealthMonitor(
+    interval=settings.HEALTH_CHECK_INTERVAL,
+    timeout=settings.HEALTH_CHECK_TIMEOUT,
+)
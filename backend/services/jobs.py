@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from ..database.client import settings, get_database
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Any, Dict[str, Any]], Awaitable[None]]
+
+class PermanentJobError(Exception):
+    """
+    Raised by a handler when retrying the job cannot succeed.
+    """
+
+class JobQueue:
+    """
+    Durable in-process job queue backed by a database collection.
+
+    Jobs are documents in `collection`. Workers claim one job at a time with an
+    atomic find-and-update that sets a lease, so a crashed worker's jobs become
+    claimable again once the lease expires, without waiting for a restart. Failed jobs are retried with
+    exponential backoff until `max_attempts` is reached.
+
+    The lease is renewed while the handler runs, and each claim gets its own
+    lease token, so a worker that lost its job to another only finds out
+    when its final write matches nothing.
+    """
+
+    def __init__(
+        self,
+        collection: str = "jobs",
+        workers: int = 4,
+        max_attempts: int = 5,
+        poll_interval: float = 1.0,
+        lease_seconds: int = 60,
+        base_backoff: float = 2.0,
+    ):
+        self.collection = collection
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.base_backoff = base_backoff
+        self._handlers: Dict[str, JobHandler] = {}
+        self._failure_handlers: Dict[str, JobHandler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def register(self, kind: str, handler: JobHandler, on_failure: Optional[JobHandler] = None):
+        """
+        Registers the coroutine that processes jobs of `kind`. `on_failure` is
+        called once when a job exhausts its retries or fails permanently.
+        """
+        self._handlers[kind] = handler
+        if on_failure:
+            self._failure_handlers[kind] = on_failure
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], dedupe_on: Optional[str] = None):
+        """
+        Queues a job and returns its id. With `dedupe_on`, a job of the same
+        kind still queued with the same payload[dedupe_on] takes the rest of
+        this payload instead, and its id is returned.
+        """
+        db = await get_database()
+        now = datetime.utcnow()
+        job = {
+            "kind": kind,
+            "payload": payload,
+            "status": "queued",
+            "attempts": 0,
+            "run_at": now,
+            "locked_until": None,
+            "last_error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        if dedupe_on is None:
+            job_id = (await db[self.collection].insert_one(job)).inserted_id
+        else:
+            filter = {"kind": kind, "status": "queued", f"payload.{dedupe_on}": payload[dedupe_on]}
+            result = await db[self.collection].update_one(
+                filter,
+                {
+                    "$set": {
+                        **{f"payload.{key}": value for key, value in payload.items() if key != dedupe_on},
+                        "updated_at": now,
+                    },
+                    "$setOnInsert": {key: value for key, value in job.items() if key not in ("kind", "payload", "status", "updated_at")},
+                },
+                upsert=True
+            )
+            job_id = result.upserted_id
+            if job_id is None:
+                job_id = (await db[self.collection].find_one(filter) or {}).get("_id")
+        if self._wakeup:
+            self._wakeup.set()
+        return job_id
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        await self._recover_expired_leases()
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Started {self.workers} job workers on '{self.collection}'")
+
+    async def stop(self):
+        self._stopping = True
+        if self._wakeup:
+            self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _recover_expired_leases(self):
+        # Jobs left 'running' by a crashed process go back to the queue
+        db = await get_database()
+        await db[self.collection].update_many(
+            {"status": "running", "locked_until": {"$lte": datetime.utcnow()}},
+            {"$set": {"status": "queued", "locked_until": None}}
+        )
+
+    async def _claim(self, db):
+        now = datetime.utcnow()
+        return await db[self.collection].find_one_and_update(
+            # A running job whose lease has run out belongs to a worker that
+            # died or hung, and is claimed again like a queued one
+            {"$or": [
+                {"status": "queued", "run_at": {"$lte": now}},
+                {"status": "running", "locked_until": {"$lte": now}},
+            ]},
+            {
+                "$set": {
+                    "status": "running",
+                    "lease": uuid.uuid4().hex,
+                    "locked_until": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_at", 1)],
+            # ReturnDocument.AFTER, without importing pymongo at startup
+            return_document=True,
+        )
+
+    async def _worker(self, index: int):
+        while not self._stopping:
+            try:
+                db = await get_database()
+                job = await self._claim(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {index} failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._run(db, job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The job's lease runs out and it is claimed again
+                logger.error(f"Job worker {index} failed to finish job {job['_id']}: {e}")
+
+    def _leased(self, job) -> Dict[str, Any]:
+        # Matches the job only while this claim still holds it
+        return {"_id": job["_id"], "status": "running", "lease": job["lease"]}
+
+    async def _heartbeat(self, db, job):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await db[self.collection].update_one(
+                    self._leased(job),
+                    {"$set": {"locked_until": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}}
+                )
+            except Exception as e:
+                logger.warning(f"Failed to renew the lease of job {job['_id']}: {e}")
+
+    async def _run(self, db, job):
+        kind = job["kind"]
+        handler = self._handlers.get(kind)
+        heartbeat = asyncio.create_task(self._heartbeat(db, job))
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler registered for job kind '{kind}'")
+            await handler(db, job["payload"])
+        except asyncio.CancelledError:
+            # Leave the lease to expire so the job is picked up again on restart
+            raise
+        except Exception as e:
+            await self._fail(db, job, e)
+            return
+        finally:
+            heartbeat.cancel()
+
+        done = await db[self.collection].update_one(
+            self._leased(job),
+            {"$set": {"status": "done", "locked_until": None, "updated_at": datetime.utcnow()}}
+        )
+        if done.modified_count == 0:
+            logger.warning(f"Job {job['_id']} ({kind}) finished after its lease was taken over")
+
+    async def _fail(self, db, job, error: Exception):
+        attempts = job.get("attempts", 1)
+        permanent = isinstance(error, PermanentJobError) or attempts >= self.max_attempts
+        now = datetime.utcnow()
+        if permanent:
+            logger.error(f"Job {job['_id']} ({job['kind']}) failed permanently: {error}")
+            failed = await db[self.collection].update_one(
+                self._leased(job),
+                {"$set": {"status": "failed", "locked_until": None, "last_error": str(error), "updated_at": now}}
+            )
+            if failed.modified_count == 0:
+                # Another worker holds the job now and will see it through
+                return
+            on_failure = self._failure_handlers.get(job["kind"])
+            if on_failure:
+                try:
+                    await on_failure(db, job["payload"])
+                except Exception as e:
+                    logger.error(f"Failure handler for job {job['_id']} raised: {e}")
+            return
+
+        # Exponential backoff with full jitter
+        delay = random.uniform(0, self.base_backoff * (2 ** (attempts - 1)))
+        logger.warning(f"Job {job['_id']} ({job['kind']}) attempt {attempts} failed, retrying in {delay:.1f}s: {error}")
+        await db[self.collection].update_one(
+            self._leased(job),
+            {"$set": {
+                "status": "queued",
+                "locked_until": None,
+                "run_at": now + timedelta(seconds=delay),
+                "last_error": str(error),
+                "updated_at": now,
+            }}
+        )
+
+job_queue = JobQueue(
+    workers=settings.JOB_WORKERS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+)
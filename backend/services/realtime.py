@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Set, Tuple
+from pymongo.errors import OperationFailure
+from ..database.client import settings, get_database
+
+logger = logging.getLogger(__name__)
+
+# Collections whose changes are pushed to clients
+WATCHED_COLLECTIONS = ["meetings", "next_steps"]
+
+class TooManyConnections(Exception):
+    pass
+
+class RealtimeBroker:
+    """
+    Fans change events out to the connected clients of each user.
+
+    Every connection gets a bounded queue; a slow client loses its oldest
+    events instead of holding up the change feed. Connection counts are
+    capped per worker and per user.
+
+    Delete events only say which user they belong to through the deleted
+    document's pre-image (MongoDB 6.0+), which the collections must have
+    enabled: with `enable_pre_images` at startup, or once by hand with
+    collMod ... changeStreamPreAndPostImages. Where pre-images are
+    unavailable, the owners of recently seen documents are remembered instead.
+    """
+
+    def __init__(self, max_connections: int, max_per_user: int, queue_size: int = 100, owner_cache_size: int = 10000, enable_pre_images: bool = False):
+        self.max_connections = max_connections
+        self.max_per_user = max_per_user
+        self.enable_pre_images = enable_pre_images
+        self.queue_size = queue_size
+        self.owner_cache_size = owner_cache_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._count = 0
+        self._feed_task: Optional[asyncio.Task] = None
+        # (collection, _id) -> user_id, least recently seen first
+        self._owners: "OrderedDict[Tuple[str, Any], str]" = OrderedDict()
+
+    @property
+    def connection_count(self) -> int:
+        return self._count
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: str):
+        # Check the limits before adding the user, so rejected connections
+        # leave nothing behind
+        if self._count >= self.max_connections or len(self._subscribers.get(user_id, ())) >= self.max_per_user:
+            raise TooManyConnections()
+        queues = self._subscribers.setdefault(user_id, set())
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        queues.add(queue)
+        self._count += 1
+        try:
+            yield queue
+        finally:
+            queues.discard(queue)
+            self._count -= 1
+            if not queues:
+                self._subscribers.pop(user_id, None)
+
+    def publish(self, user_id: str, event: Dict[str, Any]):
+        for queue in self._subscribers.get(user_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def _owner(self, change: Dict[str, Any]) -> Optional[str]:
+        key = (change["ns"]["coll"], change["documentKey"]["_id"])
+        document = change.get("fullDocument") or change.get("fullDocumentBeforeChange") or {}
+        user_id = document.get("user_id")
+        if change["operationType"] == "delete":
+            remembered = self._owners.pop(key, None)
+            return str(user_id) if user_id else remembered
+        if user_id:
+            self._owners[key] = str(user_id)
+            self._owners.move_to_end(key)
+            if len(self._owners) > self.owner_cache_size:
+                self._owners.popitem(last=False)
+            return str(user_id)
+        return None
+
+    def handle_change(self, change: Dict[str, Any]):
+        user_id = self._owner(change)
+        if not user_id or user_id not in self._subscribers:
+            return
+        self.publish(user_id, {
+            "collection": change["ns"]["coll"],
+            "operation": change["operationType"],
+            "id": str(change["documentKey"]["_id"]),
+        })
+
+    async def _enable_pre_images(self, db):
+        for collection in WATCHED_COLLECTIONS:
+            try:
+                await db.command({"collMod": collection, "changeStreamPreAndPostImages": {"enabled": True}})
+            except Exception as e:
+                logger.warning(f"Could not enable pre-images on '{collection}', deletes fall back to known owners: {e}")
+
+    async def _run_feed(self):
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": WATCHED_COLLECTIONS},
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+        }}]
+        delay = 1.0
+        enable_pre_images = self.enable_pre_images
+        while True:
+            try:
+                db = await get_database()
+                if enable_pre_images:
+                    await self._enable_pre_images(db)
+                    enable_pre_images = False
+                async with db.watch(
+                    pipeline,
+                    full_document="updateLookup",
+                    full_document_before_change="whenAvailable"
+                ) as stream:
+                    delay = 1.0
+                    async for change in stream:
+                        self.handle_change(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                # Standalone servers do not support change streams
+                logger.warning(f"Change streams unavailable, realtime updates disabled: {e}")
+                return
+            except Exception as e:
+                logger.error(f"Change feed failed, restarting in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+
+    def start(self):
+        if self._feed_task is None:
+            self._feed_task = asyncio.create_task(self._run_feed(), name="realtime-feed")
+
+    async def stop(self):
+        if self._feed_task:
+            self._feed_task.cancel()
+            try:
+                await self._feed_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._feed_task = None
+
+broker = RealtimeBroker(
+    max_connections=settings.REALTIME_MAX_CONNECTIONS,
+    max_per_user=settings.REALTIME_MAX_CONNECTIONS_PER_USER,
+    enable_pre_images=settings.REALTIME_ENABLE_PRE_IMAGES,
+)
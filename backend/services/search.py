@@ -0,0 +1,48 @@
+import asyncio
+from typing import Iterable, List, Optional
+from ..models.schemas import SearchResult, SearchResultType, SearchResults
+
+# Collection searched for each result type, through its text index (see
+# Database.ensure_indexes). The fallback engines rank with BM25 and MongoDB
+# with its own text score, so scores only compare within one engine.
+SEARCH_COLLECTIONS = {
+    SearchResultType.meeting: "meetings",
+    SearchResultType.next_step: "next_steps",
+}
+
+async def _ranked(db, collection: str, user_id: str, query: str, limit: int) -> List[dict]:
+    pipeline = [
+        {"$match": {"$text": {"$search": query}, "user_id": user_id}},
+        {"$sort": {"score": {"$meta": "textScore"}}},
+        {"$limit": limit},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+    ]
+    return await db[collection].aggregate(pipeline).to_list(length=None)
+
+async def search(
+    db,
+    user_id: str,
+    query: str,
+    page: int,
+    page_size: int,
+    types: Optional[Iterable[SearchResultType]] = None
+) -> SearchResults:
+    """
+    Searches a user's meetings (title, summary, participants) and next steps
+    (original and edited text), best match first. Each collection returns
+    its best page * page_size + 1 matches, so one more than the page tells
+    whether there is a next one; the results are merged by score.
+    """
+    kinds = list(types or SearchResultType)
+    end = page * page_size
+    ranked = await asyncio.gather(*(
+        _ranked(db, SEARCH_COLLECTIONS[kind], user_id, query, end + 1) for kind in kinds
+    ))
+    hits = [(doc.pop("score"), kind, doc) for kind, docs in zip(kinds, ranked) for doc in docs]
+    hits.sort(key=lambda hit: hit[0], reverse=True)
+
+    results = [
+        SearchResult(type=kind, score=score, **{kind.value: doc})
+        for score, kind, doc in hits[end - page_size:end]
+    ]
+    return SearchResults(query=query, page=page, page_size=page_size, has_more=len(hits) > end, results=results)
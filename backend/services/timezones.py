@@ -0,0 +1,50 @@
+from datetime import datetime, date, time, timedelta, timezone
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+UTC = timezone.utc
+
+def is_valid_timezone(name: str) -> bool:
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+def get_zone(name: Optional[str]) -> ZoneInfo:
+    """
+    Returns the IANA zone for a user's timezone setting, falling back to UTC
+    when it is unset or unknown.
+    """
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return ZoneInfo("UTC")
+
+def to_utc(value: datetime) -> datetime:
+    """
+    Normalizes a datetime to an aware UTC datetime. Naive values are taken to
+    be UTC already, which is how MongoDB returns them by default.
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value.astimezone(UTC)
+
+def local_today(zone: ZoneInfo) -> date:
+    return datetime.now(zone).date()
+
+def local_date(value: datetime, zone: ZoneInfo) -> date:
+    return to_utc(value).astimezone(zone).date()
+
+def local_day_range(first_day: date, zone: ZoneInfo, last_day: Optional[date] = None) -> Tuple[datetime, datetime]:
+    """
+    Returns the UTC instants [start, end) covering local days first_day through
+    last_day (inclusive) in the given zone. Days are not assumed to be 24 hours
+    long, so DST transitions are handled.
+    """
+    last_day = last_day or first_day
+    start = datetime.combine(first_day, time.min, tzinfo=zone)
+    end = datetime.combine(last_day + timedelta(days=1), time.min, tzinfo=zone)
+    return start.astimezone(UTC), end.astimezone(UTC)
@@ -0,0 +1,42 @@
+import asyncio
+import sys
+import httpx
+from database.client import db
+
+# Local stand-in for Google: posts push notifications for the stored
+# calendar channels to the running backend's webhook.
+#   python simulate_calendar_push.py [email] [webhook url]
+WEBHOOK_URL = "http://localhost:8000/api/v1/calendar/notifications"
+
+async def simulate(email: str, webhook_url: str):
+    print("Connecting to database...")
+    await db.connect()
+    database = db.get_db()
+
+    user = await database.users.find_one({"email": email})
+    if not user:
+        print(f"User {email} not found.")
+        return
+
+    channels = await database.calendar_channels.find({"user_id": str(user["_id"])}).to_list(length=None)
+    if not channels:
+        print(f"No calendar channels for {email}. Call POST /api/v1/calendar/watch first.")
+        return
+
+    async with httpx.AsyncClient() as client:
+        for number, channel in enumerate(channels, start=1):
+            response = await client.post(webhook_url, headers={
+                "X-Goog-Channel-ID": channel["_id"],
+                "X-Goog-Channel-Token": channel["token"],
+                "X-Goog-Resource-ID": channel["resource_id"],
+                "X-Goog-Resource-State": "exists",
+                "X-Goog-Message-Number": str(number),
+            })
+            print(f"Calendar {channel['calendar_id']}: {response.status_code} {response.text}")
+
+    db.close()
+
+if __name__ == "__main__":
+    email = sys.argv[1] if len(sys.argv) > 1 else "testuser@example.com"
+    webhook_url = sys.argv[2] if len(sys.argv) > 2 else WEBHOOK_URL
+    asyncio.run(simulate(email, webhook_url))